@@ -1,5 +1,36 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
+from django.utils.translation import ngettext
 from .models import Produto, Categoria, Marca
+from .signals import produtos_alterados
+
+
+def _alterar_ativo(queryset, ativo):
+    # update() não chama save() nem os sinais dos modelos: o índice de
+    # códigos, o catálogo e a sincronização são avisados por produtos_alterados
+    ids = list(queryset.values_list('pk', flat=True))
+    atualizados = Produto.objects.filter(pk__in=ids).update(ativo=ativo, data_atualizacao=timezone.now())
+    produtos_alterados.send(sender=Produto, ids=ids)
+    return atualizados
+
+@admin.action(description='Marcar produtos como ativos')
+def marcar_ativos(modeladmin, request, queryset):
+    atualizados = _alterar_ativo(queryset, True)
+    modeladmin.message_user(request, ngettext(
+        '%d produto foi marcado como ativo.',
+        '%d produtos foram marcados como ativos.',
+        atualizados,
+    ) % atualizados, messages.SUCCESS)
+
+@admin.action(description='Marcar produtos como inativos')
+def marcar_inativos(modeladmin, request, queryset):
+    atualizados = _alterar_ativo(queryset, False)
+    modeladmin.message_user(request, ngettext(
+        '%d produto foi marcado como inativo.',
+        '%d produtos foram marcados como inativos.',
+        atualizados,
+    ) % atualizados, messages.SUCCESS)
+
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -24,6 +55,7 @@ class ProdutoAdmin(admin.ModelAdmin):
     list_editable = ['preco', 'estoque', 'ativo', 'destaque']
     readonly_fields = ['data_cadastro', 'data_atualizacao']
     ordering = ['nome']
+    actions = [marcar_ativos, marcar_inativos]
     
     fieldsets = (
         ('Informações Básicas', {
@@ -33,7 +65,7 @@ class ProdutoAdmin(admin.ModelAdmin):
             'fields': ('modelo', 'ano', 'cilindrada', 'cor')
         }),
         ('Preços e Estoque', {
-            'fields': ('preco', 'preco_promocional', 'estoque', 'estoque_minimo')
+            'fields': ('preco', 'preco_promocional', 'preco_custo', 'estoque', 'estoque_minimo')
         }),
         ('Outros', {
             'fields': ('codigo_barras', 'imagem_principal', 'ativo', 'destaque')
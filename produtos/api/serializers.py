@@ -74,3 +74,16 @@ class ProdutoEstoqueSerializer(serializers.ModelSerializer):
     class Meta:
         model = Produto
         fields = ['id', 'nome', 'estoque', 'estoque_minimo', 'estoque_status']
+
+class ProdutoSincronizacaoSerializer(serializers.ModelSerializer):
+    """Produto do catálogo offline dos terminais: categoria e marca pelo id"""
+    imagens = ImagemProdutoSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Produto
+        fields = [
+            'id', 'nome', 'descricao', 'categoria', 'marca', 'tipo',
+            'modelo', 'ano', 'cilindrada', 'cor', 'preco', 'preco_promocional',
+            'preco_atual', 'estoque', 'estoque_minimo', 'codigo_barras', 'imagem_principal',
+            'destaque', 'data_atualizacao', 'imagens'
+        ]
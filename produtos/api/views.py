@@ -3,7 +3,9 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from rpm_motos.paginacao import PaginacaoKeyset
+from produtos.busca import BuscaProdutos, buscar, ordem_relevancia
 from produtos.models import Produto, Categoria, Marca, ImagemProduto
 from .serializers import (
     ProdutoSerializer, 
@@ -18,7 +20,7 @@ from .serializers import (
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def lista_produtos_api(request):
-    produtos = Produto.objects.filter(ativo=True)
+    produtos = Produto.objects.filter(ativo=True).select_related('categoria', 'marca')
     categoria_id = request.GET.get('categoria')
     marca_id = request.GET.get('marca')
     tipo = request.GET.get('tipo')
@@ -30,9 +32,13 @@ def lista_produtos_api(request):
     if tipo:
         produtos = produtos.filter(tipo=tipo)
     if search:
-        produtos = produtos.filter(nome__icontains=search)
-    serializer = ProdutoListSerializer(produtos, many=True)
-    return Response(serializer.data)
+        produtos = buscar(produtos, search)
+    paginador = PaginacaoKeyset()
+    pagina = paginador.paginate_queryset(
+        produtos.order_by(*(ordem_relevancia(search) or ['-data_cadastro', 'id'])), request
+    )
+    serializer = ProdutoListSerializer(pagina, many=True)
+    return paginador.get_paginated_response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -79,19 +85,24 @@ def deletar_produto_api(request, pk):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def estoque_produtos_api(request):
-    produtos = Produto.objects.all()
-    serializer = ProdutoEstoqueSerializer(produtos, many=True)
-    return Response(serializer.data)
+    paginador = PaginacaoKeyset()
+    pagina = paginador.paginate_queryset(Produto.objects.order_by('-data_cadastro', 'id'), request)
+    serializer = ProdutoEstoqueSerializer(pagina, many=True)
+    return paginador.get_paginated_response(serializer.data)
 
 class ProdutoViewSet(viewsets.ModelViewSet):
-    queryset = Produto.objects.all()
+    queryset = Produto.objects.select_related('categoria', 'marca')
     serializer_class = ProdutoSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [BuscaProdutos, OrderingFilter]
     filterset_fields = ['categoria', 'marca', 'tipo', 'ativo']
-    search_fields = ['nome', 'descricao', 'modelo']
     ordering_fields = ['nome', 'preco', 'data_cadastro']
-    ordering = ['-data_cadastro']
+    
+    @property
+    def ordering(self):
+        """Com ?search=, do mais relevante para o menos (ver produtos/busca.py)"""
+        busca = self.request.query_params.get(BuscaProdutos.search_param) if getattr(self, 'request', None) else None
+        return ordem_relevancia(busca) or ['-data_cadastro', 'id']
     def get_serializer_class(self):
         if self.action == 'list':
             return ProdutoListSerializer
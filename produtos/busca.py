@@ -0,0 +1,196 @@
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+
+from .models import Produto, Marca, Categoria, ProdutoBusca
+
+
+# Busca textual de produtos.
+# No SQLite, a tabela virtual FTS5 produtos_busca guarda, para cada produto
+# (rowid = id), nome, modelo, marca, categoria, código de barras e descrição.
+# Ela é mantida por triggers no próprio banco, então também acompanha
+# update(), bulk_create() e as alterações de nome de marcas e categorias.
+# O tokenizador unicode61 com remove_diacritics ignora acentos e
+# maiúsculas ("acessorio" encontra "Acessório"). Todas as palavras digitadas
+# precisam aparecer, e a última, que ainda pode estar sendo digitada, vale como
+# prefixo ("pneu hon" encontra "Pneu Honda"). Os resultados vêm do mais
+# relevante (bm25 com PESOS por coluna) para o menos, sem corte: todos os
+# produtos encontrados são ordenados, e as APIs devolvem uma página de cada
+# vez (PaginacaoKeyset).
+# Em outros bancos (ou antes da migração) a busca cai num icontains por
+# palavra, sem ordem de relevância.
+#
+# Migrações do SQLite que recriam a tabela de produtos apagam os triggers;
+# garantir_indice() roda depois de cada migrate e os recria, reconstruindo o
+# índice quando isso acontece.
+
+TABELA = ProdutoBusca._meta.db_table
+COLUNAS = ['nome', 'modelo', 'marca', 'categoria', 'codigo_barras', 'descricao']
+PESOS = [10.0, 5.0, 4.0, 3.0, 8.0, 1.0]
+ORDEM_RELEVANCIA = ('busca__rank', 'id')
+MAX_PALAVRAS = 10
+
+# Aliases de banco em que a tabela FTS5 já foi vista (uma consulta ao catálogo por processo)
+_disponivel = set()
+
+def _nomes():
+    return {
+        'produto': Produto._meta.db_table,
+        'marca': Marca._meta.db_table,
+        'categoria': Categoria._meta.db_table,
+        'colunas': ', '.join(COLUNAS),
+    }
+
+def _valores(p):
+    """Valores das COLUNAS para o produto de alias p"""
+    nomes = _nomes()
+    return (
+        f"{p}.nome, {p}.modelo, "
+        f"(SELECT nome FROM {nomes['marca']} WHERE id = {p}.marca_id), "
+        f"(SELECT nome FROM {nomes['categoria']} WHERE id = {p}.categoria_id), "
+        f"{p}.codigo_barras, {p}.descricao"
+    )
+
+def _triggers():
+    nomes = _nomes()
+    return {
+        f'{TABELA}_insert': f"""
+            CREATE TRIGGER IF NOT EXISTS {TABELA}_insert AFTER INSERT ON {nomes['produto']}
+            BEGIN
+                INSERT INTO {TABELA} (rowid, {nomes['colunas']}) VALUES (new.id, {_valores('new')});
+            END""",
+        f'{TABELA}_update': f"""
+            CREATE TRIGGER IF NOT EXISTS {TABELA}_update
+            AFTER UPDATE OF nome, modelo, marca_id, categoria_id, codigo_barras, descricao ON {nomes['produto']}
+            BEGIN
+                DELETE FROM {TABELA} WHERE rowid = old.id;
+                INSERT INTO {TABELA} (rowid, {nomes['colunas']}) VALUES (new.id, {_valores('new')});
+            END""",
+        f'{TABELA}_delete': f"""
+            CREATE TRIGGER IF NOT EXISTS {TABELA}_delete AFTER DELETE ON {nomes['produto']}
+            BEGIN
+                DELETE FROM {TABELA} WHERE rowid = old.id;
+            END""",
+        f'{TABELA}_marca': f"""
+            CREATE TRIGGER IF NOT EXISTS {TABELA}_marca AFTER UPDATE OF nome ON {nomes['marca']}
+            BEGIN
+                UPDATE {TABELA} SET marca = new.nome
+                WHERE rowid IN (SELECT id FROM {nomes['produto']} WHERE marca_id = new.id);
+            END""",
+        f'{TABELA}_categoria': f"""
+            CREATE TRIGGER IF NOT EXISTS {TABELA}_categoria AFTER UPDATE OF nome ON {nomes['categoria']}
+            BEGIN
+                UPDATE {TABELA} SET categoria = new.nome
+                WHERE rowid IN (SELECT id FROM {nomes['produto']} WHERE categoria_id = new.id);
+            END""",
+    }
+
+def garantir_indice(using='default'):
+    """
+    Cria a tabela FTS5 e os triggers que faltarem (só no SQLite). Se algum
+    trigger faltava, o índice é reconstruído a partir dos produtos.
+    Devolve True se o índice precisou ser (re)criado.
+    """
+    conexao = connections[using]
+    if conexao.vendor != 'sqlite':
+        return False
+    with conexao.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existentes = {nome for (nome,) in cursor.fetchall()}
+        triggers = _triggers()
+        if TABELA in conexao.introspection.table_names(cursor) and existentes.issuperset(triggers):
+            return False
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+            f"{', '.join(COLUNAS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        cursor.execute(
+            f"INSERT INTO {TABELA} ({TABELA}, rank) VALUES ('rank', %s)",
+            [f"bm25({', '.join(str(peso) for peso in PESOS)})"],
+        )
+        for sql in triggers.values():
+            cursor.execute(sql)
+    reconstruir_indice(using)
+    return True
+
+def remover_indice(using='default'):
+    conexao = connections[using]
+    if conexao.vendor != 'sqlite':
+        return
+    with conexao.cursor() as cursor:
+        for nome in _triggers():
+            cursor.execute(f'DROP TRIGGER IF EXISTS {nome}')
+        cursor.execute(f'DROP TABLE IF EXISTS {TABELA}')
+    _disponivel.discard(using)
+
+def reconstruir_indice(using='default'):
+    """Regrava o índice inteiro a partir dos produtos e devolve o total indexado"""
+    nomes = _nomes()
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA}')
+        cursor.execute(
+            f"INSERT INTO {TABELA} (rowid, {nomes['colunas']}) "
+            f"SELECT p.id, {_valores('p')} FROM {nomes['produto']} p"
+        )
+        total = cursor.rowcount
+        cursor.execute(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('optimize')")
+    return total
+
+def indice_disponivel(using='default'):
+    if using not in _disponivel:
+        conexao = connections[using]
+        if conexao.vendor == 'sqlite' and TABELA in conexao.introspection.table_names():
+            _disponivel.add(using)
+    return using in _disponivel
+
+def palavras(texto):
+    return re.findall(r'[^\W_]+', texto or '')[:MAX_PALAVRAS]
+
+def expressao_busca(texto):
+    """
+    Consulta FTS5: todas as palavras obrigatórias, a última como prefixo
+    (com 2 letras ou mais, o menor prefixo indexado)
+    """
+    termos = [f'"{palavra}"' for palavra in palavras(texto)]
+    if termos and len(palavras(texto)[-1]) >= 2:
+        termos[-1] += '*'
+    return ' '.join(termos)
+
+def ordem_relevancia(texto, using='default'):
+    """Ordenação de buscar(texto): ORDEM_RELEVANCIA pelo índice FTS5, senão None"""
+    if palavras(texto) and indice_disponivel(using):
+        return list(ORDEM_RELEVANCIA)
+    return None
+
+def buscar(produtos, texto):
+    """
+    Produtos do queryset com todas as palavras do texto, do mais relevante
+    para o menos (ordem_relevancia). Texto vazio: queryset inalterado.
+    """
+    if not palavras(texto):
+        return produtos
+    if ordem_relevancia(texto, produtos.db):
+        return (
+            produtos.filter(busca__documento__match=expressao_busca(texto))
+            .select_related('busca').order_by(*ORDEM_RELEVANCIA)
+        )
+    return produtos.filter(reduce(and_, [
+        Q(nome__icontains=palavra) | Q(modelo__icontains=palavra) | Q(descricao__icontains=palavra)
+        | Q(codigo_barras__icontains=palavra) | Q(marca__nome__icontains=palavra)
+        | Q(categoria__nome__icontains=palavra)
+        for palavra in palavras(texto)
+    ])).order_by('-data_cadastro', 'id')
+
+class BuscaProdutos(SearchFilter):
+    """
+    ?search= das APIs de produtos por buscar(). A view ordena por
+    ordem_relevancia() quando não há ?ordering= (ver ProdutoViewSet.ordering).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        return buscar(queryset, request.query_params.get(self.search_param, ''))
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import uuid
+
+from django.core.cache import cache, caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+# Respostas do catálogo (listas de produtos da API) em cache, com GET condicional.
+# Cada escrita em produtos, categorias, marcas e imagens (e os update() que
+# enviam produtos_alterados) incrementa a versão do catálogo depois do commit.
+# A versão fica no cache compartilhado entre os processos (ver CACHES em
+# settings.py); a lista serializada fica no cache 'local' de cada processo,
+# sob a versão e a URL completa da requisição (filtros, busca, cursor, host
+# dos links), e é servida com:
+# - ETag forte: hash do conteúdo e do formato (JSON ou API navegável), igual
+#   em todos os processos para a mesma resposta;
+# - Last-Modified: o maior data_atualizacao dos produtos da página (ou a
+#   última escrita no catálogo, se posterior: exclusões e mudanças em
+#   categorias e marcas não alteram os produtos).
+# Um cliente com o ETag (If-None-Match) ou a data (If-Modified-Since) atuais
+# recebe 304 sem consulta ao catálogo; vão ao banco só a autenticação da
+# requisição e a leitura da versão. A lista é a mesma para todo usuário
+# autenticado.
+
+CHAVE_VERSAO = 'produtos:catalogo:versao'
+CHAVE_ALTERADO = 'produtos:catalogo:alterado'
+PREFIXO_RESPOSTA = 'produtos:catalogo:resposta'
+VALIDADE_RESPOSTA = 300  # segundos; cobre alterações feitas fora do ORM
+
+def invalidar_catalogo():
+    """Desatualiza as respostas em cache quando a transação atual for confirmada"""
+    transaction.on_commit(_nova_versao)
+
+def _nova_versao():
+    # Um valor novo a cada escrita, e não incr (ver vendas/dashboard.py)
+    cache.set_many({CHAVE_VERSAO: uuid.uuid4().hex, CHAVE_ALTERADO: timezone.now()}, None)
+
+def ultima_alteracao(produtos):
+    """Maior data_atualizacao dos produtos, ou None"""
+    return max((produto.data_atualizacao for produto in produtos), default=None)
+
+def _chave(request, versao):
+    formato = request.accepted_renderer.format
+    url = hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+    return f'{PREFIXO_RESPOSTA}:{versao}:{formato}:{url}'
+
+def _gerar(request, gerar, alterado_catalogo):
+    dados, alterado = gerar()
+    if alterado_catalogo and (alterado is None or alterado_catalogo > alterado):
+        alterado = alterado_catalogo
+    # Os dados vão ao cache como JSON simples (as listas do serializer guardam
+    # referência a ele), com os mesmos valores que o cliente recebe
+    conteudo = json.dumps(dados, cls=DjangoJSONEncoder)
+    etag = hashlib.sha256(f'{request.accepted_renderer.format}:{conteudo}'.encode()).hexdigest()[:32]
+    return {
+        'dados': json.loads(conteudo),
+        'etag': f'"{etag}"',
+        'alterado': int(alterado.timestamp()) if alterado else None,
+    }
+
+def resposta_catalogo(request, gerar):
+    """
+    Resposta da lista em cache (ou 304). gerar() monta a lista direto do banco
+    e devolve (dados serializados, ultima_alteracao dos produtos).
+    """
+    # A versão é lida antes de gerar: uma escrita durante a geração deixa a
+    # resposta gravada já desatualizada
+    versoes = cache.get_many([CHAVE_VERSAO, CHAVE_ALTERADO])
+    chave = _chave(request, versoes.get(CHAVE_VERSAO, 0))
+    respostas = caches['local']
+    entrada = respostas.get(chave)
+    if entrada is None:
+        entrada = _gerar(request, gerar, versoes.get(CHAVE_ALTERADO))
+        respostas.set(chave, entrada, VALIDADE_RESPOSTA)
+
+    resposta = get_conditional_response(request, etag=entrada['etag'], last_modified=entrada['alterado'])
+    if resposta is None:
+        resposta = Response(entrada['dados'])
+    resposta['ETag'] = entrada['etag']
+    if entrada['alterado']:
+        resposta['Last-Modified'] = http_date(entrada['alterado'])
+    # Resposta de usuário autenticado, sempre revalidada pelo cliente
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
@@ -0,0 +1,147 @@
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Produto
+
+
+# Índice de códigos de barras do caixa.
+# Cada processo guarda um dicionário codigo_barras -> dados de venda (id,
+# nome, preço, preço atual e estoque) dos produtos ativos, e a leitura de um
+# código no caixa não vai ao banco.
+# Escritas em produtos (save/delete e os update() de estoque e ativo, via
+# sinal produtos_alterados) trocam a versão do índice no cache compartilhado
+# (CACHES em settings.py) depois do commit. O processo que fez a escrita é
+# avisado na hora; os outros conferem a versão (uma consulta à tabela do
+# cache) no máximo a cada INTERVALO segundos, e não a cada leitura. O
+# processo que vê uma versão nova relê só os produtos alterados desde a
+# última leitura (data_atualizacao, com MARGEM para transações longas);
+# exclusões pedem a recarga completa. Alterações feitas fora do ORM são
+# relidas a cada VALIDADE segundos.
+# As leituras não usam a trava: quem relê monta dicionários novos e os troca
+# de uma vez, e o dicionário que uma leitura pegou não muda mais.
+# O índice é carregado na primeira leitura do processo.
+
+CHAVE_VERSAO = 'produtos:codigos:versao'
+CHAVE_RECARGA = 'produtos:codigos:recarga'
+INTERVALO = 1  # segundos
+VALIDADE = 5  # segundos
+MARGEM = timedelta(seconds=60)
+MAX_CODIGOS = 200
+CAMPOS = ['id', 'codigo_barras', 'nome', 'preco', 'preco_promocional', 'estoque', 'ativo']
+
+def _nova_versao(chave):
+    # Um valor novo a cada escrita, e não incr (ver vendas/dashboard.py)
+    cache.set(chave, uuid.uuid4().hex, None)
+
+def _escrita_confirmada(recarregar):
+    _nova_versao(CHAVE_RECARGA if recarregar else CHAVE_VERSAO)
+    indice.avisar(recarregar)
+
+def invalidar_codigos(recarregar=False):
+    """Desatualiza o índice de todos os processos quando a transação atual for confirmada"""
+    transaction.on_commit(lambda: _escrita_confirmada(recarregar))
+
+def _dados(produto):
+    """Resposta da leitura de um código, já pronta para o JSON (valores como na API)"""
+    return {
+        'id': produto['id'],
+        'codigo_barras': produto['codigo_barras'],
+        'nome': produto['nome'],
+        'preco': str(produto['preco']),
+        'preco_atual': str(produto['preco_promocional'] or produto['preco']),
+        'estoque': produto['estoque'],
+    }
+
+class IndiceCodigos:
+    def __init__(self):
+        self.produtos = {}
+        self.codigos = {}  # id -> código, para achar a entrada antiga quando o código muda
+        self.versao = self.recarga = None
+        self.lido_em = None
+        self.conferido = self.consultado = 0.0
+        self.aviso = None  # escrita deste processo ainda não relida: 'versao' ou 'recarga'
+        self.trava = threading.Lock()
+
+    def avisar(self, recarregar=False):
+        """Escrita confirmada neste processo: a próxima leitura relê sem esperar o INTERVALO"""
+        self.aviso = 'recarga' if recarregar or self.aviso == 'recarga' else 'versao'
+
+    def _versoes(self):
+        return cache.get_many([CHAVE_VERSAO, CHAVE_RECARGA])
+
+    def _ler(self, produtos, por_codigo, por_id):
+        # Sem a ordenação padrão, que levaria o banco ao índice de data_cadastro
+        for produto in produtos.order_by().values(*CAMPOS).iterator(chunk_size=2000):
+            codigo = produto['codigo_barras'] if produto['ativo'] else None
+            if codigo:
+                por_codigo[codigo] = _dados(produto)
+            codigo_antigo = por_id.pop(produto['id'], None)
+            if codigo_antigo and codigo_antigo != codigo:
+                por_codigo.pop(codigo_antigo, None)
+            if codigo:
+                por_id[produto['id']] = codigo
+
+    def carregar(self):
+        """Leitura completa dos produtos, trocada de uma vez no fim"""
+        with self.trava:
+            self.aviso = None
+            versoes = self._versoes()
+            lido_em = timezone.now()
+            por_codigo, por_id = {}, {}
+            self._ler(
+                Produto.objects.filter(ativo=True).exclude(codigo_barras=None).exclude(codigo_barras=''),
+                por_codigo, por_id,
+            )
+            self.produtos, self.codigos = por_codigo, por_id
+            self.versao, self.recarga = versoes.get(CHAVE_VERSAO), versoes.get(CHAVE_RECARGA)
+            self.lido_em = lido_em
+            self.conferido = self.consultado = time.monotonic()
+        return len(por_codigo)
+
+    def atualizar(self):
+        """Relê os produtos alterados se a versão mudou ou a VALIDADE passou"""
+        aviso, agora = self.aviso, time.monotonic()
+        if self.lido_em is None or aviso == 'recarga':
+            self.carregar()
+            return
+        if aviso is None and agora - self.consultado < INTERVALO:
+            return
+        versoes = self._versoes()
+        self.consultado = agora
+        if versoes.get(CHAVE_RECARGA) != self.recarga:
+            self.carregar()
+            return
+        if aviso is None and versoes.get(CHAVE_VERSAO) == self.versao and agora - self.conferido < VALIDADE:
+            return
+        with self.trava:
+            self.aviso = None
+            lido_em = timezone.now()
+            # Cópias: os dicionários atuais continuam com as leituras em curso
+            por_codigo, por_id = dict(self.produtos), dict(self.codigos)
+            self._ler(Produto.objects.filter(data_atualizacao__gte=self.lido_em - MARGEM), por_codigo, por_id)
+            self.produtos, self.codigos = por_codigo, por_id
+            self.versao = versoes.get(CHAVE_VERSAO)
+            self.lido_em, self.conferido = lido_em, time.monotonic()
+
+    def buscar(self, codigos):
+        """{código: dados} dos códigos encontrados"""
+        self.atualizar()
+        produtos = self.produtos
+        return {codigo: produtos[codigo] for codigo in codigos if codigo in produtos}
+
+indice = IndiceCodigos()
+
+def buscar_codigo(codigo):
+    """Dados do produto ativo com o código de barras, ou None"""
+    return indice.buscar([codigo]).get(codigo)
+
+def buscar_codigos(codigos):
+    """({código: dados} dos encontrados, [códigos não encontrados]) de uma leitura em lote"""
+    encontrados = indice.buscar(codigos)
+    return encontrados, [codigo for codigo in dict.fromkeys(codigos) if codigo not in encontrados]
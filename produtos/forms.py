@@ -43,7 +43,7 @@ class ProdutoForm(forms.ModelForm):
         model = Produto
         fields = [
             'nome', 'descricao', 'categoria', 'marca', 'tipo', 'modelo', 'ano',
-            'cilindrada', 'cor', 'preco', 'preco_promocional', 'estoque',
+            'cilindrada', 'cor', 'preco', 'preco_promocional', 'preco_custo', 'estoque',
             'estoque_minimo', 'codigo_barras', 'imagem_principal', 'ativo', 'destaque'
         ]
         widgets = {
@@ -91,6 +91,11 @@ class ProdutoForm(forms.ModelForm):
                 'step': '0.01',
                 'placeholder': '0.00 (opcional)'
             }),
+            'preco_custo': forms.NumberInput(attrs={
+                'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500',
+                'step': '0.01',
+                'placeholder': '0.00 (opcional)'
+            }),
             'estoque': forms.NumberInput(attrs={
                 'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500',
                 'min': '0',
@@ -139,6 +144,12 @@ class ProdutoForm(forms.ModelForm):
         
         return preco_promocional
     
+    def clean_preco_custo(self):
+        preco_custo = self.cleaned_data.get('preco_custo')
+        if preco_custo is not None and preco_custo < 0:
+            raise forms.ValidationError('O preço de custo não pode ser negativo.')
+        return preco_custo
+    
     def clean_estoque(self):
         estoque = self.cleaned_data.get('estoque')
         if estoque and estoque < 0:
@@ -0,0 +1,122 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from produtos.busca import buscar, indice_disponivel
+from produtos.models import Produto, Categoria, Marca
+
+
+PECAS = [
+    'Capacete', 'Pneu', 'Câmara de ar', 'Corrente', 'Coroa', 'Pinhão', 'Óleo', 'Filtro de óleo',
+    'Pastilha de freio', 'Disco de freio', 'Escapamento', 'Retrovisor', 'Baú', 'Jaqueta', 'Luva',
+    'Embreagem', 'Farol', 'Lanterna', 'Guidão', 'Banco', 'Carenagem', 'Vela de ignição',
+    'Bateria', 'Amortecedor', 'Manete', 'Pedaleira', 'Relação', 'Bagageiro', 'Protetor de cárter',
+]
+DETALHES = [
+    'dianteiro', 'traseiro', 'esportivo', 'reforçado', 'original', 'paralelo', 'cromado', 'preto',
+    'vermelho', 'fosco', 'articulado', 'térmico', 'impermeável', 'sintético', 'semissintético',
+]
+MODELOS = ['CG 160', 'Titan', 'Fan', 'Biz', 'Pop', 'XRE 300', 'CB 500', 'Fazer 250', 'Factor',
+           'Lander', 'Crosser', 'NMax', 'MT-03', 'Yes', 'Intruder', 'Ninja 400', 'G 310']
+MARCAS = ['Honda', 'Yamaha', 'Suzuki', 'Kawasaki', 'BMW', 'Pro Tork', 'Pirelli', 'Metzeler',
+          'Riffel', 'Cofap', 'Motul', 'Mobil', 'NGK', 'Cobreq', 'Vaz', 'Givi', 'X11', 'Tutto']
+CATEGORIAS = ['Acessórios', 'Peças', 'Pneus e câmaras', 'Lubrificantes', 'Vestuário', 'Elétrica',
+              'Freios', 'Transmissão', 'Suspensão', 'Escapamentos']
+SILABAS = ['ba', 'ca', 'da', 'fe', 'gi', 'lo', 'mu', 'na', 'pe', 'ri', 'so', 'tu', 'va', 'xe', 'zo',
+           'pra', 'tre', 'cla', 'bro', 'fri', 'gal', 'ten', 'mor', 'sil', 'vur']
+
+def _vocabulario(tamanho):
+    """
+    Palavras das descrições com frequência de Zipf, como num catálogo real:
+    poucas muito comuns e uma cauda longa de raras
+    """
+    palavras = sorted({
+        ''.join(random.choices(SILABAS, k=random.randint(2, 4))) for _ in range(tamanho * 2)
+    })[:tamanho]
+    random.shuffle(palavras)
+    return palavras, list(accumulate(1 / posicao for posicao in range(1, len(palavras) + 1)))
+
+# (descrição, texto digitado): palavras comuns e raras, prefixos, sem acento,
+# várias palavras, marca/categoria e código de barras
+BUSCAS = [
+    ('palavra comum', 'capacete'),
+    ('digitando', 'ca'),
+    ('prefixo', 'capa'),
+    ('sem acento', 'protetor carter'),
+    ('várias palavras', 'pastilha freio honda titan'),
+    ('marca', 'pirelli'),
+    ('categoria', 'acessorios'),
+    ('modelo', 'bateria xre 300'),
+    ('código de barras', '78900001234'),
+    ('sem resultado', 'carburador'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria produtos de teste e mede a busca textual (FTS5) contra o antigo '
+        'nome__icontains. Tudo é desfeito ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=500000, help='Produtos criados')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Execuções de cada busca')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados aleatórios')
+
+    def handle(self, *args, **options):
+        if not indice_disponivel():
+            raise CommandError('Índice de busca não encontrado (SQLite com a migração produtos 0005).')
+        random.seed(options['semente'])
+        with transaction.atomic():
+            self._criar_dados(options['produtos'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            ativos = Produto.objects.filter(ativo=True).select_related('categoria', 'marca')
+            self.stdout.write(self.style.MIGRATE_HEADING('Mediana / p95 por busca (ms), primeiros 20 resultados'))
+            self.stdout.write(f"{'busca':<20}{'texto':<30}{'achados':>9}{'fts5':>8}{'p95':>8}{'icontains':>11}")
+            for descricao, texto in BUSCAS:
+                achados = buscar(ativos, texto).count()
+                fts = self._medir(lambda: list(buscar(ativos, texto)[:20]), options['repeticoes'])
+                antes = self._medir(
+                    lambda: list(ativos.filter(nome__icontains=texto).order_by('-data_cadastro', 'id')[:20]),
+                    options['repeticoes'],
+                )
+                self.stdout.write(
+                    f'{descricao:<20}{texto:<30}{achados:>9}'
+                    f'{statistics.median(fts):>8.2f}{statistics.quantiles(fts, n=20)[-1]:>8.2f}'
+                    f'{statistics.median(antes):>11.2f}'
+                )
+            transaction.set_rollback(True)
+
+    def _criar_dados(self, quantidade):
+        inicio = time.perf_counter()
+        marcas = Marca.objects.bulk_create([Marca(nome=f'{nome} (teste)') for nome in MARCAS])
+        categorias = Categoria.objects.bulk_create([Categoria(nome=f'{nome} (teste)') for nome in CATEGORIAS])
+        vocabulario, acumulados = _vocabulario(20000)
+        for lote in range(0, quantidade, 5000):
+            Produto.objects.bulk_create([
+                Produto(
+                    nome=f'{random.choice(PECAS)} {random.choice(DETALHES)} {random.choice(vocabulario).upper()}',
+                    modelo=random.choice(MODELOS),
+                    descricao=' '.join(random.choices(vocabulario, cum_weights=acumulados, k=12) + [random.choice(DETALHES)]),
+                    codigo_barras=f'789{i:010d}',
+                    categoria=random.choice(categorias), marca=random.choice(marcas),
+                    preco=Decimal('10.00'), ativo=random.random() < 0.9,
+                )
+                for i in range(lote, min(lote + 5000, quantidade))
+            ])
+        self.stdout.write(f'{quantidade} produtos criados e indexados em {time.perf_counter() - inicio:.1f}s')
+
+    def _medir(self, consulta, repeticoes):
+        duracoes = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            consulta()
+            duracoes.append((time.perf_counter() - inicio) * 1000)
+        return duracoes
@@ -0,0 +1,104 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from produtos.codigos import indice, _escrita_confirmada
+from produtos.models import Produto, Categoria, Marca
+from produtos.views import ProdutoViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria produtos de teste e mede a leitura de códigos de barras pelo índice '
+        'em memória: carga, leitura direta, API (um código e lote) e releitura '
+        'depois de uma escrita. Tudo é desfeito ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--produtos', type=int, default=100000, help='Produtos criados')
+        parser.add_argument('--repeticoes', type=int, default=2000, help='Leituras medidas em cada caso')
+        parser.add_argument('--lote', type=int, default=20, help='Códigos por leitura em lote')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados aleatórios')
+
+    def handle(self, *args, **options):
+        random.seed(options['semente'])
+        with transaction.atomic():
+            codigos = self._criar_dados(options['produtos'])
+            usuario = get_user_model().objects.create(username='bench_caixa', tipo_usuario='vendedor')
+
+            inicio = time.perf_counter()
+            total = indice.carregar()
+            self.stdout.write(f'Índice carregado com {total} códigos em {(time.perf_counter() - inicio) * 1000:.0f} ms')
+
+            fabrica = APIRequestFactory()
+            um = ProdutoViewSet.as_view({'get': 'codigo'})
+            lote = ProdutoViewSet.as_view({'post': 'codigos'})
+
+            def api_um():
+                codigo = random.choice(codigos)
+                requisicao = fabrica.get(f'/api/produtos/codigo/{codigo}/')
+                force_authenticate(requisicao, usuario)
+                um(requisicao, codigo=codigo).render()
+
+            def api_lote():
+                requisicao = fabrica.post(
+                    '/api/produtos/codigos/', {'codigos': random.sample(codigos, options['lote'])}, format='json'
+                )
+                force_authenticate(requisicao, usuario)
+                lote(requisicao).render()
+
+            def depois_de_escrita():
+                # Nova versão, como a de uma venda confirmada: a leitura relê os alterados
+                _escrita_confirmada(False)
+                indice.buscar([random.choice(codigos)])
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Tempo no servidor (µs)'))
+            self.stdout.write(f"{'leitura':<30}{'mediana':>10}{'p99':>10}")
+            for nome, leitura in [
+                ('índice', lambda: indice.buscar([random.choice(codigos)])),
+                ('API, um código', api_um),
+                (f'API, lote de {options["lote"]}', api_lote),
+                ('índice após escrita', depois_de_escrita),
+            ]:
+                duracoes = self._medir(leitura, options['repeticoes'])
+                self.stdout.write(
+                    f'{nome:<30}{statistics.median(duracoes):>10.0f}'
+                    f'{statistics.quantiles(duracoes, n=100)[-1]:>10.0f}'
+                )
+            transaction.set_rollback(True)
+        # O índice do processo tem os produtos desfeitos
+        indice.carregar()
+
+    def _criar_dados(self, quantidade):
+        categoria = Categoria.objects.create(nome='Bench')
+        marca = Marca.objects.create(nome='Bench')
+        codigos = [f'789{i:010d}' for i in random.sample(range(10 ** 10), quantidade)]
+        for inicio in range(0, quantidade, 5000):
+            Produto.objects.bulk_create([
+                Produto(
+                    nome=f'Produto {codigo}', descricao='-', codigo_barras=codigo,
+                    categoria=categoria, marca=marca,
+                    preco=Decimal(random.randint(100, 100000)) / 100, estoque=random.randint(0, 50),
+                )
+                for codigo in codigos[inicio:inicio + 5000]
+            ])
+        # data_atualizacao é auto_now: a carga fica no passado, fora da MARGEM
+        # da releitura, como um catálogo que não muda a cada minuto
+        Produto.objects.filter(categoria=categoria).update(data_atualizacao=timezone.now() - timedelta(days=1))
+        return codigos
+
+    def _medir(self, leitura, repeticoes):
+        duracoes = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            leitura()
+            duracoes.append((time.perf_counter() - inicio) * 10 ** 6)
+        return duracoes
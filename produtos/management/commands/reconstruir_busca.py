@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from produtos.busca import garantir_indice, reconstruir_indice
+from produtos.models import Produto
+
+
+class Command(BaseCommand):
+    help = 'Recria os triggers que faltarem e regrava o índice de busca textual de produtos (SQLite)'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('A busca textual só usa índice no SQLite; nada a reconstruir.')
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            if garantir_indice():
+                # garantir_indice() já regravou o índice inteiro
+                self.stdout.write('Tabela e triggers da busca recriados.')
+                total = Produto.objects.count()
+            else:
+                total = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} produtos indexados em {time.perf_counter() - inicio:.3f}s'
+        ))
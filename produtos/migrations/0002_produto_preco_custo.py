@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='preco_custo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Preço de Custo'),
+        ),
+    ]
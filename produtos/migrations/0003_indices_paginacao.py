@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0002_produto_preco_custo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['-data_cadastro', 'id'], name='produto_cadastro_id_idx'),
+        ),
+    ]
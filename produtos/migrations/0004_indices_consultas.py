@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0003_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['-data_cadastro', 'id'], name='produto_ativo_cadastro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['categoria', '-data_cadastro', 'id'], name='produto_ativo_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['marca', '-data_cadastro', 'id'], name='produto_ativo_marca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['tipo', '-data_cadastro', 'id'], name='produto_ativo_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['estoque', 'estoque_minimo'], name='produto_estoque_idx'),
+        ),
+    ]
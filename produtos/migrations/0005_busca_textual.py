@@ -0,0 +1,110 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:47
+
+import django.db.models.deletion
+import produtos.models
+from django.db import migrations, models
+
+
+# Tabela FTS5 e triggers da busca de produtos (só no SQLite, ver produtos/busca.py).
+# O SQL fica aqui, congelado como estava nesta migração: produtos/busca.py
+# pode mudar sem alterar o que esta migração cria.
+
+VALORES = (
+    "{p}.nome, {p}.modelo, "
+    "(SELECT nome FROM produtos_marca WHERE id = {p}.marca_id), "
+    "(SELECT nome FROM produtos_categoria WHERE id = {p}.categoria_id), "
+    "{p}.codigo_barras, {p}.descricao"
+)
+COLUNAS = 'rowid, nome, modelo, marca, categoria, codigo_barras, descricao'
+
+CRIAR_TABELA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS produtos_busca USING fts5(
+        nome, modelo, marca, categoria, codigo_barras, descricao,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    "INSERT INTO produtos_busca (produtos_busca, rank) VALUES ('rank', 'bm25(10.0, 5.0, 4.0, 3.0, 8.0, 1.0)')",
+]
+
+TRIGGERS = {
+    'produtos_busca_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS produtos_busca_insert AFTER INSERT ON produtos_produto
+        BEGIN
+            INSERT INTO produtos_busca ({COLUNAS}) VALUES (new.id, {VALORES.format(p='new')});
+        END
+    """,
+    'produtos_busca_update': f"""
+        CREATE TRIGGER IF NOT EXISTS produtos_busca_update
+        AFTER UPDATE OF nome, modelo, marca_id, categoria_id, codigo_barras, descricao ON produtos_produto
+        BEGIN
+            DELETE FROM produtos_busca WHERE rowid = old.id;
+            INSERT INTO produtos_busca ({COLUNAS}) VALUES (new.id, {VALORES.format(p='new')});
+        END
+    """,
+    'produtos_busca_delete': """
+        CREATE TRIGGER IF NOT EXISTS produtos_busca_delete AFTER DELETE ON produtos_produto
+        BEGIN
+            DELETE FROM produtos_busca WHERE rowid = old.id;
+        END
+    """,
+    'produtos_busca_marca': """
+        CREATE TRIGGER IF NOT EXISTS produtos_busca_marca AFTER UPDATE OF nome ON produtos_marca
+        BEGIN
+            UPDATE produtos_busca SET marca = new.nome
+            WHERE rowid IN (SELECT id FROM produtos_produto WHERE marca_id = new.id);
+        END
+    """,
+    'produtos_busca_categoria': """
+        CREATE TRIGGER IF NOT EXISTS produtos_busca_categoria AFTER UPDATE OF nome ON produtos_categoria
+        BEGIN
+            UPDATE produtos_busca SET categoria = new.nome
+            WHERE rowid IN (SELECT id FROM produtos_produto WHERE categoria_id = new.id);
+        END
+    """,
+}
+
+PREENCHER = [
+    "DELETE FROM produtos_busca",
+    f"INSERT INTO produtos_busca ({COLUNAS}) SELECT p.id, {VALORES.format(p='p')} FROM produtos_produto p",
+    "INSERT INTO produtos_busca (produtos_busca) VALUES ('optimize')",
+]
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CRIAR_TABELA + list(TRIGGERS.values()) + PREENCHER:
+            cursor.execute(sql)
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for nome in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {nome}')
+        cursor.execute('DROP TABLE IF EXISTS produtos_busca')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0004_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProdutoBusca',
+            fields=[
+                ('produto', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='busca', serialize=False, to='produtos.produto')),
+                ('documento', produtos.models.CampoBusca(db_column='produtos_busca')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'produtos_busca',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
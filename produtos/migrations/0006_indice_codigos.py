@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0005_busca_textual'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['data_atualizacao'], name='produto_atualizacao_idx'),
+        ),
+    ]
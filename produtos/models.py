@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Lookup, Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 
@@ -71,6 +73,13 @@ class Produto(models.Model):
         null=True,
         verbose_name=_('Preço Promocional')
     )
+    preco_custo = models.DecimalField(
+        max_digits=10, 
+        decimal_places=2, 
+        blank=True, 
+        null=True,
+        verbose_name=_('Preço de Custo')
+    )
     estoque = models.PositiveIntegerField(
         default=0,
         validators=[MinValueValidator(0)],
@@ -102,6 +111,19 @@ class Produto(models.Model):
         verbose_name = _('Produto')
         verbose_name_plural = _('Produtos')
         ordering = ['-data_cadastro']
+        indexes = [
+            models.Index(fields=['-data_cadastro', 'id'], name='produto_cadastro_id_idx'),
+            # Catálogo (só ativos), com ou sem filtro, na ordem da paginação.
+            # Parciais: só os produtos ativos entram no índice
+            models.Index(fields=['-data_cadastro', 'id'], condition=Q(ativo=True), name='produto_ativo_cadastro_idx'),
+            models.Index(fields=['categoria', '-data_cadastro', 'id'], condition=Q(ativo=True), name='produto_ativo_categoria_idx'),
+            models.Index(fields=['marca', '-data_cadastro', 'id'], condition=Q(ativo=True), name='produto_ativo_marca_idx'),
+            models.Index(fields=['tipo', '-data_cadastro', 'id'], condition=Q(ativo=True), name='produto_ativo_tipo_idx'),
+            # Contagens de estoque (zerado, baixo) lidas só do índice
+            models.Index(fields=['estoque', 'estoque_minimo'], name='produto_estoque_idx'),
+            # Releitura dos produtos alterados pelo índice de códigos de barras
+            models.Index(fields=['data_atualizacao'], name='produto_atualizacao_idx'),
+        ]
     
     def __str__(self):
         return f"{self.marca.nome} {self.nome} - {self.modelo}"
@@ -123,18 +145,27 @@ class Produto(models.Model):
         """
         Atualiza o estoque do produto
         tipo_operacao: 'venda' (diminui) ou 'compra' (aumenta)
+        
+        A alteração é um UPDATE condicional no banco: a venda só baixa o
+        estoque se ainda houver quantidade suficiente, e os demais campos
+        (preço etc.) não são regravados.
         """
+        produtos = Produto.objects.filter(pk=self.pk)
         if tipo_operacao == 'venda':
-            if self.estoque >= quantidade:
-                self.estoque -= quantidade
-                self.save()
-                return True
-            return False
+            produtos = produtos.filter(estoque__gte=quantidade)
+            estoque = F('estoque') - quantidade
         elif tipo_operacao == 'compra':
-            self.estoque += quantidade
-            self.save()
-            return True
-        return False
+            estoque = F('estoque') + quantidade
+        else:
+            return False
+        
+        from .signals import produtos_alterados
+        
+        if not produtos.update(estoque=estoque, data_atualizacao=timezone.now()):
+            return False
+        produtos_alterados.send(sender=Produto, ids=[self.pk])
+        self.refresh_from_db(fields=['estoque', 'data_atualizacao'])
+        return True
 
 class ImagemProduto(models.Model):
     produto = models.ForeignKey(
@@ -154,3 +185,34 @@ class ImagemProduto(models.Model):
     
     def __str__(self):
         return f"Imagem {self.ordem} - {self.produto.nome}"
+
+class CampoBusca(models.TextField):
+    """Coluna oculta de uma tabela FTS5 (mesmo nome da tabela), alvo do MATCH"""
+
+@CampoBusca.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+class ProdutoBusca(models.Model):
+    """
+    Linha do índice de busca textual de um produto: tabela virtual FTS5
+    do SQLite, criada e mantida pelo banco (ver produtos/busca.py)
+    """
+    produto = models.OneToOneField(
+        Produto,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='busca',
+    )
+    documento = CampoBusca(db_column='produtos_busca')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'produtos_busca'
@@ -0,0 +1,43 @@
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .busca import garantir_indice, indice_disponivel
+from .catalogo import invalidar_catalogo
+from .codigos import invalidar_codigos
+from .models import Produto, Categoria, Marca, ImagemProduto
+
+
+# Enviado depois de um update() em produtos (estoque, ativo), que não passa
+# pelo post_save; argumento: ids, os produtos alterados
+produtos_alterados = Signal()
+
+
+# Migrações do SQLite que recriam a tabela de produtos (AlterField etc.)
+# apagam os triggers da busca textual; eles voltam depois de cada migrate.
+
+@receiver(post_migrate)
+def recriar_indice_busca(sender, using='default', **kwargs):
+    # Sem a tabela (banco sem a migração 0005 ou outro banco) não há o que recriar
+    if sender.name == 'produtos' and indice_disponivel(using):
+        garantir_indice(using)
+
+@receiver(post_save, sender=Produto)
+@receiver(produtos_alterados)
+def atualizar_indice_codigos(sender, **kwargs):
+    invalidar_codigos()
+
+@receiver(post_delete, sender=Produto)
+def recarregar_indice_codigos(sender, **kwargs):
+    invalidar_codigos(recarregar=True)
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Marca)
+@receiver(post_delete, sender=Marca)
+@receiver(post_save, sender=ImagemProduto)
+@receiver(post_delete, sender=ImagemProduto)
+@receiver(produtos_alterados)
+def atualizar_catalogo(sender, **kwargs):
+    invalidar_catalogo()
@@ -1,3 +1,147 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+
+from sincronizacao.models import Alteracao
+from usuarios.models import Usuario
+from .busca import buscar
+from . import codigos
+from .codigos import IndiceCodigos
+from .models import Produto, Categoria, Marca
+
+
+class BuscaProdutosTests(TestCase):
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nome='Pneus')
+        self.marca = Marca.objects.create(nome='Genérica')
+
+    def _produto(self, nome, descricao='-'):
+        return Produto.objects.create(
+            nome=nome, descricao=descricao, categoria=self.categoria, marca=self.marca, preco=Decimal('10.00'),
+        )
+
+    def test_produto_antigo_continua_encontrado(self):
+        antigo = self._produto('Pneu Honda CG 160')
+        for i in range(30):
+            self._produto(f'Câmara {i}', descricao='Para pneu aro 18')
+
+        encontrados = list(buscar(Produto.objects.all(), 'pneu'))
+        self.assertEqual(len(encontrados), 31)
+        # O nome pesa mais que a descrição no bm25
+        self.assertEqual(encontrados[0], antigo)
+        self.assertEqual(list(buscar(Produto.objects.all(), 'pneu honda')), [antigo])
+
+    def test_acentos_e_prefixo(self):
+        produto = self._produto('Acessório para guidão')
+        self.assertEqual(list(buscar(Produto.objects.all(), 'acessorio gui')), [produto])
+
+
+class AcoesAdminTests(TestCase):
+    def setUp(self):
+        admin = Usuario.objects.create_superuser(username='admin', password='x', cpf='1')
+        self.client.force_login(admin)
+        self.produto = Produto.objects.create(
+            nome='Pneu', descricao='-', categoria=Categoria.objects.create(nome='Pneus'),
+            marca=Marca.objects.create(nome='Genérica'), preco=Decimal('10.00'), codigo_barras='789',
+        )
+
+    def _acao(self, acao):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:produtos_produto_changelist'), {
+                'action': acao, '_selected_action': [self.produto.pk],
+            })
+
+    def test_inativar_em_lote_avisa_indice_e_sincronizacao(self):
+        # O índice deste processo, avisado das escritas confirmadas
+        indice = IndiceCodigos()
+        indice.carregar()
+        self.enterContext(mock.patch.object(codigos, 'indice', indice))
+        alteracoes = Alteracao.objects.filter(tabela='produtos', objeto_id=self.produto.pk).count()
+
+        self._acao('marcar_inativos')
+        self.produto.refresh_from_db()
+        self.assertFalse(self.produto.ativo)
+        self.assertEqual(indice.buscar(['789']), {})
+        self.assertEqual(
+            Alteracao.objects.filter(tabela='produtos', objeto_id=self.produto.pk).count(), alteracoes + 1,
+        )
+
+        self._acao('marcar_ativos')
+        self.assertIn('789', indice.buscar(['789']))
+
+
+class IndiceCodigosTests(TestCase):
+    def setUp(self):
+        self.produto = Produto.objects.create(
+            nome='Pneu', descricao='-', categoria=Categoria.objects.create(nome='Pneus'),
+            marca=Marca.objects.create(nome='Genérica'), preco=Decimal('10.00'), codigo_barras='789',
+        )
+
+    def _alterar_preco(self, preco):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produto.preco = preco
+            self.produto.save()
+
+    def test_escrita_relida_sem_alterar_o_dicionario_em_uso(self):
+        # Índice de outro processo, que confere a versão a cada leitura
+        indice = IndiceCodigos()
+        indice.carregar()
+        em_uso = indice.produtos
+
+        self._alterar_preco(Decimal('12.00'))
+        with mock.patch.object(codigos, 'INTERVALO', 0):
+            self.assertEqual(indice.buscar(['789'])['789']['preco'], '12.00')
+        self.assertEqual(em_uso['789']['preco'], '10.00')
+
+    def test_versao_conferida_no_maximo_a_cada_intervalo(self):
+        indice = IndiceCodigos()
+        indice.carregar()
+        self._alterar_preco(Decimal('12.00'))
+
+        # Outro processo: até o INTERVALO passar, lê da memória sem consultar o cache
+        with self.assertNumQueries(0):
+            self.assertEqual(indice.buscar(['789'])['789']['preco'], '10.00')
+        with mock.patch.object(codigos.time, 'monotonic', return_value=time.monotonic() + codigos.INTERVALO):
+            self.assertEqual(indice.buscar(['789'])['789']['preco'], '12.00')
+
+    def test_processo_da_escrita_avisado_na_hora(self):
+        with mock.patch.object(codigos, 'indice', IndiceCodigos()) as indice:
+            indice.carregar()
+            self._alterar_preco(Decimal('12.00'))
+            self.assertEqual(indice.buscar(['789'])['789']['preco'], '12.00')
+            with self.assertNumQueries(0):
+                indice.buscar(['789'])
+
+
+class CatalogoTests(TestCase):
+    def setUp(self):
+        # As respostas de outros testes ficam no cache local do processo
+        caches['local'].clear()
+        self.client.force_login(Usuario.objects.create_user(username='u', password='x', cpf='1'))
+        self.produto = Produto.objects.create(
+            nome='Pneu', descricao='-', categoria=Categoria.objects.create(nome='Pneus'),
+            marca=Marca.objects.create(nome='Genérica'), preco=Decimal('10.00'),
+        )
+
+    def test_escrita_troca_o_etag(self):
+        resposta = self.client.get('/api/produtos/')
+        etag = resposta['ETag']
+        self.assertEqual(self.client.get('/api/produtos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produto.preco = Decimal('12.00')
+            self.produto.save()
+        self.assertEqual(self.client.get('/api/produtos/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
 
-# Create your tests here.
+    def test_custo_fora_da_api(self):
+        self.produto.preco_custo = Decimal('6.00')
+        self.produto.save()
+        self.assertNotIn('preco_custo', self.client.get(f'/api/produtos/{self.produto.pk}/').json())
+        resposta = self.client.patch(f'/api/produtos/{self.produto.pk}/', {'preco_custo': '1.00'}, content_type='application/json')
+        self.assertEqual(resposta.status_code, 200)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.preco_custo, Decimal('6.00'))
@@ -5,12 +5,16 @@ from django.http import JsonResponse
 from django.views import View
 from django.db.models import F
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from rpm_motos.paginacao import PaginacaoKeyset
+from .busca import BuscaProdutos, buscar, ordem_relevancia
+from .catalogo import resposta_catalogo, ultima_alteracao
+from .codigos import MAX_CODIGOS, buscar_codigo, buscar_codigos
 from .models import Produto, Categoria, Marca, ImagemProduto
 from .api.serializers import (
     ProdutoSerializer, 
@@ -26,8 +30,11 @@ from .forms import ProdutoForm, CategoriaForm, MarcaForm
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def lista_produtos_api(request):
-    """API para listar produtos"""
-    produtos = Produto.objects.filter(ativo=True)
+    """API para listar produtos (em cache por versão do catálogo, ver produtos/catalogo.py)"""
+    return resposta_catalogo(request, lambda: _listar_produtos(request))
+
+def _listar_produtos(request):
+    produtos = Produto.objects.filter(ativo=True).select_related('categoria', 'marca')
     
     # Filtros
     categoria_id = request.GET.get('categoria')
@@ -42,10 +49,14 @@ def lista_produtos_api(request):
     if tipo:
         produtos = produtos.filter(tipo=tipo)
     if search:
-        produtos = produtos.filter(nome__icontains=search)
+        produtos = buscar(produtos, search)
     
-    serializer = ProdutoListSerializer(produtos, many=True)
-    return Response(serializer.data)
+    paginador = PaginacaoKeyset()
+    pagina = paginador.paginate_queryset(
+        produtos.order_by(*(ordem_relevancia(search) or ['-data_cadastro', 'id'])), request
+    )
+    serializer = ProdutoListSerializer(pagina, many=True)
+    return paginador.get_paginated_response(serializer.data).data, ultima_alteracao(pagina)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -106,21 +117,26 @@ def deletar_produto_api(request, pk):
 @permission_classes([IsAuthenticated])
 def estoque_produtos_api(request):
     """API para listar estoque dos produtos"""
-    produtos = Produto.objects.all()
-    serializer = ProdutoEstoqueSerializer(produtos, many=True)
-    return Response(serializer.data)
+    paginador = PaginacaoKeyset()
+    pagina = paginador.paginate_queryset(Produto.objects.order_by('-data_cadastro', 'id'), request)
+    serializer = ProdutoEstoqueSerializer(pagina, many=True)
+    return paginador.get_paginated_response(serializer.data)
 
 # Class Based Views (CBV)
 class ProdutoViewSet(ModelViewSet):
     """ViewSet para gerenciar produtos"""
-    queryset = Produto.objects.all()
+    queryset = Produto.objects.select_related('categoria', 'marca')
     serializer_class = ProdutoSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [BuscaProdutos, OrderingFilter]
     filterset_fields = ['categoria', 'marca', 'tipo', 'ativo']
-    search_fields = ['nome', 'descricao', 'modelo']
     ordering_fields = ['nome', 'preco', 'data_cadastro']
-    ordering = ['-data_cadastro']
+    
+    @property
+    def ordering(self):
+        """Com ?search=, do mais relevante para o menos (ver produtos/busca.py)"""
+        busca = self.request.query_params.get(BuscaProdutos.search_param) if getattr(self, 'request', None) else None
+        return ordem_relevancia(busca) or ['-data_cadastro', 'id']
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -128,6 +144,34 @@ class ProdutoViewSet(ModelViewSet):
         elif self.action == 'retrieve':
             return ProdutoDetailSerializer
         return ProdutoSerializer
+    
+    def list(self, request, *args, **kwargs):
+        """Lista em cache por versão do catálogo, com ETag (ver produtos/catalogo.py)"""
+        return resposta_catalogo(request, self._listar)
+    
+    def _listar(self):
+        pagina = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        serializer = self.get_serializer(pagina, many=True)
+        return self.get_paginated_response(serializer.data).data, ultima_alteracao(pagina)
+    
+    @action(detail=False, methods=['get'], url_path=r'codigo/(?P<codigo>[^/]+)')
+    def codigo(self, request, codigo=None):
+        """Produto ativo pelo código de barras lido no caixa (índice em memória, ver produtos/codigos.py)"""
+        produto = buscar_codigo(codigo)
+        if produto is None:
+            return Response({'error': 'Código de barras não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(produto)
+    
+    @action(detail=False, methods=['post'])
+    def codigos(self, request):
+        """Vários códigos lidos de uma vez: {"codigos": ["789...", ...]}"""
+        codigos = request.data.get('codigos')
+        if not isinstance(codigos, list) or not all(isinstance(codigo, str) for codigo in codigos):
+            return Response({'error': 'Envie {"codigos": [lista de códigos]}.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(codigos) > MAX_CODIGOS:
+            return Response({'error': f'No máximo {MAX_CODIGOS} códigos por leitura.'}, status=status.HTTP_400_BAD_REQUEST)
+        encontrados, nao_encontrados = buscar_codigos(codigos)
+        return Response({'produtos': encontrados, 'nao_encontrados': nao_encontrados})
 
 class CategoriaViewSet(ModelViewSet):
     """ViewSet para gerenciar categorias"""
@@ -158,9 +202,10 @@ class ProdutoAPIView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
         else:
-            produtos = Produto.objects.filter(ativo=True)
-            serializer = ProdutoListSerializer(produtos, many=True)
-            return Response(serializer.data)
+            paginador = PaginacaoKeyset()
+            pagina = paginador.paginate_queryset(Produto.objects.filter(ativo=True).select_related('categoria', 'marca').order_by('-data_cadastro', 'id'), request)
+            serializer = ProdutoListSerializer(pagina, many=True)
+            return paginador.get_paginated_response(serializer.data)
     
     def post(self, request):
         """Criar novo produto"""
@@ -201,7 +246,7 @@ class ProdutoAPIView(APIView):
 @login_required
 def lista_produtos(request):
     """Lista de produtos para template"""
-    produtos = Produto.objects.filter(ativo=True)
+    produtos = Produto.objects.filter(ativo=True).select_related('categoria', 'marca')
     categorias = Categoria.objects.filter(ativo=True)
     marcas = Marca.objects.all()
     
@@ -218,7 +263,7 @@ def lista_produtos(request):
     if tipo:
         produtos = produtos.filter(tipo=tipo)
     if search:
-        produtos = produtos.filter(nome__icontains=search)
+        produtos = buscar(produtos, search)
     
     context = {
         'produtos': produtos,
@@ -279,7 +324,7 @@ def editar_produto(request, pk):
 @login_required
 def estoque_produtos(request):
     """Página de controle de estoque"""
-    produtos = Produto.objects.all().order_by('nome')
+    produtos = Produto.objects.select_related('categoria', 'marca').order_by('nome')
     categorias = Categoria.objects.filter(ativo=True)
     
     # Calcular estatísticas do estoque
@@ -0,0 +1,51 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.shortcuts import render
+
+
+# Apoio às views assíncronas: consultas simultâneas e renderização.
+# O ORM assíncrono do Django (acount, aaggregate, ...) ainda executa cada
+# consulta na mesma thread compartilhada, uma depois da outra, então um
+# asyncio.gather sobre elas não sobrepõe nada no banco. Aqui cada consulta
+# roda numa thread do executor com a sua própria conexão; as conexões são
+# liberadas ao final como no fim de uma requisição (CONN_MAX_AGE vale igual).
+#
+# Dentro de uma transação (testes, ATOMIC_REQUESTS) as outras conexões não
+# enxergariam o que ainda não foi confirmado: as consultas rodam então em
+# sequência na conexão da transação.
+
+def _isolada(consulta):
+    def executar():
+        close_old_connections()
+        try:
+            return consulta()
+        finally:
+            close_old_connections()
+    return executar
+
+def _em_transacao(using):
+    return connections[using].in_atomic_block
+
+async def em_paralelo(*consultas, using=DEFAULT_DB_ALIAS):
+    """
+    Executa as funções de consulta (síncronas, sem argumentos) ao mesmo
+    tempo e devolve os resultados na mesma ordem, ex.:
+
+        produtos, vendas = await em_paralelo(Produto.objects.count, Venda.objects.count)
+    """
+    if await sync_to_async(_em_transacao)(using):
+        return await sync_to_async(lambda: [consulta() for consulta in consultas])()
+    return await asyncio.gather(*(
+        sync_to_async(_isolada(consulta), thread_sensitive=False)() for consulta in consultas
+    ))
+
+async def renderizar(request, template_name, context=None):
+    """
+    render() para views assíncronas. O template roda fora do loop de eventos
+    (pode acessar o banco) e reaproveita o usuário já carregado por
+    request.auser(), em vez de o request.user preguiçoso buscá-lo de novo.
+    """
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, template_name, context)
@@ -0,0 +1,145 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# Instrumentação das consultas SQL para desenvolvimento e testes: conta as
+# consultas e o tempo de banco de cada requisição, aponta consultas repetidas
+# com o mesmo formato (o sinal típico de N+1) e confere orçamentos por view.
+#
+# Configuração em settings.py (nomes de URL com namespace, ex. 'vendas:lista'):
+#
+#     MONITOR_CONSULTAS = {
+#         'ATIVO': DEBUG,
+#         'ESTRITO': False,         # True levanta OrcamentoExcedido (testes)
+#         'REPETICOES': 3,          # mesmo formato N vezes na requisição = N+1
+#         'ORCAMENTO_PADRAO': 30,   # None = sem limite
+#         'ORCAMENTOS': {'vendas:lista': 8},
+#     }
+#
+# Respostas em streaming só têm contadas as consultas feitas antes do envio.
+
+MONITOR_PADRAO = {
+    'ATIVO': False,
+    'ESTRITO': False,
+    'REPETICOES': 3,
+    'ORCAMENTO_PADRAO': None,
+    'ORCAMENTOS': {},
+}
+
+def configuracao():
+    return {**MONITOR_PADRAO, **getattr(settings, 'MONITOR_CONSULTAS', {})}
+
+def orcamento_view(nome_view):
+    """Orçamento de consultas declarado para a view (ou o padrão)"""
+    config = configuracao()
+    return config['ORCAMENTOS'].get(nome_view, config['ORCAMENTO_PADRAO'])
+
+_LISTA_PARAMETROS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+def formato_consulta(sql):
+    """O SQL sem os valores: listas IN de tamanhos diferentes viram a mesma"""
+    return _LISTA_PARAMETROS.sub('(%s, ...)', sql)
+
+class OrcamentoExcedido(AssertionError):
+    pass
+
+class RegistroConsultas:
+    """execute_wrapper que guarda cada consulta e a sua duração"""
+
+    def __init__(self):
+        self.consultas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas.append((sql, time.perf_counter() - inicio))
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    @property
+    def tempo(self):
+        return sum(duracao for sql, duracao in self.consultas)
+
+    def repetidas(self, minimo):
+        """[(formato, vezes)] dos formatos executados `minimo` vezes ou mais"""
+        contagem = Counter(formato_consulta(sql) for sql, duracao in self.consultas)
+        return [(formato, vezes) for formato, vezes in contagem.most_common() if vezes >= minimo]
+
+    def problemas(self, limite=None, repeticoes=None):
+        """Mensagens para orçamento excedido e consultas repetidas"""
+        mensagens = []
+        if limite is not None and self.total > limite:
+            mensagens.append(f'{self.total} consultas (orçamento {limite})')
+        if repeticoes:
+            for formato, vezes in self.repetidas(repeticoes):
+                mensagens.append(f'{vezes}x {formato[:300]}')
+        return mensagens
+
+@contextmanager
+def registrar_consultas():
+    """Registra as consultas feitas em todas as conexões dentro do bloco"""
+    registro = RegistroConsultas()
+    with ExitStack() as pilha:
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(registro))
+        yield registro
+
+@contextmanager
+def orcamento_consultas(limite, repeticoes=None, nome='bloco'):
+    """
+    Para testes: falha com OrcamentoExcedido se o bloco fizer mais de
+    `limite` consultas ou repetir um formato `repeticoes` vezes, ex.:
+
+        with orcamento_consultas(6, repeticoes=3, nome='vendas:lista'):
+            self.client.get(reverse('vendas:lista'))
+    """
+    with registrar_consultas() as registro:
+        yield registro
+    problemas = registro.problemas(limite, repeticoes)
+    if problemas:
+        raise OrcamentoExcedido(f'{nome}: ' + '; '.join(problemas))
+
+class MonitorConsultasMiddleware:
+    """
+    Acrescenta X-Consultas-SQL e X-Tempo-SQL às respostas e avisa (ou, no
+    modo estrito, falha) quando a view passa do orçamento ou repete consultas.
+    """
+
+    def __init__(self, get_response):
+        self.config = configuracao()
+        if not self.config['ATIVO']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with registrar_consultas() as registro:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        nome_view = match.view_name if match else request.path
+        response['X-Consultas-SQL'] = str(registro.total)
+        response['X-Tempo-SQL'] = f'{registro.tempo * 1000:.1f}ms'
+
+        problemas = registro.problemas(
+            self.config['ORCAMENTOS'].get(nome_view, self.config['ORCAMENTO_PADRAO']),
+            self.config['REPETICOES'],
+        )
+        if problemas:
+            mensagem = f'{request.method} {request.path} ({nome_view}): ' + '; '.join(problemas)
+            if self.config['ESTRITO']:
+                raise OrcamentoExcedido(mensagem)
+            logger.warning(mensagem)
+        return response
@@ -0,0 +1,169 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+# Paginação por chave (keyset) das APIs. O cursor guarda os valores de
+# ordenação do último registro da página, ex. (-data_venda, id), e a página
+# seguinte é um WHERE a partir deles, sem OFFSET nem COUNT(*): com um índice
+# na mesma ordem, a página 10.000 custa o mesmo que a primeira. A chave
+# primária entra sempre no fim da ordenação para desempatar.
+
+def _inverter(campo):
+    return campo[1:] if campo.startswith('-') else '-' + campo
+
+def _texto(valor):
+    """Valor de ordenação em forma serializável, sem perder precisão"""
+    if valor is None or isinstance(valor, (bool, int, str)):
+        return valor
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+class PaginacaoKeyset(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.tamanho = self.get_page_size(request)
+        self.ordenacao = self.get_ordering(request, queryset, view)
+        self.model = queryset.model
+
+        valores, reverso = self.decode_cursor(request)
+        ordenacao = [_inverter(campo) for campo in self.ordenacao] if reverso else self.ordenacao
+        if valores is not None:
+            queryset = queryset.filter(self._depois_de(ordenacao, valores))
+
+        pagina = list(queryset.order_by(*ordenacao)[:self.tamanho + 1])
+        ha_mais = len(pagina) > self.tamanho
+        del pagina[self.tamanho:]
+        if reverso:
+            pagina.reverse()
+
+        # Voltando uma página, sempre existe a seguinte (a de onde se veio)
+        self.tem_proxima = bool(pagina) and (valores is not None if reverso else ha_mais)
+        self.tem_anterior = bool(pagina) and (ha_mais if reverso else valores is not None)
+        self.primeiro = self._chave(pagina[0]) if pagina else None
+        self.ultimo = self._chave(pagina[-1]) if pagina else None
+        return pagina
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(tamanho, self.max_page_size) if tamanho > 0 else self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Ordenação da OrderingFilter da view (ou o `ordering` da view, do
+        queryset ou do Meta do modelo), com a chave primária no final.
+        """
+        ordenacao = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordenacao = backend().get_ordering(request, queryset, view)
+                break
+        if not ordenacao:
+            ordenacao = (getattr(view, 'ordering', None) or queryset.query.order_by
+                         or queryset.model._meta.ordering)
+        if isinstance(ordenacao, str):
+            ordenacao = [ordenacao]
+
+        pk = queryset.model._meta.pk.name
+        ordenacao = [campo.replace('pk', pk) if campo.lstrip('-') == 'pk' else campo
+                     for campo in ordenacao if isinstance(campo, str)]
+        if not any(campo.lstrip('-') == pk for campo in ordenacao):
+            ordenacao.append(pk)
+        return ordenacao
+
+    def get_next_link(self):
+        if not self.tem_proxima:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.ultimo, False))
+
+    def get_previous_link(self):
+        if not self.tem_anterior:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.primeiro, True))
+
+    def encode_cursor(self, valores, reverso):
+        dados = {'v': valores, 'r': int(reverso)}
+        return urlsafe_b64encode(json.dumps(dados, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request):
+        """
+        Valores do cursor convertidos para os tipos dos campos, e a direção.
+        Um cursor inválido ou adulterado é erro do pedido (400).
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            dados = json.loads(urlsafe_b64decode(cursor.encode()))
+            valores = dados['v']
+            if len(valores) != len(self.ordenacao):
+                raise ValueError
+            valores = [
+                None if valor is None else self._campo(campo).to_python(valor)
+                for campo, valor in zip(self.ordenacao, valores)
+            ]
+            return valores, bool(dados.get('r'))
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise ValidationError({'error': self.invalid_cursor_message})
+
+    def _campo(self, campo):
+        modelo = self.model
+        *relacoes, nome = campo.lstrip('-').split('__')
+        for relacao in relacoes:
+            modelo = modelo._meta.get_field(relacao).related_model
+        return modelo._meta.get_field(nome)
+
+    def _chave(self, obj):
+        valores = []
+        for campo in self.ordenacao:
+            valor = obj
+            for nome in campo.lstrip('-').split('__'):
+                valor = getattr(valor, nome, None)
+            valores.append(_texto(valor))
+        return valores
+
+    def _depois_de(self, ordenacao, valores):
+        """
+        Registros depois da chave `valores` na `ordenacao`, ex. para
+        (-data_venda, id): data_venda <= v AND (data_venda < v OR id > i).
+        O primeiro termo repetido em separado deixa o banco percorrer o
+        índice a partir da posição do cursor.
+        """
+        termos = []
+        iguais = {}
+        for campo, valor in zip(ordenacao, valores):
+            nome = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            termos.append(Q(**iguais, **{f'{nome}__{operador}': valor}))
+            iguais[nome] = valor
+        primeiro = ordenacao[0]
+        operador = 'lte' if primeiro.startswith('-') else 'gte'
+        return Q(**{f'{primeiro.lstrip("-")}__{operador}': valores[0]}) & reduce(or_, termos)
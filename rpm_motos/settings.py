@@ -36,10 +36,13 @@ INSTALLED_APPS = [
 'usuarios',
 'produtos',
 'vendas',
+'tarefas',
+'sincronizacao',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'rpm_motos.consultas.MonitorConsultasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +79,26 @@ DATABASES = {
     }
 }
 
+# Cache compartilhado por todos os processos do servidor: as versões do
+# dashboard, do catálogo e do índice de códigos e a trava do dashboard só
+# valem entre processos assim. A tabela é criada depois do migrate
+# (vendas/signals.py) ou com `python manage.py createcachetable`.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'rpm_motos_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Cache de cada processo, para respostas grandes guardadas sob uma versão
+    # do cache compartilhado (ver produtos/catalogo.py)
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rpm_motos',
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,10 +140,35 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'rpm_motos.paginacao.PaginacaoKeyset',
     'PAGE_SIZE': 10,
 }
 
+# Consultas SQL por requisição (ver rpm_motos/consultas.py)
+MONITOR_CONSULTAS = {
+    'ATIVO': DEBUG,
+    'REPETICOES': 3,
+    'ORCAMENTO_PADRAO': 30,
+    'ORCAMENTOS': {
+        # Recálculo do snapshot, com as vendas arquivadas e a trava e a
+        # gravação no cache compartilhado; lido do snapshot são 3
+        'vendas:dashboard': 21,
+        'vendas:lista': 3,
+        'venda-list': 3,
+        'cliente-list': 3,
+        # Catálogo: mais a leitura da versão no cache compartilhado
+        'produto-list': 4,
+        'produtos:lista_api': 4,
+    },
+}
+
+# Fila de tarefas em segundo plano (ver tarefas/fila.py), executada por
+# `python manage.py processar_tarefas`
+TAREFAS = {
+    'TRABALHADORES': 2,
+    'SINCRONO': False,
+}
+
 CORS_ALLOW_CREDENTIALS = True
 
 STATIC_URL = '/static/'
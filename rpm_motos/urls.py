@@ -8,6 +8,7 @@ from rest_framework.authtoken.views import obtain_auth_token
 from usuarios.api.views import UsuarioViewSet
 from produtos.views import ProdutoViewSet, CategoriaViewSet, MarcaViewSet
 from vendas.api.views import VendaViewSet, ClienteViewSet, FaturamentoViewSet
+from tarefas.api.views import TarefaViewSet
 
 router = routers.DefaultRouter()
 router.register(r'usuarios', UsuarioViewSet)
@@ -17,17 +18,20 @@ router.register(r'marcas', MarcaViewSet)
 router.register(r'vendas', VendaViewSet)
 router.register(r'clientes', ClienteViewSet)
 router.register(r'faturamento', FaturamentoViewSet)
+router.register(r'tarefas', TarefaViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/usuarios/', include('usuarios.api.urls')),
     path('api/', include(router.urls)),
     path('api/vendas/', include('vendas.api.urls')),
+    path('api/sincronizacao/', include('sincronizacao.api.urls')),
     path('api/auth/', include('rest_framework.urls')),
     path('api/token/', obtain_auth_token, name='api_token_auth'),
     path('', include('usuarios.urls')),
     path('produtos/', include('produtos.urls')),
     path('vendas/', include('vendas.urls')),
+    path('tarefas/', include('tarefas.urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,113 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from produtos.api.serializers import CategoriaSerializer, MarcaSerializer, ProdutoSincronizacaoSerializer
+from produtos.models import Produto, Categoria, Marca
+from vendas.api.serializers import ClienteSerializer
+from vendas.models import Cliente
+from .models import Alteracao
+
+
+# Sincronização incremental dos catálogos offline dos terminais (PDV).
+# Cada escrita em produtos, categorias, marcas e clientes grava uma Alteracao
+# (tabela, id do registro) na mesma transação da escrita (ver signals.py).
+# O terminal guarda o token devolvido, o id da última alteração que já
+# recebeu, e pede as seguintes: recebe o estado atual dos registros
+# alterados e, para os excluídos ou desativados, só o id (removidos). O
+# token 0 traz o catálogo inteiro (a migração registrou os já existentes).
+#
+# Ids são distribuídos na ordem das escritas, mas transações concorrentes
+# podem confirmar fora dessa ordem (no PostgreSQL; no SQLite as escritas são
+# serializadas): um id ainda não visível pode ser de uma transação aberta,
+# que ficaria para trás se o token passasse dele. Por isso a leitura para
+# antes de um buraco na sequência quando a alteração seguinte tem menos de
+# MARGEM; buracos mais antigos são de transações desfeitas ou da compactação.
+# Uma transação que fica aberta por mais tempo que isso pode ter o seu id
+# pulado: ao confirmar, se ela segurou as alterações por DEMORADA ou mais,
+# elas são gravadas de novo, com ids novos, logo depois do commit.
+# O token só avança, e uma alteração repetida só reenvia o mesmo estado.
+#
+# A compactação (compactar_alteracoes) apaga as alterações com outra mais
+# nova do mesmo registro: o log fica com uma linha por registro já gravado.
+
+MARGEM = timedelta(seconds=60)
+DEMORADA = MARGEM / 2
+LIMITE = 500
+MAX_LIMITE = 2000
+
+# tabela: (modelo, serializer, registros, campo que desativa o registro)
+TABELAS = {
+    'produtos': (
+        Produto, ProdutoSincronizacaoSerializer,
+        lambda: Produto.objects.prefetch_related('imagens'), 'ativo',
+    ),
+    'categorias': (Categoria, CategoriaSerializer, Categoria.objects.all, 'ativo'),
+    'marcas': (Marca, MarcaSerializer, Marca.objects.all, None),
+    'clientes': (Cliente, ClienteSerializer, Cliente.objects.all, 'ativo'),
+}
+
+def registrar(tabela, ids):
+    """Grava a alteração dos registros na transação atual"""
+    ids = list(ids)
+    Alteracao.objects.bulk_create([Alteracao(tabela=tabela, objeto_id=objeto_id) for objeto_id in ids])
+    if transaction.get_connection().in_atomic_block:
+        inicio = timezone.now()
+        transaction.on_commit(lambda: _registrar_demorada(tabela, ids, inicio))
+
+def _registrar_demorada(tabela, ids, inicio):
+    """Depois do commit: grava de novo as alterações seguradas por DEMORADA ou mais"""
+    if timezone.now() - inicio >= DEMORADA:
+        Alteracao.objects.bulk_create([Alteracao(tabela=tabela, objeto_id=objeto_id) for objeto_id in ids])
+
+def ler_alteracoes(token, limite=LIMITE, margem=MARGEM):
+    """
+    (novo token, {tabela: ids alterados}, há mais) das alterações depois do
+    token, até o limite e sem passar de um buraco recente na sequência
+    """
+    linhas = list(
+        Alteracao.objects.filter(id__gt=token).order_by('id')
+        .values_list('id', 'tabela', 'objeto_id', 'data')[:limite + 1]
+    )
+    mais = len(linhas) > limite
+    recente = timezone.now() - margem
+    alterados = defaultdict(set)
+    for alteracao_id, tabela, objeto_id, data in linhas[:limite]:
+        if alteracao_id != token + 1 and data > recente:
+            # O id que falta pode ser de uma transação ainda aberta
+            return token, alterados, False
+        alterados[tabela].add(objeto_id)
+        token = alteracao_id
+    return token, alterados, mais
+
+def sincronizar(token, limite=LIMITE, margem=MARGEM, context=None):
+    """Resposta da sincronização a partir do token (ver o início do módulo)"""
+    token, alterados, mais = ler_alteracoes(token, limite, margem)
+    resposta = {
+        'token': token,
+        'mais': mais,
+        'alterados': {tabela: [] for tabela in TABELAS},
+        'removidos': {tabela: [] for tabela in TABELAS},
+    }
+    for tabela, ids in alterados.items():
+        _, serializer, registros, campo_ativo = TABELAS[tabela]
+        ativos = registros().filter(pk__in=ids)
+        if campo_ativo:
+            ativos = ativos.filter(**{campo_ativo: True})
+        ativos = list(ativos.order_by('pk'))
+        resposta['alterados'][tabela] = serializer(ativos, many=True, context=context or {}).data
+        resposta['removidos'][tabela] = sorted(ids - {registro.pk for registro in ativos})
+    return resposta
+
+def compactar_alteracoes(margem=MARGEM):
+    """Apaga as alterações com outra mais nova do mesmo registro; devolve quantas"""
+    mais_nova = Alteracao.objects.filter(
+        tabela=OuterRef('tabela'), objeto_id=OuterRef('objeto_id'), id__gt=OuterRef('id'),
+    )
+    apagadas, _ = Alteracao.objects.filter(
+        Exists(mais_nova), data__lt=timezone.now() - margem,
+    ).delete()
+    return apagadas
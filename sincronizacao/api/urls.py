@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import sincronizacao_api
+
+app_name = 'sincronizacao'
+
+urlpatterns = [
+    path('', sincronizacao_api, name='alteracoes'),
+]
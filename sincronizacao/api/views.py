@@ -0,0 +1,30 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from sincronizacao.alteracoes import LIMITE, MAX_LIMITE, sincronizar
+
+
+def _inteiro(request, nome, padrao):
+    valor = request.query_params.get(nome, padrao)
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return valor if valor >= 0 else None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sincronizacao_api(request):
+    """
+    Alterações do catálogo dos terminais depois de ?token= (0 ou ausente:
+    tudo). Repita com o token devolvido enquanto "mais" for verdadeiro.
+    """
+    token = _inteiro(request, 'token', 0)
+    limite = _inteiro(request, 'limite', LIMITE)
+    if token is None:
+        return Response({'error': 'Token inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not limite:
+        return Response({'error': 'Limite inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(sincronizar(token, min(limite, MAX_LIMITE), context={'request': request}))
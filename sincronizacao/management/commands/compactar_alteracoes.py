@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sincronizacao.alteracoes import compactar_alteracoes
+from sincronizacao.models import Alteracao
+
+
+class Command(BaseCommand):
+    help = (
+        'Apaga do log de sincronização as alterações que têm outra mais nova do '
+        'mesmo registro. Os terminais não perdem nada: a mais nova traz o estado atual.'
+    )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        apagadas = compactar_alteracoes()
+        self.stdout.write(self.style.SUCCESS(
+            f'{apagadas} alterações apagadas em {time.perf_counter() - inicio:.3f}s; '
+            f'{Alteracao.objects.count()} no log.'
+        ))
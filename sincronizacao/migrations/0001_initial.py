@@ -0,0 +1,49 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# Registros existentes entram no log: o token 0 traz o catálogo inteiro
+MODELOS = {
+    'produtos': ('produtos', 'Produto'),
+    'categorias': ('produtos', 'Categoria'),
+    'marcas': ('produtos', 'Marca'),
+    'clientes': ('vendas', 'Cliente'),
+}
+
+def registrar_existentes(apps, schema_editor):
+    Alteracao = apps.get_model('sincronizacao', 'Alteracao')
+    for tabela, (app, modelo) in MODELOS.items():
+        ids = apps.get_model(app, modelo).objects.order_by('pk').values_list('pk', flat=True)
+        Alteracao.objects.bulk_create(
+            (Alteracao(tabela=tabela, objeto_id=objeto_id) for objeto_id in ids.iterator()), batch_size=1000
+        )
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('produtos', '0006_indice_codigos'),
+        ('vendas', '0009_busca_clientes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Alteracao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabela', models.CharField(choices=[('produtos', 'Produtos'), ('categorias', 'Categorias'), ('marcas', 'Marcas'), ('clientes', 'Clientes')], max_length=20, verbose_name='Tabela')),
+                ('objeto_id', models.BigIntegerField(verbose_name='Registro')),
+                ('data', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data')),
+            ],
+            options={
+                'verbose_name': 'Alteração',
+                'verbose_name_plural': 'Alterações',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['tabela', 'objeto_id', 'id'], name='alteracao_objeto_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Alteracao(models.Model):
+    """Escrita em um registro sincronizado com os terminais (ver sincronizacao/alteracoes.py)"""
+    TABELA_CHOICES = [
+        ('produtos', 'Produtos'),
+        ('categorias', 'Categorias'),
+        ('marcas', 'Marcas'),
+        ('clientes', 'Clientes'),
+    ]
+
+    tabela = models.CharField(max_length=20, choices=TABELA_CHOICES, verbose_name=_('Tabela'))
+    objeto_id = models.BigIntegerField(verbose_name=_('Registro'))
+    data = models.DateTimeField(default=timezone.now, verbose_name=_('Data'))
+
+    class Meta:
+        verbose_name = _('Alteração')
+        verbose_name_plural = _('Alterações')
+        ordering = ['id']
+        indexes = [
+            # Alterações mais novas do mesmo registro (compactação)
+            models.Index(fields=['tabela', 'objeto_id', 'id'], name='alteracao_objeto_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.tabela} {self.objeto_id}"
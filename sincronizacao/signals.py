@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from produtos.models import Produto, Categoria, Marca, ImagemProduto
+from produtos.signals import produtos_alterados
+from vendas.models import Cliente
+from .alteracoes import registrar
+
+
+# Alterações registradas para a sincronização dos terminais (ver alteracoes.py)
+TABELA_DO_MODELO = {Produto: 'produtos', Categoria: 'categorias', Marca: 'marcas', Cliente: 'clientes'}
+
+@receiver(post_save, sender=Produto)
+@receiver(post_delete, sender=Produto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Marca)
+@receiver(post_delete, sender=Marca)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def registrar_alteracao(sender, instance, **kwargs):
+    registrar(TABELA_DO_MODELO[sender], [instance.pk])
+
+@receiver(post_save, sender=ImagemProduto)
+@receiver(post_delete, sender=ImagemProduto)
+def registrar_imagem(sender, instance, **kwargs):
+    # As imagens vão junto com o produto
+    registrar('produtos', [instance.produto_id])
+
+@receiver(produtos_alterados)
+def registrar_produtos(sender, ids, **kwargs):
+    registrar('produtos', ids)
@@ -0,0 +1,280 @@
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import OperationalError, connections, transaction
+from django.test import TestCase, TransactionTestCase
+
+from produtos.models import Produto, Categoria, Marca
+from vendas.models import Cliente
+from vendas.services import EstoqueInsuficiente, reservar_estoque
+from .alteracoes import TABELAS, compactar_alteracoes, sincronizar
+from .models import Alteracao
+
+
+# Simulação de terminais sincronizando enquanto o catálogo muda: threads
+# escritoras fazem alterações aleatórias, algumas em transações demoradas ou
+# desfeitas, threads terminais puxam as alterações e a compactação roda
+# junto. Com as escritas paradas, cada terminal sincroniza mais uma vez e a
+# sua cópia tem de ser igual ao banco.
+
+class Desfazer(Exception):
+    """Desfaz a transação de uma escrita simulada"""
+
+
+def _esperado():
+    """Cópia que um terminal em dia deve ter: {tabela: {id: registro}}"""
+    copia = {}
+    for tabela, (_, serializer, registros, campo_ativo) in TABELAS.items():
+        ativos = registros()
+        if campo_ativo:
+            ativos = ativos.filter(**{campo_ativo: True})
+        copia[tabela] = {registro['id']: registro for registro in serializer(ativos, many=True).data}
+    return copia
+
+
+class Terminal:
+    def __init__(self, margem):
+        self.margem = margem
+        self.token = 0
+        self.copia = {tabela: {} for tabela in TABELAS}
+        self.removidos = {tabela: set() for tabela in TABELAS}
+        self.sincronizacoes = 0
+        self.erros = []
+
+    def sincronizar(self, limite=50):
+        while True:
+            resposta = sincronizar(self.token, limite, self.margem)
+            if resposta['token'] < self.token:
+                self.erros.append(f"token voltou de {self.token} para {resposta['token']}")
+            self.token = resposta['token']
+            for tabela, registros in resposta['alterados'].items():
+                for registro in registros:
+                    self.copia[tabela][registro['id']] = registro
+            for tabela, ids in resposta['removidos'].items():
+                for objeto_id in ids:
+                    self.copia[tabela].pop(objeto_id, None)
+                self.removidos[tabela].update(ids)
+            if not resposta['mais']:
+                break
+        self.sincronizacoes += 1
+
+
+class SimulacaoSincronizacaoTests(TransactionTestCase):
+    TERMINAIS = 6
+    ESCRITORES = 3
+    SEGUNDOS = 3
+    MARGEM = timedelta(seconds=0.5)
+
+    def setUp(self):
+        self.rng = random.Random(42)
+        self.contagem = {'confirmadas': 0, 'desfeitas': 0}
+        self.trava = threading.Lock()
+        categorias = [Categoria.objects.create(nome=f'Sim {i}') for i in range(5)]
+        marcas = [Marca.objects.create(nome=f'Sim {i}') for i in range(5)]
+        for i in range(100):
+            Produto.objects.create(
+                nome=f'Produto {i}', descricao='-', codigo_barras=f'789{i:010d}',
+                categoria=self.rng.choice(categorias), marca=self.rng.choice(marcas),
+                preco=Decimal(self.rng.randint(100, 100000)) / 100, estoque=self.rng.randint(0, 50),
+            )
+        for i in range(30):
+            Cliente.objects.create(
+                nome=f'Cliente {i}', cpf_cnpj=f'{i:011d}', telefone=f'(11) 9{i:08d}',
+                endereco='-', cidade='-', estado='SP', cep='-',
+            )
+
+    def test_terminais_alcancam_o_banco(self):
+        terminais = [Terminal(self.MARGEM) for _ in range(self.TERMINAIS)]
+        parar = threading.Event()
+        threads = [
+            threading.Thread(target=self._rodar, args=(self._escrever, parar, random.Random(self.rng.random())))
+            for _ in range(self.ESCRITORES)
+        ] + [
+            threading.Thread(target=self._rodar, args=(self._sincronizar, parar, random.Random(self.rng.random()), terminal))
+            for terminal in terminais
+        ] + [threading.Thread(target=self._rodar, args=(self._compactar, parar, None))]
+        for thread in threads:
+            thread.start()
+        time.sleep(self.SEGUNDOS)
+        parar.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertGreater(self.contagem['confirmadas'], 0)
+        self.assertGreater(self.contagem['desfeitas'], 0)
+        self.assertTrue(all(terminal.sincronizacoes > 1 for terminal in terminais))
+
+        # Com as escritas paradas e os buracos mais velhos que a margem, todos alcançam o banco
+        time.sleep(self.MARGEM.total_seconds())
+        self._conferir(terminais)
+
+        # Exclusões e desativações chegam aos terminais como removidos
+        produto = Produto.objects.filter(ativo=True).first()
+        cliente = Cliente.objects.filter(ativo=True).first()
+        categoria = Categoria.objects.filter(ativo=True).first()
+        for terminal in terminais:
+            self.assertIn(produto.pk, terminal.copia['produtos'])
+            self.assertIn(cliente.pk, terminal.copia['clientes'])
+            self.assertIn(categoria.pk, terminal.copia['categorias'])
+        produto_id = produto.pk
+        produto.delete()
+        cliente.ativo = False
+        cliente.save()
+        categoria.ativo = False
+        categoria.save()
+
+        time.sleep(self.MARGEM.total_seconds())
+        self._conferir(terminais)
+        for terminal in terminais:
+            self.assertIn(produto_id, terminal.removidos['produtos'])
+            self.assertIn(cliente.pk, terminal.removidos['clientes'])
+            self.assertIn(categoria.pk, terminal.removidos['categorias'])
+
+    def _conferir(self, terminais):
+        for terminal in terminais:
+            terminal.sincronizar()
+        esperado = _esperado()
+        for numero, terminal in enumerate(terminais, 1):
+            self.assertEqual(terminal.erros, [], f'terminal {numero}')
+            for tabela in TABELAS:
+                self.assertEqual(terminal.copia[tabela], esperado[tabela], f'terminal {numero}, {tabela}')
+
+    def _rodar(self, passo, parar, rng, *args):
+        try:
+            while not parar.is_set():
+                try:
+                    passo(rng, *args)
+                except OperationalError:
+                    # Banco ocupado: a escrita ou a leitura é perdida, como num servidor
+                    pass
+        finally:
+            connections.close_all()
+
+    def _contar(self, chave):
+        with self.trava:
+            self.contagem[chave] += 1
+
+    def _sincronizar(self, rng, terminal):
+        terminal.sincronizar()
+        time.sleep(rng.uniform(0, 0.2))
+
+    def _compactar(self, rng):
+        # Sem margem: também apaga alterações recentes, abrindo buracos novos na sequência
+        compactar_alteracoes(margem=timedelta(0))
+        time.sleep(0.3)
+
+    def _escrever(self, rng):
+        operacao = rng.choice([
+            self._preco, self._venda, self._venda, self._ativar_produto, self._novo_produto,
+            self._excluir_produto, self._categoria, self._marca, self._cliente, self._novo_cliente,
+        ])
+        try:
+            with transaction.atomic():
+                operacao(rng)
+                if rng.random() < 0.1:
+                    # Transação demorada: as dos outros escritores esperam
+                    time.sleep(rng.uniform(0.005, 0.03))
+                if rng.random() < 0.1:
+                    raise Desfazer
+            self._contar('confirmadas')
+        except Desfazer:
+            self._contar('desfeitas')
+        time.sleep(rng.uniform(0, 0.005))
+
+    def _sortear(self, rng, modelo):
+        ultimo = modelo.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        return modelo.objects.filter(pk=rng.randint(1, max(ultimo, 1))).first()
+
+    def _preco(self, rng):
+        produto = self._sortear(rng, Produto)
+        if produto:
+            produto.preco_promocional = None if rng.random() < 0.5 else (produto.preco * Decimal('0.9')).quantize(Decimal('0.01'))
+            produto.save()
+
+    def _venda(self, rng):
+        produto = self._sortear(rng, Produto)
+        if produto:
+            try:
+                reservar_estoque([(produto.pk, rng.randint(-2, 3))])
+            except EstoqueInsuficiente:
+                pass
+
+    def _ativar_produto(self, rng):
+        produto = self._sortear(rng, Produto)
+        if produto:
+            produto.ativo = not produto.ativo
+            produto.save()
+
+    def _novo_produto(self, rng):
+        Produto.objects.create(
+            nome=f'Novo {rng.randint(0, 10 ** 9)}', descricao='-',
+            categoria=self._sortear(rng, Categoria) or Categoria.objects.first(),
+            marca=self._sortear(rng, Marca) or Marca.objects.first(),
+            preco=Decimal(rng.randint(100, 100000)) / 100, estoque=rng.randint(0, 50),
+        )
+
+    def _excluir_produto(self, rng):
+        produto = self._sortear(rng, Produto)
+        if produto:
+            produto.delete()
+
+    def _categoria(self, rng):
+        categoria = self._sortear(rng, Categoria)
+        if categoria:
+            categoria.ativo = rng.random() < 0.8
+            categoria.descricao = f'Revisão {rng.randint(0, 10 ** 6)}'
+            categoria.save()
+
+    def _marca(self, rng):
+        marca = self._sortear(rng, Marca)
+        if marca:
+            marca.pais_origem = rng.choice(['Brasil', 'Japão', 'Itália', 'Alemanha'])
+            marca.save()
+
+    def _cliente(self, rng):
+        cliente = self._sortear(rng, Cliente)
+        if cliente:
+            cliente.telefone = f'(11) 9{rng.randint(0, 10 ** 8 - 1):08d}'
+            cliente.ativo = rng.random() < 0.9
+            cliente.save()
+
+    def _novo_cliente(self, rng):
+        numero = rng.randint(10 ** 9, 10 ** 11 - 1)
+        if not Cliente.objects.filter(cpf_cnpj=f'{numero:011d}').exists():
+            Cliente.objects.create(
+                nome=f'Cliente {numero}', cpf_cnpj=f'{numero:011d}', telefone='(11) 90000-0000',
+                endereco='-', cidade='-', estado='SP', cep='-',
+            )
+
+
+class TransacaoDemoradaTests(TestCase):
+    MARGEM = timedelta(seconds=0.2)
+
+    def setUp(self):
+        self.produto = Produto.objects.create(
+            nome='Pneu', descricao='-', categoria=Categoria.objects.create(nome='Pneus'),
+            marca=Marca.objects.create(nome='Genérica'), preco=Decimal('10.00'),
+        )
+
+    def test_escrita_aberta_alem_da_margem(self):
+        with mock.patch('sincronizacao.alteracoes.DEMORADA', self.MARGEM / 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.produto.preco = Decimal('12.00')
+                self.produto.save()
+                # Um terminal que leu enquanto a escrita estava aberta pode ter
+                # passado do seu id, já mais velho que a margem
+                pulada = Alteracao.objects.latest('id').pk
+                time.sleep(self.MARGEM.total_seconds() * 1.5)
+
+        resposta = sincronizar(pulada, margem=self.MARGEM)
+        self.assertEqual([registro['preco'] for registro in resposta['alterados']['produtos']], ['12.00'])
+
+    def test_escrita_rapida_registrada_uma_vez(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.produto.preco = Decimal('12.00')
+            self.produto.save()
+        self.assertEqual(Alteracao.objects.filter(tabela='produtos', objeto_id=self.produto.pk).count(), 2)
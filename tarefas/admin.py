@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Tarefa
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'nome', 'status', 'tentativas', 'criado_por', 'data_criacao', 'data_fim']
+    list_filter = ['status', 'nome', 'data_criacao']
+    search_fields = ['nome', 'trabalhador']
+    readonly_fields = ['data_criacao', 'data_inicio', 'data_fim', 'bloqueada_ate', 'trabalhador']
+    date_hierarchy = 'data_criacao'
+    ordering = ['-data_criacao']
@@ -0,0 +1,22 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+from tarefas.models import Tarefa
+
+class TarefaSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    url = serializers.HyperlinkedIdentityField(view_name='tarefa-detail')
+    arquivo = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Tarefa
+        fields = [
+            'id', 'url', 'nome', 'status', 'status_display', 'tentativas', 'max_tentativas',
+            'resultado', 'arquivo', 'erro', 'data_criacao', 'data_inicio', 'data_fim'
+        ]
+        read_only_fields = fields
+    
+    def get_arquivo(self, obj):
+        """Link de download do arquivo gerado pela tarefa"""
+        if not obj.arquivo:
+            return None
+        return reverse('tarefa-arquivo', kwargs={'pk': obj.pk}, request=self.context.get('request'))
@@ -0,0 +1,32 @@
+from django.http import FileResponse
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from tarefas.models import Tarefa
+from .serializers import TarefaSerializer
+
+def resposta_tarefa(tarefa, request):
+    """202 Accepted com a tarefa enfileirada e o endereço para acompanhá-la"""
+    dados = TarefaSerializer(tarefa, context={'request': request}).data
+    return Response(dados, status=status.HTTP_202_ACCEPTED, headers={'Location': dados['url']})
+
+class TarefaViewSet(viewsets.ReadOnlyModelViewSet):
+    """Acompanhamento das tarefas em segundo plano (proprietários veem todas)"""
+    queryset = Tarefa.objects.all()
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAuthenticated]
+    ordering = ['-data_criacao', '-id']
+    def get_queryset(self):
+        tarefas = Tarefa.visiveis_para(self.request.user)
+        status_tarefa = self.request.query_params.get('status')
+        if status_tarefa:
+            tarefas = tarefas.filter(status=status_tarefa)
+        return tarefas
+    @action(detail=True, methods=['get'])
+    def arquivo(self, request, pk=None):
+        """Download do arquivo gerado pela tarefa"""
+        tarefa = self.get_object()
+        if not tarefa.arquivo:
+            return Response({'error': 'A tarefa não gerou arquivo.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(tarefa.arquivo.open('rb'), as_attachment=True, filename=tarefa.arquivo.name.rsplit('/', 1)[-1])
@@ -0,0 +1,204 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+
+# Fila de tarefas no próprio banco, sem broker externo.
+# As operações demoradas são registradas com @tarefa('app.nome') no módulo
+# tarefas.py de cada app (carregado no ready() deste app) e enfileiradas com
+# enfileirar(); a requisição responde na hora com o id da tarefa e o
+# comando processar_tarefas as executa em threads e/ou processos.
+# Uma tarefa que falha volta para a fila com espera crescente até
+# MAX_TENTATIVAS; uma em execução há mais de TEMPO_LIMITE segundos é
+# considerada perdida (trabalhador morto) e pode ser pega de novo.
+#
+# Configuração opcional em settings.py:
+#
+#     TAREFAS = {
+#         'TRABALHADORES': 2,       # threads por processo do processar_tarefas
+#         'INTERVALO': 1.0,         # segundos entre buscas com a fila vazia
+#         'TEMPO_LIMITE': 600,
+#         'MAX_TENTATIVAS': 3,
+#         'ESPERA_TENTATIVA': 30,   # segundos antes da 2ª tentativa; dobra a cada nova
+#         'SINCRONO': False,        # True executa na própria requisição, sem trabalhador
+#     }
+
+TAREFAS_PADRAO = {
+    'TRABALHADORES': 2,
+    'INTERVALO': 1.0,
+    'TEMPO_LIMITE': 600,
+    'MAX_TENTATIVAS': 3,
+    'ESPERA_TENTATIVA': 30,
+    'SINCRONO': False,
+}
+
+def configuracao():
+    return {**TAREFAS_PADRAO, **getattr(settings, 'TAREFAS', {})}
+
+class TarefaInvalida(Exception):
+    """Erro que não se resolve tentando de novo: a tarefa falha na hora"""
+
+_registro = {}
+
+def tarefa(nome, max_tentativas=None):
+    """
+    Registra a função como tarefa. Ela recebe a Tarefa e os argumentos
+    enfileirados e devolve o resultado (serializável em JSON), ex.:
+
+        @tarefa('vendas.reconstruir_faturamento')
+        def reconstruir_faturamento(tarefa, data_inicio, data_fim):
+            ...
+    """
+    def registrar(funcao):
+        _registro[nome] = (funcao, max_tentativas)
+        return funcao
+    return registrar
+
+def enfileirar(nome, usuario=None, **argumentos):
+    """
+    Cria a tarefa pendente e a devolve. Dentro de uma transação, os
+    trabalhadores só a enxergam depois do commit.
+    """
+    if nome not in _registro:
+        raise KeyError(f'Tarefa não registrada: {nome}')
+    config = configuracao()
+    _, max_tentativas = _registro[nome]
+    nova = Tarefa.objects.create(
+        nome=nome,
+        argumentos=argumentos,
+        max_tentativas=max_tentativas or config['MAX_TENTATIVAS'],
+        criado_por=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+    if config['SINCRONO']:
+        transaction.on_commit(lambda: _executar_agora(nova.pk))
+    return nova
+
+def _executar_agora(pk):
+    tarefa = Tarefa.objects.get(pk=pk)
+    tarefa.status = 'executando'
+    tarefa.tentativas += 1
+    tarefa.trabalhador = 'sincrono'
+    tarefa.data_inicio = timezone.now()
+    tarefa.save(update_fields=['status', 'tentativas', 'trabalhador', 'data_inicio'])
+    executar(tarefa)
+
+def salvar_arquivo(tarefa, nome, linhas):
+    """
+    Grava as linhas (str) de um gerador no arquivo da tarefa, passando por
+    um arquivo temporário em vez da memória. O campo é gravado junto com o
+    resultado, ao final da execução.
+    """
+    with tempfile.TemporaryFile() as temporario:
+        for linha in linhas:
+            temporario.write(linha.encode('utf-8'))
+        temporario.seek(0)
+        tarefa.arquivo.save(nome, File(temporario), save=False)
+
+def executar(tarefa):
+    """Executa uma tarefa já reservada e grava o resultado ou a falha"""
+    funcao, _ = _registro.get(tarefa.nome, (None, None))
+    try:
+        if funcao is None:
+            raise TarefaInvalida(f'Tarefa não registrada: {tarefa.nome}')
+        if tarefa.tentativas > tarefa.max_tentativas:
+            raise TarefaInvalida('Tempo limite excedido em todas as tentativas.')
+        resultado = funcao(tarefa, **tarefa.argumentos)
+    except Exception as erro:
+        logger.exception('Tarefa #%s (%s) falhou na tentativa %s', tarefa.pk, tarefa.nome, tarefa.tentativas)
+        definitiva = isinstance(erro, TarefaInvalida) or tarefa.tentativas >= tarefa.max_tentativas
+        _finalizar(
+            tarefa,
+            status='falhou' if definitiva else 'pendente',
+            erro=traceback.format_exc(),
+            executar_em=timezone.now() + timedelta(
+                seconds=configuracao()['ESPERA_TENTATIVA'] * 2 ** (tarefa.tentativas - 1)
+            ),
+        )
+    else:
+        _finalizar(tarefa, status='concluida', resultado=resultado, erro='', arquivo=tarefa.arquivo.name or '')
+    return tarefa
+
+def _finalizar(tarefa, **campos):
+    """
+    Grava o desfecho se a tarefa ainda for deste trabalhador: se o tempo
+    limite passou e outro a pegou, o resultado antigo é descartado.
+    """
+    campos.update(bloqueada_ate=None)
+    if campos['status'] in Tarefa.FINALIZADAS:
+        campos['data_fim'] = timezone.now()
+    atualizadas = Tarefa.objects.filter(
+        pk=tarefa.pk, status='executando', tentativas=tarefa.tentativas,
+    ).update(**campos)
+    if atualizadas:
+        for campo, valor in campos.items():
+            setattr(tarefa, campo, valor)
+    else:
+        logger.warning('Tarefa #%s foi retomada por outro trabalhador; resultado descartado', tarefa.pk)
+
+class Trabalhador:
+    """Executa tarefas da fila até `parar` ser sinalizado"""
+
+    def __init__(self, parar, indice=0, intervalo=None, tempo_limite=None):
+        config = configuracao()
+        self.parar = parar
+        self.nome = f'{socket.gethostname()}:{os.getpid()}:{indice}'
+        self.intervalo = config['INTERVALO'] if intervalo is None else intervalo
+        self.tempo_limite = config['TEMPO_LIMITE'] if tempo_limite is None else tempo_limite
+        self.executadas = 0
+
+    def rodar(self, ate_esvaziar=False):
+        try:
+            while not self.parar.is_set():
+                # Cada tarefa é tratada como uma requisição: conexões vencidas
+                # ou quebradas são descartadas antes e depois dela
+                close_old_connections()
+                try:
+                    tarefa = Tarefa.pegar_proxima(self.nome, self.tempo_limite)
+                except DatabaseError:
+                    logger.exception('Trabalhador %s não conseguiu ler a fila', self.nome)
+                    self.parar.wait(self.intervalo)
+                    continue
+                if tarefa is None:
+                    if ate_esvaziar:
+                        break
+                    self.parar.wait(self.intervalo)
+                    continue
+                try:
+                    executar(tarefa)
+                except DatabaseError:
+                    # O desfecho não foi gravado: a tarefa volta para a fila
+                    # quando o bloqueio expirar
+                    logger.exception('Trabalhador %s não gravou a tarefa #%s', self.nome, tarefa.pk)
+                self.executadas += 1
+        finally:
+            close_old_connections()
+        return self.executadas
+
+def rodar_trabalhadores(quantidade, parar=None, ate_esvaziar=False, **opcoes):
+    """Roda `quantidade` trabalhadores em threads e devolve o total executado"""
+    parar = parar or threading.Event()
+    trabalhadores = [Trabalhador(parar, indice, **opcoes) for indice in range(quantidade)]
+    threads = [
+        threading.Thread(target=trabalhador.rodar, args=(ate_esvaziar,), name=trabalhador.nome)
+        for trabalhador in trabalhadores
+    ]
+    for thread in threads:
+        thread.start()
+    # join com tempo, para os sinais continuarem chegando à thread principal
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(0.5)
+    return sum(trabalhador.executadas for trabalhador in trabalhadores)
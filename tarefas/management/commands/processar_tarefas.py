@@ -0,0 +1,62 @@
+import signal
+import threading
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tarefas.fila import configuracao, rodar_trabalhadores
+
+
+def _ao_receber_sinal(funcao):
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *args: funcao())
+
+def _trabalhar(threads, ate_esvaziar, intervalo):
+    parar = threading.Event()
+    _ao_receber_sinal(parar.set)
+    return rodar_trabalhadores(threads, parar, ate_esvaziar, intervalo=intervalo)
+
+def _processo(threads, ate_esvaziar, intervalo, executadas):
+    connections.close_all()
+    total = _trabalhar(threads, ate_esvaziar, intervalo)
+    with executadas.get_lock():
+        executadas.value += total
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas da fila (tarefas.Tarefa) em threads e/ou processos. '
+        'Termina com Ctrl+C ou SIGTERM depois de concluir as tarefas em andamento.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, help='Trabalhadores por processo (padrão: TAREFAS["TRABALHADORES"])')
+        parser.add_argument('--processos', type=int, default=1, help='Processos trabalhadores')
+        parser.add_argument('--intervalo', type=float, help='Segundos entre buscas com a fila vazia')
+        parser.add_argument('--ate-esvaziar', action='store_true', help='Sai quando não houver mais tarefas disponíveis')
+
+    def handle(self, *args, **options):
+        threads = options['threads'] or configuracao()['TRABALHADORES']
+        argumentos = (threads, options['ate_esvaziar'], options['intervalo'])
+        self.stdout.write(f"Processando tarefas com {options['processos']} processo(s) x {threads} thread(s)...")
+
+        if options['processos'] > 1:
+            connections.close_all()
+            contexto = get_context('fork')
+            executadas = contexto.Value('i', 0)
+            processos = [
+                contexto.Process(target=_processo, args=(*argumentos, executadas))
+                for _ in range(options['processos'])
+            ]
+            for processo in processos:
+                processo.start()
+            # O Ctrl+C do terminal chega a todos; o SIGTERM é repassado
+            _ao_receber_sinal(lambda: [p.terminate() for p in processos if p.is_alive()])
+            for processo in processos:
+                processo.join()
+            total = executadas.value
+        else:
+            total = _trabalhar(*argumentos)
+
+        self.stdout.write(self.style.SUCCESS(f'{total} tarefa(s) executada(s).'))
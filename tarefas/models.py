@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class Tarefa(models.Model):
+    """Operação demorada enfileirada para rodar fora da requisição"""
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+    FINALIZADAS = ('concluida', 'falhou')
+
+    nome = models.CharField(max_length=100, verbose_name=_('Nome'))
+    argumentos = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder, verbose_name=_('Argumentos'))
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name=_('Status')
+    )
+    tentativas = models.PositiveIntegerField(default=0, verbose_name=_('Tentativas'))
+    max_tentativas = models.PositiveIntegerField(default=3, verbose_name=_('Máximo de Tentativas'))
+    executar_em = models.DateTimeField(default=timezone.now, verbose_name=_('Executar em'))
+    bloqueada_ate = models.DateTimeField(null=True, blank=True, verbose_name=_('Bloqueada até'))
+    trabalhador = models.CharField(max_length=100, blank=True, verbose_name=_('Trabalhador'))
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name=_('Resultado'))
+    arquivo = models.FileField(upload_to='tarefas/', blank=True, verbose_name=_('Arquivo'))
+    erro = models.TextField(blank=True, verbose_name=_('Erro'))
+    criado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tarefas',
+        verbose_name=_('Criado por')
+    )
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name=_('Data de Criação'))
+    data_inicio = models.DateTimeField(null=True, blank=True, verbose_name=_('Início'))
+    data_fim = models.DateTimeField(null=True, blank=True, verbose_name=_('Fim'))
+
+    class Meta:
+        verbose_name = _('Tarefa')
+        verbose_name_plural = _('Tarefas')
+        ordering = ['-data_criacao', '-id']
+        indexes = [
+            # Busca da próxima tarefa pelos trabalhadores
+            models.Index(fields=['status', 'executar_em'], name='tarefa_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tarefa #{self.pk} {self.nome} ({self.get_status_display()})"
+
+    @property
+    def finalizada(self):
+        return self.status in self.FINALIZADAS
+
+    @classmethod
+    def visiveis_para(cls, usuario):
+        """Proprietários veem todas as tarefas; os demais, só as que criaram"""
+        if usuario.is_proprietario:
+            return cls.objects.all()
+        return cls.objects.filter(criado_por=usuario)
+
+    @classmethod
+    def disponiveis(cls, agora=None):
+        """
+        Pendentes com horário vencido e também as em execução cujo bloqueio
+        expirou (o trabalhador morreu ou passou do tempo limite)
+        """
+        agora = agora or timezone.now()
+        return cls.objects.filter(
+            Q(status='pendente', executar_em__lte=agora)
+            | Q(status='executando', bloqueada_ate__lt=agora)
+        )
+
+    @classmethod
+    def pegar_proxima(cls, trabalhador, tempo_limite):
+        """
+        Reserva a próxima tarefa disponível para o trabalhador, ou None.
+        A reserva é um UPDATE condicionado ao estado lido: se outro
+        trabalhador pegou a mesma tarefa antes, nenhuma linha muda e a
+        busca continua, sem depender de SELECT FOR UPDATE (o SQLite não tem).
+        """
+        while True:
+            agora = timezone.now()
+            candidata = cls.disponiveis(agora).order_by('executar_em', 'id').values(
+                'pk', 'status', 'tentativas',
+            ).first()
+            if candidata is None:
+                return None
+            reservada = cls.objects.filter(
+                pk=candidata['pk'],
+                status=candidata['status'],
+                tentativas=candidata['tentativas'],
+            ).update(
+                status='executando',
+                tentativas=candidata['tentativas'] + 1,
+                bloqueada_ate=agora + timedelta(seconds=tempo_limite),
+                trabalhador=trabalhador,
+                data_inicio=agora,
+            )
+            if reservada:
+                return cls.objects.get(pk=candidata['pk'])
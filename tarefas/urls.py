@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'tarefas'
+
+urlpatterns = [
+    path('<int:pk>/', views.detalhe_tarefa, name='detalhe'),
+    path('<int:pk>/arquivo/', views.arquivo_tarefa, name='arquivo'),
+]
@@ -0,0 +1,25 @@
+from django.shortcuts import render, get_object_or_404
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404
+from .models import Tarefa
+
+# Views para templates (Function Based Views)
+@login_required
+def detalhe_tarefa(request, pk):
+    """Andamento de uma tarefa; a página se atualiza até ela terminar"""
+    tarefa = get_object_or_404(Tarefa.visiveis_para(request.user), pk=pk)
+    resultado = tarefa.resultado if isinstance(tarefa.resultado, dict) else {}
+    context = {
+        'tarefa': tarefa,
+        'mensagem': resultado.get('mensagem'),
+        'titulo': f'Tarefa #{tarefa.pk} - RPM Motos'
+    }
+    return render(request, 'tarefas/detalhe.html', context)
+
+@login_required
+def arquivo_tarefa(request, pk):
+    """Download do arquivo gerado pela tarefa"""
+    tarefa = get_object_or_404(Tarefa.visiveis_para(request.user), pk=pk)
+    if not tarefa.arquivo:
+        raise Http404('A tarefa não gerou arquivo.')
+    return FileResponse(tarefa.arquivo.open('rb'), as_attachment=True, filename=tarefa.arquivo.name.rsplit('/', 1)[-1])
@@ -7,7 +7,9 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from django.views import View
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
+from rpm_motos.assincrono import em_paralelo, renderizar
 
 # Function Based Views (FBV)
 @csrf_exempt
@@ -150,43 +152,44 @@ def custom_logout_view(request):
 
 # Views para templates (Function Based Views)
 @login_required
-def dashboard_usuario(request):
-    """Dashboard do usuário"""
+async def dashboard_usuario(request):
+    """Dashboard do usuário, com as consultas independentes ao mesmo tempo"""
     from produtos.models import Produto
-    from vendas.models import Venda
-    from django.utils import timezone
-    from datetime import datetime, timedelta
+    from vendas.models import Venda, VendaArquivada
+    from vendas.periodos import IntervaloDatas
     
-    # Estatísticas básicas
-    total_produtos = Produto.objects.filter(ativo=True).count()
-    total_vendas = Venda.objects.count()
+    usuario = await request.auser()
+    produtos = Produto.objects.filter(ativo=True)
     
-    # Faturamento do mês atual
-    hoje = timezone.now()
-    inicio_mes = hoje.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    faturamento_mes = Venda.objects.filter(
-        data_venda__gte=inicio_mes,
-        status='concluida'
-    ).aggregate(
-        total=models.Sum('total')
-    )['total'] or 0
+    # Faturamento do mês atual (mês local da loja)
+    hoje = timezone.localdate()
+    mes = IntervaloDatas(hoje.replace(day=1), hoje)
     
-    # Produtos com estoque baixo (estoque menor que o estoque mínimo)
-    estoque_baixo = 0
-    for produto in Produto.objects.filter(ativo=True):
-        if produto.estoque < produto.estoque_minimo:
-            estoque_baixo += 1
+    def faturamento_do_mes():
+        return mes.filtrar(Venda.objects.filter(status='concluida'), 'data_venda').aggregate(
+            total=models.Sum('total')
+        )['total'] or 0
     
+    consultas = [
+        produtos.count,
+        # Total de vendas, incluindo as arquivadas
+        lambda: Venda.objects.count() + VendaArquivada.objects.count(),
+        faturamento_do_mes,
+        # Produtos com estoque baixo (estoque menor que o estoque mínimo)
+        produtos.filter(estoque__lt=F('estoque_minimo')).count,
+    ]
     # Últimas vendas (apenas para proprietários)
-    ultimas_vendas = None
-    produtos_destaque = None
+    if usuario.is_proprietario:
+        consultas += [
+            lambda: list(Venda.objects.select_related('cliente').order_by('-data_venda')[:5]),
+            lambda: list(produtos.select_related('marca').order_by('-data_cadastro')[:5]),
+        ]
     
-    if request.user.is_proprietario:
-        ultimas_vendas = Venda.objects.select_related('cliente').order_by('-data_venda')[:5]
-        produtos_destaque = Produto.objects.filter(ativo=True).order_by('-data_cadastro')[:5]
+    total_produtos, total_vendas, faturamento_mes, estoque_baixo, *destaques = await em_paralelo(*consultas)
+    ultimas_vendas, produtos_destaque = destaques or (None, None)
     
     context = {
-        'usuario': request.user,
+        'usuario': usuario,
         'titulo': 'Dashboard - RPM Motos',
         'total_produtos': total_produtos,
         'total_vendas': total_vendas,
@@ -195,7 +198,7 @@ def dashboard_usuario(request):
         'ultimas_vendas': ultimas_vendas,
         'produtos_destaque': produtos_destaque,
     }
-    return render(request, 'usuarios/dashboard.html', context)
+    return await renderizar(request, 'usuarios/dashboard.html', context)
 
 @login_required
 def perfil_view(request):
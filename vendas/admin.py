@@ -1,5 +1,9 @@
-from django.contrib import admin
-from .models import Venda, Cliente, ItemVenda, Faturamento
+from django.contrib import admin, messages
+from django.db import transaction
+from django.forms.models import BaseInlineFormSet
+from django.core.exceptions import ValidationError
+from .models import Venda, Cliente, ItemVenda, Faturamento, FaturamentoPeriodo, VendaArquivada, ItemVendaArquivado
+from .services import montar_venda, EstoqueInsuficiente
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
@@ -9,24 +13,68 @@ class ClienteAdmin(admin.ModelAdmin):
     list_editable = ['ativo']
     ordering = ['nome']
 
+class ItemVendaInlineFormSet(BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        for form in self.forms:
+            if not form.cleaned_data or form.cleaned_data.get('DELETE') or form.instance.pk:
+                continue
+            produto = form.cleaned_data.get('produto')
+            quantidade = form.cleaned_data.get('quantidade')
+            if produto and quantidade and quantidade > produto.estoque:
+                raise ValidationError(
+                    f'Quantidade insuficiente em estoque para {produto.nome}. '
+                    f'Disponível: {produto.estoque}'
+                )
+
+class ItemVendaInline(admin.TabularInline):
+    model = ItemVenda
+    formset = ItemVendaInlineFormSet
+    extra = 1
+    fields = ['produto', 'quantidade', 'preco_unitario', 'desconto_item', 'lucro_estimado']
+    readonly_fields = ['lucro_estimado']
+
 @admin.register(Venda)
 class VendaAdmin(admin.ModelAdmin):
-    list_display = ['numero_venda', 'cliente', 'vendedor', 'data_venda', 'status', 'total', 'forma_pagamento']
+    list_display = ['numero_venda', 'cliente', 'vendedor', 'data_venda', 'status', 'total', 'lucro_estimado', 'forma_pagamento']
     list_filter = ['status', 'forma_pagamento', 'data_venda', 'vendedor']
     search_fields = ['numero_venda', 'cliente__nome', 'vendedor__username']
-    readonly_fields = ['numero_venda', 'data_venda', 'subtotal', 'total']
+    readonly_fields = ['numero_venda', 'data_venda', 'subtotal', 'total', 'lucro_estimado']
     ordering = ['-data_venda']
+    inlines = [ItemVendaInline]
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('cliente', 'vendedor')
+    
+    def save_formset(self, request, form, formset, change):
+        if formset.model is not ItemVenda:
+            return super().save_formset(request, form, formset, change)
+        
+        # Os itens são regravados de uma vez pelo serviço de montagem da venda
+        formset.save(commit=False)
+        itens = [
+            item_form.instance for item_form in formset.forms
+            if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE')
+        ]
+        try:
+            montar_venda(form.instance, itens)
+        except EstoqueInsuficiente as e:
+            # Estoque consumido por outra venda depois da validação
+            transaction.set_rollback(True)
+            self.message_user(request, str(e), messages.ERROR)
 
 @admin.register(ItemVenda)
 class ItemVendaAdmin(admin.ModelAdmin):
-    list_display = ['venda', 'produto', 'quantidade', 'preco_unitario', 'subtotal']
+    list_display = ['venda', 'produto', 'quantidade', 'preco_unitario', 'custo_unitario', 'subtotal', 'lucro_estimado']
     list_filter = ['produto__categoria', 'produto__marca']
     search_fields = ['venda__numero_venda', 'produto__nome']
-    readonly_fields = ['subtotal']
+    readonly_fields = ['subtotal', 'custo_unitario', 'lucro_estimado']
     ordering = ['-venda__data_venda']
+    
+    def delete_queryset(self, request, queryset):
+        # Um a um, para cada exclusão atualizar a venda, o cubo e o faturamento
+        for item in queryset:
+            item.delete()
 
 @admin.register(Faturamento)
 class FaturamentoAdmin(admin.ModelAdmin):
@@ -34,3 +82,38 @@ class FaturamentoAdmin(admin.ModelAdmin):
     list_filter = ['data']
     ordering = ['-data']
     readonly_fields = ['data', 'vendas_dia', 'faturamento_bruto', 'faturamento_liquido', 'lucro_estimado']
+
+@admin.register(FaturamentoPeriodo)
+class FaturamentoPeriodoAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'inicio', 'vendas', 'faturamento_bruto', 'faturamento_liquido', 'lucro_estimado']
+    list_filter = ['tipo']
+    ordering = ['tipo', '-inicio']
+    readonly_fields = ['tipo', 'inicio', 'vendas', 'faturamento_bruto', 'desconto_total', 'faturamento_liquido', 'lucro_estimado']
+
+class ItemVendaArquivadoInline(admin.TabularInline):
+    model = ItemVendaArquivado
+    fields = ['produto', 'quantidade', 'preco_unitario', 'desconto_item', 'lucro_estimado']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(VendaArquivada)
+class VendaArquivadaAdmin(admin.ModelAdmin):
+    """Vendas arquivadas são só consulta: entram e saem pelo comando arquivar_vendas"""
+    list_display = ['numero_venda', 'cliente', 'vendedor', 'data_venda', 'status', 'total', 'arquivada_em']
+    list_filter = ['status', 'forma_pagamento', 'data_venda']
+    search_fields = ['numero_venda', 'cliente__nome', 'vendedor__username']
+    ordering = ['-data_venda']
+    inlines = [ItemVendaArquivadoInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('cliente', 'vendedor')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from vendas.clientes import somente_digitos
 from vendas.models import Cliente, Venda, ItemVenda, Faturamento
+from vendas.services import montar_venda, EstoqueInsuficiente
 from produtos.api.serializers import ProdutoSerializer
 
 class ClienteSerializer(serializers.ModelSerializer):
@@ -10,6 +12,16 @@ class ClienteSerializer(serializers.ModelSerializer):
             'endereco', 'cidade', 'estado', 'cep', 'data_cadastro', 'ativo'
         ]
         read_only_fields = ['id', 'data_cadastro']
+    
+    def validate_cpf_cnpj(self, value):
+        """O mesmo documento gravado com outra pontuação também conta"""
+        digitos = somente_digitos(value)
+        clientes = Cliente.objects.filter(cpf_cnpj_digitos=digitos)
+        if self.instance is not None:
+            clientes = clientes.exclude(pk=self.instance.pk)
+        if digitos and clientes.exists():
+            raise serializers.ValidationError('Já existe um cliente com este CPF/CNPJ.')
+        return value
 
 class ClienteListSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,9 +36,9 @@ class ItemVendaSerializer(serializers.ModelSerializer):
         model = ItemVenda
         fields = [
             'id', 'produto', 'quantidade', 'preco_unitario',
-            'desconto_item', 'subtotal', 'produto_id'
+            'desconto_item', 'subtotal', 'lucro_estimado', 'produto_id'
         ]
-        read_only_fields = ['id', 'subtotal']
+        read_only_fields = ['id', 'subtotal', 'lucro_estimado']
     
     def create(self, validated_data):
         produto_id = validated_data.pop('produto_id')
@@ -36,7 +48,7 @@ class ItemVendaSerializer(serializers.ModelSerializer):
 class VendaSerializer(serializers.ModelSerializer):
     cliente = ClienteSerializer(read_only=True)
     vendedor = serializers.StringRelatedField(read_only=True)
-    itens = ItemVendaSerializer(many=True, read_only=True)
+    itens = ItemVendaSerializer(many=True, required=False)
     cliente_id = serializers.IntegerField(write_only=True)
     
     class Meta:
@@ -53,11 +65,32 @@ class VendaSerializer(serializers.ModelSerializer):
         validated_data['cliente_id'] = cliente_id
         validated_data['vendedor'] = self.context['request'].user
         
-        # Gerar número da venda
-        from datetime import datetime
-        validated_data['numero_venda'] = f"V{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        itens = validated_data.pop('itens', [])
+        return self._montar(Venda(**validated_data), itens)
+    
+    def update(self, instance, validated_data):
+        if 'cliente_id' in validated_data:
+            validated_data['cliente_id'] = validated_data.pop('cliente_id')
         
-        return super().create(validated_data)
+        itens = validated_data.pop('itens', None)
+        for campo, valor in validated_data.items():
+            setattr(instance, campo, valor)
+        
+        if itens is None:
+            instance.calcular_totais()
+            return instance
+        return self._montar(instance, itens)
+    
+    def _montar(self, venda, itens):
+        """Grava a venda e os itens pelo serviço de montagem"""
+        try:
+            return montar_venda(venda, [ItemVenda(**item) for item in itens])
+        except EstoqueInsuficiente as e:
+            raise serializers.ValidationError({
+                'itens': [
+                    f'Produto {falha.produto_id}: {falha.mensagem}' for falha in e.falhas
+                ]
+            })
 
 class VendaListSerializer(serializers.ModelSerializer):
     cliente = ClienteListSerializer(read_only=True)
@@ -71,8 +104,12 @@ class VendaListSerializer(serializers.ModelSerializer):
         ]
 
 class VendaDetailSerializer(VendaSerializer):
+    # Também serializa VendaArquivada, que tem os mesmos campos
+    arquivada = serializers.BooleanField(read_only=True)
+    
     class Meta(VendaSerializer.Meta):
-        fields = VendaSerializer.Meta.fields + ['lucro_estimado']
+        fields = VendaSerializer.Meta.fields + ['lucro_estimado', 'arquivada']
+        read_only_fields = VendaSerializer.Meta.read_only_fields + ['lucro_estimado', 'arquivada']
 
 class FaturamentoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -88,3 +125,24 @@ class FaturamentoResumoSerializer(serializers.Serializer):
     faturamento_total = serializers.DecimalField(max_digits=12, decimal_places=2)
     lucro_total = serializers.DecimalField(max_digits=12, decimal_places=2)
     periodo = serializers.CharField()
+
+class AlterarStatusSerializer(serializers.Serializer):
+    novo_status = serializers.ChoiceField(choices=Venda.STATUS_CHOICES)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    status = serializers.ChoiceField(choices=Venda.STATUS_CHOICES, required=False)
+    cliente = serializers.IntegerField(required=False)
+    vendedor = serializers.IntegerField(required=False)
+    data_inicio = serializers.DateField(required=False)
+    data_fim = serializers.DateField(required=False)
+    
+    def validate(self, data):
+        if len(data) == 1:
+            raise serializers.ValidationError('Informe ids ou ao menos um filtro.')
+        return data
+
+class ResultadoStatusSerializer(serializers.Serializer):
+    novo_status = serializers.CharField()
+    selecionadas = serializers.IntegerField()
+    atualizadas = serializers.IntegerField()
+    ignoradas = serializers.IntegerField()
+    dias = serializers.ListField(child=serializers.DateField())
@@ -1,10 +1,13 @@
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.filters import SearchFilter, OrderingFilter
-from vendas.models import Venda, Cliente, ItemVenda, Faturamento
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from vendas.models import Venda, Cliente, ItemVenda, Faturamento, CuboVendas, VendaArquivada
 from .serializers import (
     VendaSerializer, 
     VendaListSerializer, 
@@ -12,27 +15,29 @@ from .serializers import (
     ClienteSerializer,
     ClienteListSerializer,
     FaturamentoSerializer,
-    FaturamentoResumoSerializer
+    FaturamentoResumoSerializer,
+    AlterarStatusSerializer
 )
+from vendas.exportacao import vendas_csv, vendas_ndjson, faturamento_csv, faturamento_ndjson
+from vendas.filtros import CAMPOS_FILTRO, filtrar_vendas
+from vendas.arquivo import buscar_venda
+from vendas.clientes import BuscaClientes
+from vendas.periodos import IntervaloDatas, inicio_periodo
+from rpm_motos.paginacao import PaginacaoKeyset
+from tarefas.api.views import resposta_tarefa
+from tarefas.fila import enfileirar
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def lista_vendas_api(request):
-    vendas = Venda.objects.all()
-    status_venda = request.GET.get('status')
-    cliente_id = request.GET.get('cliente')
-    data_inicio = request.GET.get('data_inicio')
-    data_fim = request.GET.get('data_fim')
-    if status_venda:
-        vendas = vendas.filter(status=status_venda)
-    if cliente_id:
-        vendas = vendas.filter(cliente_id=cliente_id)
-    if data_inicio:
-        vendas = vendas.filter(data_venda__date__gte=data_inicio)
-    if data_fim:
-        vendas = vendas.filter(data_venda__date__lte=data_fim)
-    serializer = VendaListSerializer(vendas, many=True)
-    return Response(serializer.data)
+    try:
+        vendas = filtrar_vendas(Venda.objects.select_related('cliente', 'vendedor'), request.GET)
+    except ValueError:
+        return Response({'error': 'Filtros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+    paginador = PaginacaoKeyset()
+    pagina = paginador.paginate_queryset(vendas.order_by('-data_venda', 'id'), request)
+    serializer = VendaListSerializer(pagina, many=True)
+    return paginador.get_paginated_response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -76,69 +81,197 @@ def deletar_venda_api(request, pk):
     except Venda.DoesNotExist:
         return Response({'error': 'Venda não encontrada'}, status=status.HTTP_404_NOT_FOUND)
 
+def _resumo_faturamento(params):
+    """
+    Totais do período pedido: dia, semana (ISO), mes e ano correntes até
+    hoje, data_inicio/data_fim personalizados ou, por padrão, últimos 30 dias.
+    Levanta ValueError para datas inválidas.
+    """
+    hoje = timezone.localdate()
+    periodo = params.get('periodo', 'mes')
+    if params.get('data_inicio') and params.get('data_fim'):
+        periodo = 'personalizado'
+        intervalo = IntervaloDatas.de_parametros(params)
+    elif periodo == 'dia':
+        intervalo = IntervaloDatas(hoje, hoje)
+    elif periodo in ('semana', 'mes', 'ano'):
+        intervalo = IntervaloDatas(inicio_periodo(periodo, hoje), hoje)
+    else:
+        intervalo = IntervaloDatas.ultimos_dias(31, hoje)
+    
+    totais = Faturamento.totais(intervalo.inicio, intervalo.fim)
+    return {
+        'total_vendas': totais['vendas'],
+        'faturamento_bruto': totais['bruto'],
+        'desconto_total': totais['desconto'],
+        'faturamento_total': totais['liquido'],
+        'lucro_total': totais['lucro'],
+        'periodo': periodo,
+        'data_inicio': intervalo.inicio,
+        'data_fim': intervalo.fim
+    }
+
+def _consulta_cubo(params):
+    """
+    Converte os parâmetros de /api/vendas/cubo/ nos argumentos de
+    CuboVendas.consultar. Levanta ValueError para valores inválidos.
+    """
+    agrupar = [d for d in params.get('agrupar', '').split(',') if d]
+    for dimensao in agrupar:
+        if dimensao not in CuboVendas.DIMENSOES:
+            raise ValueError(f'Dimensão inválida: {dimensao}')
+    
+    filtros = {}
+    for dimensao in ('vendedor', 'produto', 'categoria', 'marca'):
+        if params.get(dimensao):
+            filtros[dimensao] = [int(v) for v in params[dimensao].split(',')]
+    if params.get('forma_pagamento'):
+        filtros['forma_pagamento'] = params['forma_pagamento'].split(',')
+    
+    ordenar = params.get('ordenar', 'faturamento')
+    if ordenar not in CuboVendas.MEDIDAS:
+        raise ValueError(f'Ordenação inválida: {ordenar}')
+    limite = int(params['limite']) if params.get('limite') else None
+    if limite is not None and limite < 1:
+        raise ValueError('O limite deve ser maior que zero.')
+    intervalo = IntervaloDatas.de_parametros(params)
+    
+    return {
+        'agrupar': agrupar,
+        'filtros': filtros,
+        'data_inicio': intervalo.inicio,
+        'data_fim': intervalo.fim,
+        'ordenar': ordenar,
+        'limite': limite,
+    }
+
+EXPORTACOES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+def _resposta_exportacao(linhas, formato, nome):
+    """Resposta em streaming com as linhas geradas pela exportação"""
+    resposta = StreamingHttpResponse(linhas, content_type=EXPORTACOES[formato])
+    resposta['Content-Disposition'] = f'attachment; filename="{nome}_{timezone.localdate():%Y%m%d}.{formato}"'
+    return resposta
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def faturamento_api(request):
     if not request.user.is_proprietario:
         return Response({'error': 'Acesso negado. Apenas proprietários podem ver o faturamento.'}, status=status.HTTP_403_FORBIDDEN)
-    periodo = request.GET.get('periodo', 'mes')
-    from datetime import datetime, timedelta
-    if periodo == 'dia':
-        data_inicio = datetime.now().date()
-        data_fim = datetime.now().date()
-    elif periodo == 'semana':
-        data_inicio = datetime.now().date() - timedelta(days=7)
-        data_fim = datetime.now().date()
-    elif periodo == 'mes':
-        data_inicio = datetime.now().date().replace(day=1)
-        data_fim = datetime.now().date()
-    else:
-        data_inicio = datetime.now().date() - timedelta(days=30)
-        data_fim = datetime.now().date()
-    vendas = Venda.objects.filter(
-        data_venda__date__range=[data_inicio, data_fim],
-        status__in=['concluida', 'aprovada']
-    )
-    total_vendas = vendas.count()
-    faturamento_total = sum(v.total for v in vendas)
-    lucro_total = sum(v.lucro_estimado for v in vendas)
-    data = {
-        'total_vendas': total_vendas,
-        'faturamento_total': faturamento_total,
-        'lucro_total': lucro_total,
-        'periodo': periodo,
-        'data_inicio': data_inicio,
-        'data_fim': data_fim
-    }
-    return Response(data)
+    try:
+        return Response(_resumo_faturamento(request.GET))
+    except ValueError:
+        return Response({'error': 'Datas inválidas. Use AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
 class VendaViewSet(viewsets.ModelViewSet):
-    queryset = Venda.objects.all()
+    queryset = Venda.objects.select_related('cliente', 'vendedor')
     serializer_class = VendaSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [SearchFilter, OrderingFilter]
     filterset_fields = ['cliente', 'vendedor', 'status', 'data_venda']
     search_fields = ['numero_venda', 'cliente__nome', 'vendedor__username']
     ordering_fields = ['data_venda', 'total', 'numero_venda']
-    ordering = ['-data_venda']
+    ordering = ['-data_venda', 'id']
     def get_serializer_class(self):
         if self.action == 'list':
             return VendaListSerializer
         elif self.action == 'retrieve':
             return VendaDetailSerializer
         return VendaSerializer
+    def filter_queryset(self, queryset):
+        """Na listagem, os mesmos filtros da tela (status, cliente, vendedor, data_inicio, data_fim)"""
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            try:
+                queryset = filtrar_vendas(queryset, self.request.query_params)
+            except ValueError:
+                raise ValidationError({'error': 'Filtros inválidos.'})
+        return queryset
     def perform_create(self, serializer):
         serializer.save(vendedor=self.request.user)
+    def _detalhe(self, venda):
+        if venda is None:
+            return Response({'error': 'Venda não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(VendaDetailSerializer(venda, context=self.get_serializer_context()).data)
+    def retrieve(self, request, *args, **kwargs):
+        """Detalhes da venda; as arquivadas são procuradas no arquivo"""
+        pk = self.kwargs['pk']
+        if not str(pk).isdigit():
+            return self._detalhe(None)
+        venda = self.get_queryset().filter(pk=pk).first()
+        if venda is None:
+            venda = VendaArquivada.objects.select_related('cliente', 'vendedor').filter(pk=pk).first()
+        return self._detalhe(venda)
+    @action(detail=False, methods=['get'], url_path=r'numero/(?P<numero_venda>[^/.]+)')
+    def numero(self, request, numero_venda=None):
+        """Detalhes da venda pelo número, arquivada ou não"""
+        return self._detalhe(buscar_venda(
+            numero_venda,
+            vendas=self.get_queryset(),
+            arquivadas=VendaArquivada.objects.select_related('cliente', 'vendedor'),
+        ))
+    @action(detail=False, methods=['post'], url_path='alterar-status')
+    def alterar_status_vendas(self, request):
+        """
+        Muda o status das vendas por lista de ids e/ou filtro, em segundo
+        plano: responde 202 com a tarefa, cujo resultado traz os totais
+        """
+        entrada = AlterarStatusSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        dados = dict(entrada.validated_data)
+        tarefa = enfileirar(
+            'vendas.alterar_status',
+            usuario=request.user,
+            novo_status=dados.pop('novo_status'),
+            ids=dados.pop('ids', None),
+            filtros=dados,
+        )
+        return resposta_tarefa(tarefa, request)
+    @action(detail=False, methods=['get'])
+    def cubo(self, request):
+        """
+        Consultas ao cubo de vendas, ex.:
+        ?agrupar=vendedor,mes&categoria=1,2&data_inicio=2025-01-01&ordenar=lucro&limite=10
+        """
+        if not request.user.is_proprietario:
+            return Response({'error': 'Acesso negado. Apenas proprietários podem ver o cubo de vendas.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            consulta = _consulta_cubo(request.GET)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'resultados': CuboVendas.consultar(**consulta)})
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta as vendas filtradas com cliente e itens, em streaming, ex.:
+        ?formato=ndjson&status=concluida&data_inicio=2025-01-01&data_fim=2025-12-31
+        Com &assincrono=1 o arquivo é gerado em segundo plano (202 com a tarefa).
+        """
+        formato = request.GET.get('formato', 'csv')
+        if formato not in EXPORTACOES:
+            return Response({'error': 'Formato inválido. Use csv ou ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            vendas = filtrar_vendas(Venda.objects.all(), request.GET)
+        except ValueError:
+            return Response({'error': 'Filtros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.GET.get('assincrono'):
+            filtros = {campo: request.GET[campo] for campo in CAMPOS_FILTRO if request.GET.get(campo)}
+            tarefa = enfileirar('vendas.exportar_vendas', usuario=request.user, formato=formato, filtros=filtros)
+            return resposta_tarefa(tarefa, request)
+        linhas = vendas_csv(vendas) if formato == 'csv' else vendas_ndjson(vendas)
+        return _resposta_exportacao(linhas, formato, 'vendas')
 
 class ClienteViewSet(viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [SearchFilter, OrderingFilter]
+    filter_backends = [BuscaClientes, OrderingFilter]
     filterset_fields = ['tipo', 'ativo', 'estado']
-    search_fields = ['nome', 'cpf_cnpj', 'email']
     ordering_fields = ['nome', 'data_cadastro']
-    ordering = ['nome']
+    ordering = ['nome', 'id']
 
 class FaturamentoViewSet(viewsets.ModelViewSet):
     queryset = Faturamento.objects.all()
@@ -148,6 +281,38 @@ class FaturamentoViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_proprietario:
             return Faturamento.objects.none()
         return Faturamento.objects.all()
+    @action(detail=False, methods=['get'])
+    def resumo(self, request):
+        """Totais por período a partir dos acumulados de semana/mês/ano"""
+        if not request.user.is_proprietario:
+            return Response({'error': 'Acesso negado. Apenas proprietários podem ver o faturamento.'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            return Response(_resumo_faturamento(request.GET))
+        except ValueError:
+            return Response({'error': 'Datas inválidas. Use AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """Exporta o faturamento diário (?formato=csv|ndjson&data_inicio=&data_fim=&assincrono=1)"""
+        if not request.user.is_proprietario:
+            return Response({'error': 'Acesso negado. Apenas proprietários podem ver o faturamento.'}, status=status.HTTP_403_FORBIDDEN)
+        formato = request.GET.get('formato', 'csv')
+        if formato not in EXPORTACOES:
+            return Response({'error': 'Formato inválido. Use csv ou ndjson.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            faturamentos = IntervaloDatas.de_parametros(request.GET).filtrar(Faturamento.objects.all(), 'data')
+        except ValueError:
+            return Response({'error': 'Datas inválidas. Use AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.GET.get('assincrono'):
+            tarefa = enfileirar(
+                'vendas.exportar_faturamento',
+                usuario=request.user,
+                formato=formato,
+                data_inicio=request.GET.get('data_inicio'),
+                data_fim=request.GET.get('data_fim'),
+            )
+            return resposta_tarefa(tarefa, request)
+        linhas = faturamento_csv(faturamentos) if formato == 'csv' else faturamento_ndjson(faturamentos)
+        return _resposta_exportacao(linhas, formato, 'faturamento')
 
 class VendaAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -160,9 +325,10 @@ class VendaAPIView(APIView):
             except Venda.DoesNotExist:
                 return Response({'error': 'Venda não encontrada'}, status=status.HTTP_404_NOT_FOUND)
         else:
-            vendas = Venda.objects.all()
-            serializer = VendaListSerializer(vendas, many=True)
-            return Response(serializer.data)
+            paginador = PaginacaoKeyset()
+            pagina = paginador.paginate_queryset(Venda.objects.select_related('cliente', 'vendedor').order_by('-data_venda', 'id'), request)
+            serializer = VendaListSerializer(pagina, many=True)
+            return paginador.get_paginated_response(serializer.data)
     def post(self, request):
         serializer = VendaSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
@@ -0,0 +1,133 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .dashboard import invalidar_dashboard
+from .models import Venda, ItemVenda, VendaArquivada, ItemVendaArquivado
+from .periodos import intervalo_dias
+
+
+# Arquivo de vendas antigas.
+# Vendas encerradas (STATUS) com mais de HORIZONTE_DIAS são movidas, com os
+# itens, para VendaArquivada/ItemVendaArquivado, mantendo os mesmos ids: as
+# tabelas de uso diário (listas, filtros, dashboard) ficam menores.
+# A mudança é feita com INSERT ... SELECT e DELETE diretos, sem signals, em
+# uma transação por LOTE de vendas: o Faturamento e o cubo de vendas não
+# mudam, e as reconstruções (reconstruir_periodo/reconstruir_dias) também
+# leem o arquivo. buscar_venda() encontra a venda pelo número nas duas tabelas.
+#
+# Configuração opcional em settings.py:
+#
+#     VENDAS_ARQUIVO = {
+#         'HORIZONTE_DIAS': 730,
+#         'STATUS': ['concluida', 'cancelada'],
+#         'LOTE': 500,
+#     }
+
+ARQUIVO_PADRAO = {
+    'HORIZONTE_DIAS': 730,
+    'STATUS': ['concluida', 'cancelada'],
+    'LOTE': 500,
+}
+
+def configuracao():
+    return {**ARQUIVO_PADRAO, **getattr(settings, 'VENDAS_ARQUIVO', {})}
+
+def data_limite():
+    """Primeiro dia que continua nas tabelas de uso diário"""
+    return timezone.localdate() - timedelta(days=configuracao()['HORIZONTE_DIAS'])
+
+def vendas_arquivaveis(antes_de=None):
+    """Vendas encerradas de antes do dia antes_de (padrão: data_limite())"""
+    inicio, _ = intervalo_dias(antes_de or data_limite(), None)
+    return Venda.objects.filter(status__in=configuracao()['STATUS'], data_venda__lt=inicio)
+
+def _copiar(conexao, origem, destino, coluna, ids, extras):
+    """INSERT ... SELECT das linhas de origem com coluna em ids; extras: colunas só do destino"""
+    qn = conexao.ops.quote_name
+    colunas = [campo.column for campo in destino._meta.concrete_fields if campo.column not in extras]
+    lista = ', '.join(qn(c) for c in colunas)
+    sql = (
+        f'INSERT INTO {qn(destino._meta.db_table)} ({lista}{"".join(f", {qn(c)}" for c in extras)}) '
+        f'SELECT {lista}{", %s" * len(extras)} FROM {qn(origem._meta.db_table)} '
+        f'WHERE {qn(coluna)} IN ({", ".join(["%s"] * len(ids))})'
+    )
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, (*extras.values(), *ids))
+
+def _apagar(conexao, modelo, coluna, ids):
+    qn = conexao.ops.quote_name
+    sql = (
+        f'DELETE FROM {qn(modelo._meta.db_table)} '
+        f'WHERE {qn(coluna)} IN ({", ".join(["%s"] * len(ids))})'
+    )
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, ids)
+        return cursor.rowcount
+
+def _mover(ids, vendas, itens, lote, extras_venda=None):
+    """
+    Move as vendas de ids e seus itens entre os pares de tabelas
+    vendas=(origem, destino) e itens=(origem, destino), em lotes
+    """
+    conexao = connections[vendas[0].objects.db]
+    coluna_pk = Venda._meta.pk.column
+    coluna_venda = ItemVenda._meta.get_field('venda').column
+    resultado = {'vendas': 0, 'itens': 0}
+    for i in range(0, len(ids), lote):
+        parte = ids[i:i + lote]
+        with transaction.atomic(using=conexao.alias):
+            # Cópias antes das exclusões e itens antes das vendas: as FKs
+            # sempre apontam para uma venda existente
+            _copiar(conexao, *vendas, coluna_pk, parte, extras_venda or {})
+            _copiar(conexao, *itens, coluna_venda, parte, {})
+            resultado['itens'] += _apagar(conexao, itens[0], coluna_venda, parte)
+            resultado['vendas'] += _apagar(conexao, vendas[0], coluna_pk, parte)
+            invalidar_dashboard()
+    return resultado
+
+def arquivar_vendas(antes_de=None, lote=None):
+    """
+    Move para o arquivo as vendas encerradas de antes do dia antes_de
+    (padrão: data_limite()). Devolve {'vendas': n, 'itens': n}.
+    """
+    ids = list(vendas_arquivaveis(antes_de).order_by('pk').values_list('pk', flat=True))
+    conexao = connections[Venda.objects.db]
+    arquivada_em = conexao.ops.adapt_datetimefield_value(timezone.now())
+    return _mover(
+        ids,
+        (Venda, VendaArquivada),
+        (ItemVenda, ItemVendaArquivado),
+        lote or configuracao()['LOTE'],
+        {VendaArquivada._meta.get_field('arquivada_em').column: arquivada_em},
+    )
+
+def restaurar_vendas(numeros, lote=None):
+    """Traz de volta do arquivo as vendas com os números informados"""
+    ids = list(
+        VendaArquivada.objects.filter(numero_venda__in=list(numeros))
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    return _mover(
+        ids,
+        (VendaArquivada, Venda),
+        (ItemVendaArquivado, ItemVenda),
+        lote or configuracao()['LOTE'],
+    )
+
+def buscar_venda(numero_venda, vendas=None, arquivadas=None):
+    """
+    Venda (ou VendaArquivada) com o número informado, ou None.
+    vendas/arquivadas: querysets opcionais, ex. com select_related.
+    """
+    if vendas is None:
+        vendas = Venda.objects.all()
+    if arquivadas is None:
+        arquivadas = VendaArquivada.objects.all()
+    for consulta in (vendas, arquivadas):
+        venda = consulta.filter(numero_venda=numero_venda).first()
+        if venda is not None:
+            return venda
+    return None
@@ -0,0 +1,53 @@
+import re
+import unicodedata
+
+from django.db.models import Q
+from rest_framework.filters import SearchFilter
+
+
+# Busca de clientes no balcão.
+# Cliente guarda cópias normalizadas e indexadas do nome (nome_busca:
+# minúsculas, sem acentos), do CPF/CNPJ e do telefone (cpf_cnpj_digitos e
+# telefone_digitos: só dígitos), preenchidas em Cliente.save().
+# Um texto só com números e pontuação ("123.456", "(11) 9876") é buscado
+# como início do CPF/CNPJ ou do telefone; um texto com @, no e-mail; os
+# demais, como início do nome ("joao da s" encontra "João da Silva").
+# Cada início vira um intervalo (>= prefixo e < prefixo + FIM_PREFIXO), que
+# o banco resolve pelo índice da coluna, sem o LIKE '%...%' de antes.
+
+FIM_PREFIXO = '\U0010ffff'
+_SO_NUMEROS = re.compile(r'^[0-9\s.\-/()+]+$')
+
+def somente_digitos(texto):
+    return re.sub(r'[^0-9]', '', texto or '')
+
+def normalizar_nome(texto):
+    """Minúsculas, sem acentos e com espaços simples: 'João  DA Silva' -> 'joao da silva'"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+def _comeca_com(campo, prefixo):
+    return Q(**{f'{campo}__gte': prefixo, f'{campo}__lt': prefixo + FIM_PREFIXO})
+
+def filtro_busca(texto):
+    """Q dos clientes encontrados pelo texto digitado, ou None se ele estiver vazio"""
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+    if '@' in texto:
+        return Q(email__icontains=texto)
+    digitos = somente_digitos(texto)
+    if digitos and _SO_NUMEROS.match(texto):
+        return _comeca_com('cpf_cnpj_digitos', digitos) | _comeca_com('telefone_digitos', digitos)
+    return _comeca_com('nome_busca', normalizar_nome(texto))
+
+def buscar_clientes(clientes, texto):
+    filtro = filtro_busca(texto)
+    return clientes if filtro is None else clientes.filter(filtro)
+
+class BuscaClientes(SearchFilter):
+    """?search= da API de clientes por buscar_clientes()"""
+
+    def filter_queryset(self, request, queryset, view):
+        return buscar_clientes(queryset, request.query_params.get(self.search_param, ''))
@@ -0,0 +1,90 @@
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Venda, VendaArquivada, Faturamento
+from .periodos import IntervaloDatas, inicio_periodo
+
+
+# Métricas do dashboard de vendas servidas de um snapshot em cache.
+# Cada escrita em vendas incrementa a versão do dashboard depois do commit, e
+# um snapshot de versão (ou dia) antiga é recalculado na próxima leitura.
+# Só uma requisição recalcula por vez (trava com cache.add); as demais recebem
+# o snapshot anterior ou, se ainda não houver um do dia, esperam o recálculo.
+# Snapshot, versão e trava ficam no cache padrão, compartilhado entre os
+# processos (DatabaseCache, ver CACHES em settings.py).
+
+CHAVE_SNAPSHOT = 'vendas:dashboard'
+CHAVE_VERSAO = 'vendas:dashboard:versao'
+CHAVE_TRAVA = 'vendas:dashboard:trava'
+VALIDADE_SNAPSHOT = 300  # segundos; cobre alterações feitas fora do ORM
+VALIDADE_TRAVA = 30
+ESPERA_TRAVA = 0.05
+TENTATIVAS_TRAVA = 40
+
+def invalidar_dashboard():
+    """Desatualiza o snapshot quando a transação atual for confirmada"""
+    transaction.on_commit(_nova_versao)
+
+def _nova_versao():
+    # Um valor novo a cada escrita, e não incr (no DatabaseCache é ler e
+    # regravar): duas escritas concorrentes nunca deixam a mesma versão
+    cache.set(CHAVE_VERSAO, uuid.uuid4().hex, None)
+
+def calcular_metricas():
+    """Métricas do dashboard direto do banco"""
+    hoje = timezone.localdate()
+    # Mês corrente (com o ano) a partir do faturamento acumulado
+    mes = Faturamento.totais(inicio_periodo('mes', hoje), hoje)
+    ultimas_vendas = Venda.objects.select_related('cliente').only(
+        'numero_venda', 'data_venda', 'total', 'cliente__nome',
+    ).order_by('-data_venda', 'id')[:5]
+    return {
+        'total_vendas': Venda.objects.count() + VendaArquivada.objects.count(),
+        'vendas_hoje': IntervaloDatas(hoje, hoje).filtrar(Venda.objects.all(), 'data_venda').count(),
+        'vendas_mes': mes['vendas'],
+        'faturamento_mes': mes['liquido'],
+        'ticket_medio': mes['liquido'] / mes['vendas'] if mes['vendas'] else 0,
+        'ultimas_vendas': list(ultimas_vendas),
+    }
+
+def _ler_snapshot():
+    """(snapshot, versão atual) numa só leitura do cache"""
+    valores = cache.get_many([CHAVE_SNAPSHOT, CHAVE_VERSAO])
+    return valores.get(CHAVE_SNAPSHOT), valores.get(CHAVE_VERSAO, 0)
+
+def _atual(snapshot, versao, hoje):
+    return snapshot is not None and snapshot['dia'] == hoje and snapshot['versao'] == versao
+
+def metricas_dashboard():
+    """Métricas do snapshot, recalculadas por uma só requisição quando desatualizadas"""
+    hoje = timezone.localdate()
+    snapshot, versao = _ler_snapshot()
+    if _atual(snapshot, versao, hoje):
+        return snapshot['metricas']
+
+    for _ in range(TENTATIVAS_TRAVA):
+        if cache.add(CHAVE_TRAVA, True, VALIDADE_TRAVA):
+            try:
+                # A versão é lida antes do cálculo: uma venda gravada durante
+                # ele deixa o snapshot já desatualizado
+                snapshot, versao = _ler_snapshot()
+                if _atual(snapshot, versao, hoje):
+                    return snapshot['metricas']
+                metricas = calcular_metricas()
+                cache.set(CHAVE_SNAPSHOT, {'versao': versao, 'dia': hoje, 'metricas': metricas}, VALIDADE_SNAPSHOT)
+                return metricas
+            finally:
+                cache.delete(CHAVE_TRAVA)
+
+        # Outra requisição está recalculando
+        if snapshot is not None and snapshot['dia'] == hoje:
+            return snapshot['metricas']
+        time.sleep(ESPERA_TRAVA)
+        snapshot, versao = _ler_snapshot()
+        if _atual(snapshot, versao, hoje):
+            return snapshot['metricas']
+    return calcular_metricas()
@@ -0,0 +1,116 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import ItemVenda
+
+
+# Exportação em streaming (CSV e NDJSON) de vendas e faturamento.
+# As vendas são lidas em blocos de tuplas (iterator com chunk_size, mais uma
+# consulta de itens por bloco) e cada bloco é escrito assim que montado, então
+# a memória não cresce com o período exportado e o cabeçalho sai na hora.
+
+TAMANHO_BLOCO = 500
+
+# (coluna do CSV, campo consultado)
+CAMPOS_VENDA = [
+    ('numero_venda', 'numero_venda'),
+    ('data_venda', 'data_venda'),
+    ('status', 'status'),
+    ('forma_pagamento', 'forma_pagamento'),
+    ('vendedor', 'vendedor__username'),
+    ('subtotal', 'subtotal'),
+    ('desconto', 'desconto'),
+    ('total', 'total'),
+    ('lucro_estimado', 'lucro_estimado'),
+    ('observacoes', 'observacoes'),
+]
+
+CAMPOS_CLIENTE = ['id', 'nome', 'tipo', 'cpf_cnpj', 'email', 'telefone', 'cidade', 'estado']
+
+CAMPOS_ITEM = [
+    'produto_id', 'produto__nome', 'quantidade', 'preco_unitario',
+    'desconto_item', 'custo_unitario', 'lucro_estimado',
+]
+
+COLUNAS_VENDAS = (
+    [coluna for coluna, campo in CAMPOS_VENDA]
+    + ['cliente_' + campo for campo in CAMPOS_CLIENTE]
+    + ['item_produto_id', 'item_produto', 'item_quantidade', 'item_preco_unitario',
+       'item_desconto', 'item_subtotal', 'item_custo_unitario', 'item_lucro_estimado']
+)
+
+COLUNAS_FATURAMENTO = [
+    'data', 'vendas_dia', 'faturamento_bruto', 'desconto_total',
+    'faturamento_liquido', 'lucro_estimado',
+]
+
+class _Eco:
+    """Buffer do csv.writer que devolve a linha em vez de guardá-la"""
+    def write(self, valor):
+        return valor
+
+def _vendas_em_blocos(vendas, tamanho_bloco):
+    """
+    Devolve blocos (vendas, itens por venda) lidos como tuplas, sem montar
+    instâncias dos modelos. Cada venda é (id, campos de CAMPOS_VENDA,
+    campos de CAMPOS_CLIENTE) e cada item segue CAMPOS_ITEM + subtotal.
+    """
+    campos = (['pk'] + [campo for coluna, campo in CAMPOS_VENDA]
+              + ['cliente__' + campo for campo in CAMPOS_CLIENTE])
+    linhas = vendas.order_by('data_venda', 'pk').values_list(*campos).iterator(chunk_size=tamanho_bloco)
+    while bloco := list(islice(linhas, tamanho_bloco)):
+        itens = defaultdict(list)
+        consulta = ItemVenda.objects.filter(
+            venda_id__in=[linha[0] for linha in bloco]
+        ).order_by('pk').values_list('venda_id', *CAMPOS_ITEM)
+        for venda_id, *item in consulta:
+            quantidade, preco_unitario, desconto_item = item[2:5]
+            item.insert(5, quantidade * preco_unitario - desconto_item)
+            itens[venda_id].append(item)
+        yield bloco, itens
+
+def _data_local(valor):
+    return timezone.localtime(valor).isoformat()
+
+def vendas_csv(vendas, tamanho_bloco=TAMANHO_BLOCO):
+    """Uma linha por item, com os dados da venda e do cliente repetidos"""
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_VENDAS)
+    for bloco, itens in _vendas_em_blocos(vendas, tamanho_bloco):
+        partes = []
+        for venda_id, *venda in bloco:
+            venda[1] = _data_local(venda[1])
+            for item in itens.get(venda_id) or [[''] * 8]:
+                partes.append(escritor.writerow(venda + item))
+        yield ''.join(partes)
+
+def vendas_ndjson(vendas, tamanho_bloco=TAMANHO_BLOCO):
+    """Um objeto JSON por linha: a venda com cliente e itens aninhados"""
+    chaves_venda = [coluna for coluna, campo in CAMPOS_VENDA]
+    chaves_item = ['produto_id', 'produto', 'quantidade', 'preco_unitario',
+                   'desconto_item', 'subtotal', 'custo_unitario', 'lucro_estimado']
+    total_venda = len(chaves_venda)
+    for bloco, itens in _vendas_em_blocos(vendas, tamanho_bloco):
+        partes = []
+        for venda_id, *venda in bloco:
+            venda[1] = _data_local(venda[1])
+            objeto = {'id': venda_id, **dict(zip(chaves_venda, venda))}
+            objeto['cliente'] = dict(zip(CAMPOS_CLIENTE, venda[total_venda:]))
+            objeto['itens'] = [dict(zip(chaves_item, item)) for item in itens.get(venda_id, [])]
+            partes.append(json.dumps(objeto, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+        yield ''.join(partes)
+
+def faturamento_csv(faturamentos, tamanho_bloco=TAMANHO_BLOCO):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_FATURAMENTO)
+    for linha in faturamentos.order_by('data').values_list(*COLUNAS_FATURAMENTO).iterator(chunk_size=tamanho_bloco):
+        yield escritor.writerow(linha)
+
+def faturamento_ndjson(faturamentos, tamanho_bloco=TAMANHO_BLOCO):
+    for linha in faturamentos.order_by('data').values(*COLUNAS_FATURAMENTO).iterator(chunk_size=tamanho_bloco):
+        yield json.dumps(linha, cls=DjangoJSONEncoder) + '\n'
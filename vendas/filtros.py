@@ -0,0 +1,26 @@
+from .periodos import IntervaloDatas
+
+
+# Filtros de vendas compartilhados pelas telas e pelas APIs.
+
+CAMPOS_FILTRO = ['status', 'cliente', 'vendedor', 'data_inicio', 'data_fim']
+
+def filtrar_vendas(vendas, parametros):
+    """
+    Aplica os filtros status, cliente, vendedor, data_inicio e data_fim
+    (AAAA-MM-DD, dias locais) vindos de request.GET, request.data ou um dict.
+    As datas viram um intervalo de datetimes (IntervaloDatas), que usa os
+    índices de data_venda. Levanta ValueError se algum valor for inválido.
+    """
+    status_venda = parametros.get('status')
+    cliente_id = parametros.get('cliente')
+    vendedor_id = parametros.get('vendedor')
+
+    if status_venda:
+        vendas = vendas.filter(status=status_venda)
+    if cliente_id:
+        vendas = vendas.filter(cliente_id=int(cliente_id))
+    if vendedor_id:
+        vendas = vendas.filter(vendedor_id=int(vendedor_id))
+
+    return IntervaloDatas.de_parametros(parametros).filtrar(vendas, 'data_venda')
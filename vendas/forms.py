@@ -103,12 +103,16 @@ class ClienteForm(forms.ModelForm):
                     raise forms.ValidationError('CNPJ inválido.')
             else:
                 raise forms.ValidationError('CPF deve ter 11 dígitos ou CNPJ deve ter 14 dígitos.')
+            
+            # O mesmo documento gravado com outra pontuação também conta
+            if Cliente.objects.filter(cpf_cnpj_digitos=cpf_cnpj).exclude(pk=self.instance.pk).exists():
+                raise forms.ValidationError('Já existe um cliente com este CPF/CNPJ.')
         
         return cpf_cnpj
 
 class ItemVendaForm(forms.ModelForm):
     produto = forms.ModelChoiceField(
-        queryset=Produto.objects.filter(ativo=True),
+        queryset=Produto.objects.filter(ativo=True).select_related('marca'),
         empty_label="Selecione um produto",
         required=True,
         widget=forms.Select(attrs={
@@ -265,3 +269,75 @@ VendaItemFormSet = forms.modelformset_factory(
     extra=1,
     can_delete=True
 )
+
+class AlterarStatusForm(forms.Form):
+    """Mudança de status em massa: novo status e filtro das vendas"""
+    novo_status = forms.ChoiceField(
+        choices=Venda.STATUS_CHOICES,
+        label='Novo status',
+        widget=forms.Select(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
+        })
+    )
+    status = forms.ChoiceField(
+        choices=[('', 'Todos')] + Venda.STATUS_CHOICES,
+        required=False,
+        label='Status atual',
+        widget=forms.Select(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
+        })
+    )
+    cliente = forms.ModelChoiceField(
+        queryset=Cliente.objects.filter(ativo=True),
+        required=False,
+        empty_label='Todos',
+        label='Cliente',
+        widget=forms.Select(attrs={
+            'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
+        })
+    )
+    data_inicio = forms.DateField(
+        required=False,
+        label='Data Início',
+        widget=forms.DateInput(attrs={
+            'type': 'date',
+            'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
+        })
+    )
+    data_fim = forms.DateField(
+        required=False,
+        label='Data Fim',
+        widget=forms.DateInput(attrs={
+            'type': 'date',
+            'class': 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
+        })
+    )
+    todas = forms.BooleanField(
+        required=False,
+        label='Todas as vendas (sem filtro)',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'rounded border-gray-300'
+        })
+    )
+    
+    def __init__(self, *args, selecao=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Vendas marcadas na lista dispensam o filtro
+        self.selecao = selecao
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        # Sem filtro a mudança pegaria todas as vendas: só com a confirmação
+        if not self.selecao and not cleaned_data.get('todas') and not any(self.filtro().values()):
+            raise forms.ValidationError('Informe ao menos um filtro ou marque "Todas as vendas".')
+        return cleaned_data
+    
+    def filtro(self):
+        """Filtro no formato de vendas.filtros.filtrar_vendas"""
+        cliente = self.cleaned_data.get('cliente')
+        return {
+            'status': self.cleaned_data.get('status'),
+            'cliente': cliente.pk if cliente else None,
+            'data_inicio': self.cleaned_data.get('data_inicio'),
+            'data_fim': self.cleaned_data.get('data_fim'),
+        }
@@ -0,0 +1,55 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from vendas.arquivo import configuracao, data_limite, vendas_arquivaveis, arquivar_vendas, restaurar_vendas
+
+
+class Command(BaseCommand):
+    help = (
+        'Move as vendas encerradas antigas para o arquivo (VendaArquivada), '
+        'sem alterar o faturamento, ou restaura vendas arquivadas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Arquiva as vendas com mais de N dias (padrão: VENDAS_ARQUIVO["HORIZONTE_DIAS"])')
+        parser.add_argument('--antes-de', help='Arquiva as vendas de antes desta data (AAAA-MM-DD)')
+        parser.add_argument('--lote', type=int, help='Vendas por transação (padrão: VENDAS_ARQUIVO["LOTE"])')
+        parser.add_argument('--simular', action='store_true', help='Só mostra quantas vendas seriam arquivadas')
+        parser.add_argument('--restaurar', nargs='+', metavar='NUMERO', help='Números das vendas a trazer de volta do arquivo')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        if options['restaurar']:
+            resultado = restaurar_vendas(options['restaurar'], lote=options['lote'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{resultado['vendas']} vendas ({resultado['itens']} itens) restauradas "
+                f"em {time.perf_counter() - inicio:.3f}s"
+            ))
+            return
+
+        antes_de = self._antes_de(options)
+        if options['simular']:
+            self.stdout.write(
+                f"{vendas_arquivaveis(antes_de).count()} vendas com status "
+                f"{', '.join(configuracao()['STATUS'])} de antes de {antes_de:%d/%m/%Y} seriam arquivadas."
+            )
+            return
+
+        resultado = arquivar_vendas(antes_de, lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['vendas']} vendas ({resultado['itens']} itens) de antes de "
+            f"{antes_de:%d/%m/%Y} arquivadas em {time.perf_counter() - inicio:.3f}s"
+        ))
+
+    def _antes_de(self, options):
+        if options['antes_de']:
+            try:
+                return date.fromisoformat(options['antes_de'])
+            except ValueError as e:
+                raise CommandError(f'Data inválida: {e}')
+        if options['dias'] is not None:
+            return timezone.localdate() - timedelta(days=options['dias'])
+        return data_limite()
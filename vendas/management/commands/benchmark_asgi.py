@@ -0,0 +1,147 @@
+import http.client
+import importlib.util
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+
+# Servidores ASGI aceitos, na ordem de preferência, com o comando de cada um
+SERVIDORES_ASGI = {
+    'uvicorn': ['-m', 'uvicorn', 'rpm_motos.asgi:application', '--host', '127.0.0.1', '--port', '{porta}', '--log-level', 'warning'],
+    'daphne': ['-m', 'daphne', '-b', '127.0.0.1', '-p', '{porta}', 'rpm_motos.asgi:application'],
+    'hypercorn': ['-m', 'hypercorn', '-b', '127.0.0.1:{porta}', 'rpm_motos.asgi:application'],
+}
+
+URLS_PADRAO = ['usuarios:dashboard', 'vendas:dashboard', 'vendas:faturamento']
+
+def _percentil(duracoes, p):
+    return duracoes[min(len(duracoes) - 1, int(len(duracoes) * p / 100))]
+
+def _aguardar_porta(porta, processo, limite=20):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        if processo.poll() is not None:
+            raise CommandError(f'O servidor terminou ao iniciar (código {processo.returncode}).')
+        try:
+            socket.create_connection(('127.0.0.1', porta), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError(f'O servidor não abriu a porta {porta} em {limite}s.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a latência dos dashboards e do faturamento sob carga concorrente '
+        'no servidor de desenvolvimento (WSGI) e num servidor ASGI local'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', default=URLS_PADRAO, help='Nomes das URLs medidas')
+        parser.add_argument('--usuario', help='Usuário das requisições (padrão: primeiro proprietário)')
+        parser.add_argument('--requisicoes', type=int, default=200, help='Requisições por URL e servidor')
+        parser.add_argument('--concorrencia', type=int, default=20, help='Requisições simultâneas')
+        parser.add_argument('--porta', type=int, default=8765, help='Porta usada pelos servidores')
+        parser.add_argument('--asgi', choices=list(SERVIDORES_ASGI), help='Servidor ASGI (padrão: o primeiro instalado)')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['NAME'] in ('', ':memory:'):
+            raise CommandError('Os servidores precisam de um banco em arquivo, compartilhado com este comando.')
+        urls = [reverse(nome) for nome in options['urls']]
+
+        asgi = options['asgi'] or next((nome for nome in SERVIDORES_ASGI if importlib.util.find_spec(nome)), None)
+        if asgi is None or not importlib.util.find_spec(asgi):
+            raise CommandError(f'Nenhum servidor ASGI instalado; instale um de: {", ".join(SERVIDORES_ASGI)}.')
+
+        porta = options['porta']
+        servidores = [
+            ('WSGI (runserver)', ['manage.py', 'runserver', '--noreload', f'127.0.0.1:{porta}']),
+            (f'ASGI ({asgi})', [argumento.format(porta=porta) for argumento in SERVIDORES_ASGI[asgi]]),
+        ]
+
+        sessao = self._sessao(options['usuario'])
+        try:
+            for titulo, comando in servidores:
+                self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+                # A saída do servidor (log de cada requisição) vai para um arquivo
+                with tempfile.TemporaryFile() as log:
+                    processo = subprocess.Popen(
+                        [sys.executable, *comando], cwd=settings.BASE_DIR,
+                        stdout=log, stderr=subprocess.STDOUT,
+                    )
+                    try:
+                        _aguardar_porta(porta, processo)
+                        for url in urls:
+                            self._medir(porta, url, sessao, options)
+                    except CommandError:
+                        log.seek(0)
+                        self.stderr.write(log.read().decode(errors='replace')[-2000:])
+                        raise
+                    finally:
+                        processo.terminate()
+                        processo.wait(timeout=10)
+        finally:
+            sessao.delete()
+
+    def _sessao(self, username):
+        """Sessão autenticada gravada no banco, usada pelos dois servidores"""
+        Usuario = get_user_model()
+        if username:
+            usuario = Usuario.objects.filter(username=username).first()
+        else:
+            usuario = Usuario.objects.filter(tipo_usuario='proprietario').order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Nenhum usuário para as requisições; use --usuario.')
+
+        sessao = import_string(settings.SESSION_ENGINE + '.SessionStore')()
+        sessao[SESSION_KEY] = usuario._meta.pk.value_to_string(usuario)
+        sessao[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sessao[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sessao.save()
+        return sessao
+
+    def _medir(self, porta, url, sessao, options):
+        cabecalhos = {'Cookie': f'{settings.SESSION_COOKIE_NAME}={sessao.session_key}'}
+
+        def requisicao(_):
+            conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+            inicio = time.perf_counter()
+            try:
+                conexao.request('GET', url, headers=cabecalhos)
+                resposta = conexao.getresponse()
+                resposta.read()
+                return resposta.status, time.perf_counter() - inicio
+            except OSError:
+                return None, time.perf_counter() - inicio
+            finally:
+                conexao.close()
+
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as executor:
+            # Aquecimento: conexões, templates e caches
+            list(executor.map(requisicao, range(options['concorrencia'])))
+            inicio = time.perf_counter()
+            resultados = list(executor.map(requisicao, range(options['requisicoes'])))
+            duracao = time.perf_counter() - inicio
+
+        duracoes = sorted(tempo * 1000 for codigo, tempo in resultados)
+        erros = sum(1 for codigo, tempo in resultados if codigo != 200)
+        linha = (
+            f'  {url}: {len(resultados) / duracao:,.0f} req/s, '
+            f'p50 {statistics.median(duracoes):.1f}ms, p95 {_percentil(duracoes, 95):.1f}ms, '
+            f'p99 {_percentil(duracoes, 99):.1f}ms, máx {duracoes[-1]:.1f}ms'
+        )
+        if erros:
+            codigos = sorted({str(codigo) for codigo, tempo in resultados if codigo != 200})
+            self.stdout.write(self.style.ERROR(f'{linha}, {erros} erro(s) ({", ".join(codigos)})'))
+        else:
+            self.stdout.write(linha)
@@ -0,0 +1,222 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from produtos.models import Produto, Categoria, Marca
+from vendas.clientes import buscar_clientes
+from vendas.models import Venda, Cliente
+from vendas.periodos import intervalo_dias
+
+
+# Índices das consultas mais usadas (migrações vendas 0008/0009 e produtos 0004):
+# o comando mede as consultas sem eles e depois com eles
+INDICES = {
+    Venda: ['venda_status_data_idx', 'venda_cliente_data_idx', 'venda_vendedor_data_idx'],
+    Produto: [
+        'produto_ativo_cadastro_idx', 'produto_ativo_categoria_idx',
+        'produto_ativo_marca_idx', 'produto_ativo_tipo_idx', 'produto_estoque_idx',
+    ],
+    Cliente: [
+        'cliente_ativo_nome_idx', 'cliente_nome_busca_idx',
+        'cliente_cpf_cnpj_digitos_idx', 'cliente_telefone_digitos_idx',
+    ],
+}
+
+def _consultas(cliente, vendedor, categoria, marca):
+    """(nome, queryset, execução) das consultas das telas e da API"""
+    hoje = timezone.localdate()
+    inicio_mes, fim_mes = intervalo_dias(hoje.replace(day=1), hoje)
+    ordem_vendas = ('-data_venda', 'id')
+    ativos = Produto.objects.filter(ativo=True)
+    ordem_produtos = ('-data_cadastro', 'id')
+    return [
+        ('vendas por status', Venda.objects.filter(status='pendente').order_by(*ordem_vendas)[:20], list),
+        ('vendas por cliente', Venda.objects.filter(cliente=cliente).order_by(*ordem_vendas)[:20], list),
+        ('vendas por vendedor', Venda.objects.filter(vendedor=vendedor).order_by(*ordem_vendas)[:20], list),
+        (
+            'faturamento do mês',
+            Venda.objects.filter(status='concluida', data_venda__gte=inicio_mes, data_venda__lt=fim_mes),
+            lambda qs: qs.aggregate(total=Sum('total')),
+        ),
+        ('produtos ativos', ativos.order_by(*ordem_produtos)[:20], list),
+        ('produtos por categoria', ativos.filter(categoria=categoria).order_by(*ordem_produtos)[:20], list),
+        ('produtos por marca', ativos.filter(marca=marca).order_by(*ordem_produtos)[:20], list),
+        ('produtos por tipo', ativos.filter(tipo='servico').order_by(*ordem_produtos)[:20], list),
+        ('estoque baixo', Produto.objects.filter(estoque__lte=F('estoque_minimo'), estoque__gt=0), lambda qs: qs.count()),
+        ('sem estoque', Produto.objects.filter(estoque=0), lambda qs: qs.count()),
+        ('clientes ativos', Cliente.objects.filter(ativo=True).order_by('nome', 'id')[:20], list),
+        ('cliente por CPF/CNPJ', buscar_clientes(Cliente.objects.all(), cliente.cpf_cnpj[:7]), list),
+        ('cliente por telefone', buscar_clientes(Cliente.objects.all(), cliente.telefone[:9]), list),
+        ('cliente por nome', buscar_clientes(Cliente.objects.all(), cliente.nome[:12]), list),
+    ]
+
+def _cpf(numero):
+    digitos = f'{numero:011d}'
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+def _datas(quantidade, dias):
+    agora = timezone.now()
+    return [agora - timedelta(seconds=random.randint(0, dias * 86400)) for _ in range(quantidade)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria dados de teste, mostra o EXPLAIN de cada consulta frequente e mede '
+        'o tempo sem e com os índices compostos. Tudo é desfeito ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendas', type=int, default=50000, help='Vendas criadas')
+        parser.add_argument('--produtos', type=int, default=5000, help='Produtos criados')
+        parser.add_argument('--clientes', type=int, default=5000, help='Clientes criados')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Execuções de cada consulta')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados aleatórios')
+
+    def handle(self, *args, **options):
+        random.seed(options['semente'])
+        with transaction.atomic():
+            parametros = self._criar_dados(options)
+            self._analisar()
+            consultas = _consultas(*parametros)
+
+            self._remover_indices()
+            sem = self._medir('Sem os índices', consultas, options['repeticoes'])
+            self._criar_indices()
+            com = self._medir('Com os índices', consultas, options['repeticoes'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Mediana por consulta (ms)'))
+            self.stdout.write(f"{'consulta':<25}{'sem':>10}{'com':>10}{'ganho':>9}")
+            for nome, _, _ in consultas:
+                ganho = sem[nome] / com[nome] if com[nome] else 0
+                self.stdout.write(f'{nome:<25}{sem[nome]:>10.2f}{com[nome]:>10.2f}{ganho:>8.1f}x')
+            transaction.set_rollback(True)
+
+    def _criar_dados(self, options):
+        inicio = time.perf_counter()
+        vendedores = get_user_model().objects.bulk_create([
+            get_user_model()(username=f'bench_vendedor_{i}', tipo_usuario='vendedor') for i in range(10)
+        ])
+        categorias = Categoria.objects.bulk_create([Categoria(nome=f'Bench {i}') for i in range(20)])
+        marcas = Marca.objects.bulk_create([Marca(nome=f'Bench {i}') for i in range(20)])
+
+        produtos = Produto.objects.bulk_create([
+            Produto(
+                nome=f'Produto {i}', descricao='-', preco=Decimal('10.00'),
+                categoria=random.choice(categorias), marca=random.choice(marcas),
+                tipo=random.choice(Produto.TIPO_CHOICES)[0],
+                estoque=random.choice([0, 2, 10, 50]), estoque_minimo=5,
+                ativo=random.random() < 0.9,
+            )
+            for i in range(options['produtos'])
+        ], batch_size=1000)
+        # data_cadastro é auto_now_add: as datas espalhadas vão num bulk_update
+        for produto, data in zip(produtos, _datas(len(produtos), 1000)):
+            produto.data_cadastro = data
+        Produto.objects.bulk_update(produtos, ['data_cadastro'], batch_size=200)
+
+        clientes = [
+            Cliente(
+                nome=f'Cliente {random.randint(0, 10 ** 6):07d}', cpf_cnpj=_cpf(random.randint(0, 10 ** 11 - 1)),
+                telefone=f'(11) 9{random.randint(0, 10 ** 4 - 1):04d}-{random.randint(0, 10 ** 4 - 1):04d}',
+                endereco='-', cidade='-', estado='SP', cep='-',
+                ativo=random.random() < 0.9,
+            )
+            for i in range(options['clientes'])
+        ]
+        # bulk_create não passa pelo save(), que preenche as cópias de busca
+        for cliente in clientes:
+            cliente.normalizar()
+        clientes = Cliente.objects.bulk_create(clientes, batch_size=1000)
+
+        vendas = Venda.objects.bulk_create([
+            Venda(
+                numero_venda=f'BENCH{i:010d}',
+                cliente=random.choice(clientes), vendedor=random.choice(vendedores),
+                status=random.choices(['concluida', 'aprovada', 'pendente', 'cancelada'], [70, 15, 10, 5])[0],
+                forma_pagamento=random.choice(Venda.FORMA_PAGAMENTO_CHOICES)[0],
+                subtotal=Decimal('100.00'), total=Decimal('100.00'),
+            )
+            for i in range(options['vendas'])
+        ], batch_size=1000)
+        for venda, data in zip(vendas, _datas(len(vendas), 3 * 365)):
+            venda.data_venda = data
+        Venda.objects.bulk_update(vendas, ['data_venda'], batch_size=200)
+
+        self.stdout.write(
+            f'{len(vendas)} vendas, {len(produtos)} produtos e {len(clientes)} clientes '
+            f'criados em {time.perf_counter() - inicio:.1f}s'
+        )
+        return clientes[0], vendedores[0], categorias[0], marcas[0]
+
+    def _analisar(self):
+        """Estatísticas para o planejador (sqlite_stat1 / pg_statistic)"""
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _indices(self):
+        for modelo, nomes in INDICES.items():
+            for indice in modelo._meta.indexes:
+                if indice.name in nomes:
+                    yield modelo, indice
+
+    def _executar(self, sqls):
+        with connection.cursor() as cursor:
+            for sql in sqls:
+                cursor.execute(str(sql))
+
+    def _remover_indices(self):
+        # Só o SQL de cada índice, executado dentro da transação do comando
+        editor = connection.schema_editor(collect_sql=True)
+        qn = connection.ops.quote_name
+        self._executar(
+            editor.sql_delete_index % {'table': qn(modelo._meta.db_table), 'name': qn(indice.name)}
+            for modelo, indice in self._indices()
+        )
+        self._analisar()
+
+    def _criar_indices(self):
+        editor = connection.schema_editor(collect_sql=True)
+        self._executar(indice.create_sql(modelo, editor) for modelo, indice in self._indices())
+        self._analisar()
+
+    def _plano(self, queryset, execucao):
+        """
+        Plano da consulta que a execução manda ao banco (ex.: o COUNT(*) de
+        um count(), que pode usar outro índice que o SELECT do queryset)
+        """
+        executadas = []
+
+        def capturar(execute, sql, params, many, context):
+            executadas.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capturar):
+            execucao(queryset.all())
+        sql, params = executadas[-1]
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [' '.join(str(coluna) for coluna in linha) for linha in cursor.fetchall()]
+
+    def _medir(self, titulo, consultas, repeticoes):
+        self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+        medianas = {}
+        for nome, queryset, execucao in consultas:
+            self.stdout.write(self.style.SQL_KEYWORD(f'{nome}:'))
+            for linha in self._plano(queryset, execucao):
+                self.stdout.write(f'    {linha}')
+            duracoes = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                execucao(queryset.all())
+                duracoes.append((time.perf_counter() - inicio) * 1000)
+            medianas[nome] = statistics.median(duracoes)
+        return medianas
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from vendas.models import SequenciaVenda
+from vendas.numeracao import AlocadorNumeracao
+
+
+def _alocar(prefixo, bloco, quantidade, threads):
+    """Aloca `quantidade` números com `threads` threads e devolve a lista"""
+    alocador = AlocadorNumeracao(prefixo=prefixo, bloco=bloco)
+
+    def trabalho(n):
+        try:
+            return [alocador.proximo() for _ in range(n)]
+        finally:
+            connections.close_all()
+
+    partes = [quantidade // threads + (1 if i < quantidade % threads else 0) for i in range(threads)]
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return [numero for lista in executor.map(trabalho, partes) for numero in lista]
+
+def _processo(args):
+    connections.close_all()
+    return _alocar(*args)
+
+
+class Command(BaseCommand):
+    help = 'Mede a vazão do alocador de números de venda e confere se não há repetições'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=10000, help='Números por processo')
+        parser.add_argument('--bloco', type=int, default=50, help='Tamanho do bloco reservado no banco')
+        parser.add_argument('--threads', type=int, default=4, help='Threads por processo')
+        parser.add_argument('--processos', type=int, default=1, help='Processos concorrentes')
+        parser.add_argument('--prefixo', default='BENCH', help='Prefixo usado no teste (removido ao final)')
+
+    def handle(self, *args, **options):
+        prefixo = options['prefixo']
+        if SequenciaVenda.objects.filter(chave__startswith=prefixo).exists():
+            raise CommandError(f'Já existem sequências com o prefixo {prefixo}; use outro --prefixo.')
+
+        argumentos = (prefixo, options['bloco'], options['quantidade'], options['threads'])
+        inicio = time.perf_counter()
+        try:
+            if options['processos'] > 1:
+                connections.close_all()
+                with get_context('fork').Pool(options['processos']) as pool:
+                    resultados = pool.map(_processo, [argumentos] * options['processos'])
+                numeros = [numero for lista in resultados for numero in lista]
+            else:
+                numeros = _alocar(*argumentos)
+            duracao = time.perf_counter() - inicio
+        finally:
+            SequenciaVenda.objects.filter(chave__startswith=prefixo).delete()
+
+        repetidos = len(numeros) - len(set(numeros))
+        por_segundo = len(numeros) / duracao if duracao else 0
+        self.stdout.write(
+            f"{len(numeros)} números em {duracao:.3f}s ({por_segundo:,.0f} números/s), "
+            f"{options['processos']} processo(s) x {options['threads']} thread(s), "
+            f"bloco de {options['bloco']}"
+        )
+        if repetidos:
+            raise CommandError(f'{repetidos} números repetidos!')
+        self.stdout.write(self.style.SUCCESS('Nenhum número repetido.'))
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, Round
+
+from produtos.models import Produto
+from vendas.models import Venda, ItemVenda, Faturamento, CuboVendas, MARGEM_ESTIMADA
+
+
+class Command(BaseCommand):
+    help = 'Preenche custo e lucro persistidos de itens e vendas já existentes'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recapturar-custo',
+            action='store_true',
+            help='Substitui também os custos já capturados pelo preço de custo atual dos produtos',
+        )
+    
+    def handle(self, *args, **options):
+        decimal = DecimalField(max_digits=10, decimal_places=2)
+        inicio = time.perf_counter()
+        
+        with transaction.atomic():
+            itens = ItemVenda.objects.all()
+            if not options['recapturar_custo']:
+                itens = itens.filter(custo_unitario__isnull=True)
+            
+            # Custo: preço de custo do produto ou, sem ele, a margem estimada
+            preco_custo = Produto.objects.filter(pk=OuterRef('produto_id')).values('preco_custo')
+            custos = itens.update(custo_unitario=Round(
+                Coalesce(
+                    Subquery(preco_custo),
+                    F('preco_unitario') * Value(1 - MARGEM_ESTIMADA),
+                    output_field=decimal,
+                ),
+                precision=2,
+            ))
+            
+            ItemVenda.objects.update(lucro_estimado=(
+                F('quantidade') * F('preco_unitario') - F('desconto_item')
+                - F('custo_unitario') * F('quantidade')
+            ))
+            
+            lucro_itens = ItemVenda.objects.filter(venda=OuterRef('pk')).values('venda').annotate(
+                total=Sum('lucro_estimado')
+            ).values('total')
+            vendas = Venda.objects.update(lucro_estimado=(
+                Coalesce(Subquery(lucro_itens), Value(0), output_field=decimal) - F('desconto')
+            ))
+            
+            dias = Faturamento.reconstruir_periodo()['dias']
+            CuboVendas.reconstruir_periodo()
+        
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{custos} custos capturados, {vendas} vendas e {dias} dias de faturamento '
+            f'recalculados em {duracao:.2f}s.'
+        ))
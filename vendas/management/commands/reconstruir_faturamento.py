@@ -0,0 +1,56 @@
+import calendar
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vendas.models import Faturamento, CuboVendas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o faturamento e o cubo de vendas de um período a partir das vendas'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', help='Data inicial (AAAA-MM-DD)')
+        parser.add_argument('--fim', help='Data final (AAAA-MM-DD)')
+        parser.add_argument('--mes', help='Mês completo (AAAA-MM)')
+        parser.add_argument('--ano', type=int, help='Ano completo')
+        parser.add_argument('--tudo', action='store_true', help='Todo o histórico')
+    
+    def handle(self, *args, **options):
+        data_inicio, data_fim = self._periodo(options)
+        
+        inicio = time.perf_counter()
+        resultado = Faturamento.reconstruir_periodo(data_inicio, data_fim)
+        duracao = time.perf_counter() - inicio
+        
+        inicio_cubo = time.perf_counter()
+        linhas_cubo = CuboVendas.reconstruir_periodo(data_inicio, data_fim)
+        duracao_cubo = time.perf_counter() - inicio_cubo
+        
+        por_segundo = resultado['vendas'] / duracao if duracao else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Faturamento reconstruído: {resultado['dias']} dias, "
+            f"{resultado['vendas']} vendas em {duracao:.3f}s "
+            f"({por_segundo:,.0f} vendas/s)"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Cubo de vendas reconstruído: {linhas_cubo} linhas em {duracao_cubo:.3f}s"
+        ))
+    
+    def _periodo(self, options):
+        try:
+            if options['tudo']:
+                return None, None
+            if options['ano']:
+                return date(options['ano'], 1, 1), date(options['ano'], 12, 31)
+            if options['mes']:
+                ano, mes = map(int, options['mes'].split('-'))
+                return date(ano, mes, 1), date(ano, mes, calendar.monthrange(ano, mes)[1])
+            if options['inicio'] or options['fim']:
+                data_inicio = date.fromisoformat(options['inicio']) if options['inicio'] else None
+                data_fim = date.fromisoformat(options['fim']) if options['fim'] else None
+                return data_inicio, data_fim
+        except ValueError as e:
+            raise CommandError(f'Período inválido: {e}')
+        raise CommandError('Informe --inicio/--fim, --mes, --ano ou --tudo.')
@@ -0,0 +1,119 @@
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from rpm_motos.consultas import configuracao, orcamento_view, registrar_consultas
+
+
+def _padroes(resolver, namespace=''):
+    """(nome com namespace, padrão) de todas as URLs nomeadas do projeto"""
+    for padrao in resolver.url_patterns:
+        if isinstance(padrao, URLResolver):
+            interno = f'{namespace}{padrao.namespace}:' if padrao.namespace else namespace
+            yield from _padroes(padrao, interno)
+        elif padrao.name:
+            yield f'{namespace}{padrao.name}', padrao
+
+def _argumentos(padrao):
+    regex = getattr(padrao.pattern, 'regex', None)
+    return list(regex.groupindex) if regex is not None else []
+
+def _modelo_da_view(padrao):
+    """
+    Modelo do <pk> da URL: o queryset do ViewSet ou, nas demais views, o
+    modelo cujo nome aparece no nome da view (detalhe_venda, VendaAPIView)
+    """
+    view = padrao.callback
+    classe = getattr(view, 'cls', None) or getattr(view, 'view_class', None)
+    queryset = getattr(classe, 'queryset', None)
+    if queryset is not None:
+        return queryset.model
+    nome = (classe.__name__ if classe else view.__name__).lower()
+    candidatos = [modelo for modelo in apps.get_models() if modelo._meta.model_name in nome]
+    app = view.__module__.split('.')[0]
+    candidatos.sort(key=lambda modelo: (modelo._meta.app_label == app, len(modelo._meta.model_name)))
+    return candidatos[-1] if candidatos else None
+
+
+class Command(BaseCommand):
+    help = (
+        'Faz um GET em cada URL do projeto e confere o número de consultas '
+        'com os orçamentos de MONITOR_CONSULTAS e as consultas repetidas (N+1)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Usuário logado nas requisições (padrão: primeiro proprietário)')
+        parser.add_argument('--filtro', default='', help='Só URLs cujo nome contenha este texto')
+        parser.add_argument('--repeticoes', type=int, help='Vezes que um formato de consulta pode se repetir')
+        parser.add_argument('--admin', action='store_true', help='Inclui as URLs do admin')
+
+    def handle(self, *args, **options):
+        Usuario = get_user_model()
+        if options['usuario']:
+            usuario = Usuario.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = Usuario.objects.filter(tipo_usuario='proprietario').order_by('pk').first()
+        if usuario is None:
+            raise CommandError('Nenhum usuário para as requisições; use --usuario.')
+
+        repeticoes = options['repeticoes'] or configuracao()['REPETICOES']
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        cliente = Client(HTTP_HOST=host, raise_request_exception=False)
+
+        # O middleware de monitoramento fica desligado: o relatório é este
+        with override_settings(MONITOR_CONSULTAS={**configuracao(), 'ATIVO': False}):
+            vistos, falhas = self._verificar(cliente, usuario, repeticoes, options)
+
+        if falhas:
+            raise CommandError(f'{falhas} URL(s) fora do orçamento ou com consultas repetidas.')
+        self.stdout.write(self.style.SUCCESS(f'{len(vistos)} URLs dentro do orçamento.'))
+
+    def _verificar(self, cliente, usuario, repeticoes, options):
+        vistos = set()
+        falhas = 0
+        for nome, padrao in _padroes(get_resolver()):
+            if nome in vistos or options['filtro'] not in nome:
+                continue
+            if nome.startswith('admin:') and not options['admin']:
+                continue
+            vistos.add(nome)
+
+            argumentos = _argumentos(padrao)
+            kwargs = {}
+            if 'format' in argumentos:
+                continue
+            if argumentos:
+                modelo = _modelo_da_view(padrao) if argumentos == ['pk'] else None
+                pk = modelo._default_manager.order_by('pk').values_list('pk', flat=True).first() if modelo else None
+                if pk is None:
+                    self.stdout.write(f'  -   {nome}: sem valor para {", ".join(argumentos)}')
+                    continue
+                kwargs['pk'] = pk
+            url = reverse(nome, kwargs=kwargs)
+
+            # Cada requisição roda numa transação desfeita ao final
+            with transaction.atomic():
+                cliente.force_login(usuario)
+                with registrar_consultas() as registro:
+                    resposta = cliente.get(url)
+                transaction.set_rollback(True)
+
+            limite = orcamento_view(nome)
+            problemas = registro.problemas(limite, repeticoes)
+            linha = (
+                f'{resposta.status_code} {nome} {url}: {registro.total} consultas'
+                f'{f" (orçamento {limite})" if limite is not None else ""}, '
+                f'{registro.tempo * 1000:.1f}ms de banco'
+            )
+            if problemas:
+                falhas += 1
+                self.stdout.write(self.style.ERROR(linha))
+                for problema in problemas:
+                    self.stdout.write(f'      {problema}')
+            else:
+                self.stdout.write(linha)
+        return vistos, falhas
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemvenda',
+            name='custo_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Custo Unitário'),
+        ),
+        migrations.AddField(
+            model_name='itemvenda',
+            name='lucro_estimado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Lucro Estimado'),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='lucro_estimado',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Lucro Estimado'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0002_itemvenda_custo_unitario_itemvenda_lucro_estimado_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaVenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=20, unique=True, verbose_name='Chave')),
+                ('ultimo', models.PositiveBigIntegerField(default=0, verbose_name='Último Número')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Venda',
+                'verbose_name_plural': 'Sequências de Venda',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0003_sequenciavenda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaturamentoPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('semana', 'Semana'), ('mes', 'Mês'), ('ano', 'Ano')], max_length=10, verbose_name='Tipo')),
+                ('inicio', models.DateField(verbose_name='Início')),
+                ('vendas', models.PositiveIntegerField(default=0, verbose_name='Vendas')),
+                ('faturamento_bruto', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Faturamento Bruto')),
+                ('desconto_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Desconto Total')),
+                ('faturamento_liquido', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Faturamento Líquido')),
+                ('lucro_estimado', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Lucro Estimado')),
+            ],
+            options={
+                'verbose_name': 'Faturamento do Período',
+                'verbose_name_plural': 'Faturamentos dos Períodos',
+                'ordering': ['tipo', '-inicio'],
+                'unique_together': {('tipo', 'inicio')},
+            },
+        ),
+    ]
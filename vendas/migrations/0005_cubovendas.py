@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0002_produto_preco_custo'),
+        ('vendas', '0004_faturamentoperiodo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CuboVendas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('forma_pagamento', models.CharField(choices=[('dinheiro', 'Dinheiro'), ('cartao_credito', 'Cartão de Crédito'), ('cartao_debito', 'Cartão de Débito'), ('pix', 'PIX'), ('transferencia', 'Transferência'), ('boleto', 'Boleto')], max_length=20, verbose_name='Forma de Pagamento')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade')),
+                ('faturamento_bruto', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Faturamento Bruto')),
+                ('lucro_estimado', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Lucro Estimado')),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='produtos.categoria', verbose_name='Categoria')),
+                ('marca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='produtos.marca', verbose_name='Marca')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='produtos.produto', verbose_name='Produto')),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Cubo de Vendas',
+                'verbose_name_plural': 'Cubo de Vendas',
+                'indexes': [models.Index(fields=['vendedor', 'data'], name='vendas_cubo_vendedo_c358f3_idx'), models.Index(fields=['produto', 'data'], name='vendas_cubo_produto_fb67ec_idx'), models.Index(fields=['categoria', 'data'], name='vendas_cubo_categor_cd55db_idx'), models.Index(fields=['marca', 'data'], name='vendas_cubo_marca_i_ebe4c5_idx')],
+                'unique_together': {('data', 'vendedor', 'produto', 'forma_pagamento')},
+            },
+        ),
+    ]
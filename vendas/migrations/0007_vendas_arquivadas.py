@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:35
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0003_indices_paginacao'),
+        ('vendas', '0006_indices_paginacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaArquivada',
+            fields=[
+                ('numero_venda', models.CharField(max_length=20, unique=True, verbose_name='Número da Venda')),
+                ('data_venda', models.DateTimeField(auto_now_add=True, verbose_name='Data da Venda')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('aprovada', 'Aprovada'), ('cancelada', 'Cancelada'), ('concluida', 'Concluída')], default='pendente', max_length=20, verbose_name='Status')),
+                ('forma_pagamento', models.CharField(choices=[('dinheiro', 'Dinheiro'), ('cartao_credito', 'Cartão de Crédito'), ('cartao_debito', 'Cartão de Débito'), ('pix', 'PIX'), ('transferencia', 'Transferência'), ('boleto', 'Boleto')], max_length=20, verbose_name='Forma de Pagamento')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Subtotal')),
+                ('desconto', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Desconto')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Total')),
+                ('lucro_estimado', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Lucro Estimado')),
+                ('observacoes', models.TextField(blank=True, verbose_name='Observações')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('arquivada_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Arquivada em')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vendas.cliente', verbose_name='Cliente')),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Venda Arquivada',
+                'verbose_name_plural': 'Vendas Arquivadas',
+                'ordering': ['-data_venda'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemVendaArquivado',
+            fields=[
+                ('quantidade', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Quantidade')),
+                ('preco_unitario', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço Unitário')),
+                ('desconto_item', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Desconto do Item')),
+                ('custo_unitario', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Custo Unitário')),
+                ('lucro_estimado', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Lucro Estimado')),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='produtos.produto', verbose_name='Produto')),
+                ('venda', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='vendas.vendaarquivada', verbose_name='Venda')),
+            ],
+            options={
+                'verbose_name': 'Item de Venda Arquivada',
+                'verbose_name_plural': 'Itens de Vendas Arquivadas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='vendaarquivada',
+            index=models.Index(fields=['data_venda'], name='venda_arquivada_data_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0007_vendas_arquivadas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['nome', 'id'], name='cliente_ativo_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['status', '-data_venda', 'id'], name='venda_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['cliente', '-data_venda', 'id'], name='venda_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['vendedor', '-data_venda', 'id'], name='venda_vendedor_data_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:12
+
+from django.db import migrations, models
+
+from vendas.clientes import normalizar_nome, somente_digitos
+
+
+def preencher_campos_busca(apps, schema_editor):
+    Cliente = apps.get_model('vendas', 'Cliente')
+    clientes = list(Cliente.objects.only('nome', 'cpf_cnpj', 'telefone'))
+    for cliente in clientes:
+        cliente.nome_busca = normalizar_nome(cliente.nome)
+        cliente.cpf_cnpj_digitos = somente_digitos(cliente.cpf_cnpj)
+        cliente.telefone_digitos = somente_digitos(cliente.telefone)
+    Cliente.objects.bulk_update(
+        clientes, ['nome_busca', 'cpf_cnpj_digitos', 'telefone_digitos'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendas', '0008_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='cpf_cnpj_digitos',
+            field=models.CharField(default='', editable=False, max_length=18),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='telefone_digitos',
+            field=models.CharField(default='', editable=False, max_length=15),
+        ),
+        migrations.RunPython(preencher_campos_busca, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nome_busca'], name='cliente_nome_busca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['cpf_cnpj_digitos'], name='cliente_cpf_cnpj_digitos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['telefone_digitos'], name='cliente_telefone_digitos_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_categoria_marca(apps, schema_editor):
+    # Vendas anteriores: o melhor dado disponível é a categoria e a marca atuais do produto
+    Produto = apps.get_model('produtos', 'Produto')
+    for nome in ('ItemVenda', 'ItemVendaArquivado'):
+        apps.get_model('vendas', nome).objects.update(
+            categoria_id=Subquery(Produto.objects.filter(pk=OuterRef('produto_id')).values('categoria_id')[:1]),
+            marca_id=Subquery(Produto.objects.filter(pk=OuterRef('produto_id')).values('marca_id')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('produtos', '0006_indice_codigos'),
+        ('vendas', '0009_busca_clientes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemvenda',
+            name='categoria',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='produtos.categoria', verbose_name='Categoria'),
+        ),
+        migrations.AddField(
+            model_name='itemvenda',
+            name='marca',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='produtos.marca', verbose_name='Marca'),
+        ),
+        migrations.AddField(
+            model_name='itemvendaarquivado',
+            name='categoria',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='produtos.categoria', verbose_name='Categoria'),
+        ),
+        migrations.AddField(
+            model_name='itemvendaarquivado',
+            name='marca',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='produtos.marca', verbose_name='Marca'),
+        ),
+        migrations.RunPython(preencher_categoria_marca, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='cubovendas',
+            unique_together={('data', 'vendedor', 'produto', 'categoria', 'marca', 'forma_pagamento')},
+        ),
+    ]
@@ -1,12 +1,23 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Sum, Count
+from django.db.models.functions import TruncDate, TruncWeek, TruncMonth, TruncYear
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from django.contrib.auth import get_user_model
-from produtos.models import Produto
+from produtos.models import Produto, Categoria, Marca
 from decimal import Decimal
+from .clientes import somente_digitos, normalizar_nome
+from .periodos import (
+    fuso_local, intervalo_dias, intervalos_continuos,
+    TIPOS_PERIODO, inicio_periodo, fim_periodo, decompor_intervalo,
+)
 
 Usuario = get_user_model()
 
+# Margem usada para estimar o custo de produtos sem preço de custo cadastrado
+MARGEM_ESTIMADA = Decimal('0.3')
+
 class Cliente(models.Model):
     TIPO_CHOICES = [
         ('pessoa_fisica', 'Pessoa Física'),
@@ -30,15 +41,54 @@ class Cliente(models.Model):
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name=_('Data de Cadastro'))
     ativo = models.BooleanField(default=True, verbose_name=_('Ativo'))
     
+    # Cópias normalizadas para a busca por índice (ver vendas/clientes.py)
+    nome_busca = models.CharField(max_length=200, default='', editable=False)
+    cpf_cnpj_digitos = models.CharField(max_length=18, default='', editable=False)
+    telefone_digitos = models.CharField(max_length=15, default='', editable=False)
+    
+    CAMPOS_BUSCA = {
+        'nome': 'nome_busca',
+        'cpf_cnpj': 'cpf_cnpj_digitos',
+        'telefone': 'telefone_digitos',
+    }
+    
     class Meta:
         verbose_name = _('Cliente')
         verbose_name_plural = _('Clientes')
         ordering = ['nome']
+        indexes = [
+            models.Index(fields=['nome', 'id'], name='cliente_nome_id_idx'),
+            # Clientes ativos em ordem alfabética (selects dos formulários e
+            # filtros). Os índices parciais (condition) atendem o filtro
+            # ativo=True, que o Django escreve como WHERE "ativo" e não pode
+            # ser a primeira coluna de um índice comum
+            models.Index(fields=['nome', 'id'], condition=Q(ativo=True), name='cliente_ativo_nome_idx'),
+            models.Index(fields=['nome_busca'], name='cliente_nome_busca_idx'),
+            models.Index(fields=['cpf_cnpj_digitos'], name='cliente_cpf_cnpj_digitos_idx'),
+            models.Index(fields=['telefone_digitos'], name='cliente_telefone_digitos_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nome} ({self.cpf_cnpj})"
+    
+    def normalizar(self):
+        """Preenche as cópias de busca (CAMPOS_BUSCA) a partir dos campos digitados"""
+        self.nome_busca = normalizar_nome(self.nome)
+        self.cpf_cnpj_digitos = somente_digitos(self.cpf_cnpj)
+        self.telefone_digitos = somente_digitos(self.telefone)
+    
+    def save(self, *args, **kwargs):
+        self.normalizar()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields,
+                *(copia for campo, copia in self.CAMPOS_BUSCA.items() if campo in update_fields),
+            }
+        super().save(*args, **kwargs)
 
-class Venda(models.Model):
+class VendaBase(models.Model):
+    """Campos comuns à venda e à venda arquivada"""
     STATUS_CHOICES = [
         ('pendente', 'Pendente'),
         ('aprovada', 'Aprovada'),
@@ -55,6 +105,17 @@ class Venda(models.Model):
         ('boleto', 'Boleto'),
     ]
     
+    # Status que entram no faturamento
+    STATUS_FATURADOS = ['concluida', 'aprovada']
+    
+    # Mudanças de status permitidas (status atual -> novos status)
+    TRANSICOES_STATUS = {
+        'pendente': ['aprovada', 'concluida', 'cancelada'],
+        'aprovada': ['concluida', 'cancelada'],
+        'concluida': ['cancelada'],
+        'cancelada': ['pendente', 'aprovada', 'concluida'],
+    }
+    
     numero_venda = models.CharField(
         max_length=20, 
         unique=True, 
@@ -100,34 +161,66 @@ class Venda(models.Model):
         default=0,
         verbose_name=_('Total')
     )
+    lucro_estimado = models.DecimalField(
+        max_digits=10, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Lucro Estimado')
+    )
     observacoes = models.TextField(blank=True, verbose_name=_('Observações'))
     
+    class Meta:
+        abstract = True
+    
+    def __str__(self):
+        return f"Venda {self.numero_venda} - {self.cliente.nome}"
+    
+    @property
+    def data_local(self):
+        """Data da venda no fuso horário local (America/Sao_Paulo)"""
+        return timezone.localdate(self.data_venda)
+    
+    @property
+    def faturada(self):
+        return self.status in self.STATUS_FATURADOS
+
+class Venda(VendaBase):
+    arquivada = False
+    
     class Meta:
         verbose_name = _('Venda')
         verbose_name_plural = _('Vendas')
         ordering = ['-data_venda']
+        indexes = [
+            models.Index(fields=['-data_venda', 'id'], name='venda_data_id_idx'),
+            # Listas filtradas (filtrar_vendas) na ordem da paginação e somas
+            # de um status num intervalo de datas
+            models.Index(fields=['status', '-data_venda', 'id'], name='venda_status_data_idx'),
+            models.Index(fields=['cliente', '-data_venda', 'id'], name='venda_cliente_data_idx'),
+            models.Index(fields=['vendedor', '-data_venda', 'id'], name='venda_vendedor_data_idx'),
+        ]
     
-    def __str__(self):
-        return f"Venda {self.numero_venda} - {self.cliente.nome}"
+    def save(self, *args, **kwargs):
+        """Gera o número da venda na primeira gravação"""
+        from .numeracao import proximo_numero_venda
+        
+        if not self.numero_venda:
+            self.numero_venda = proximo_numero_venda()
+        super().save(*args, **kwargs)
     
     def calcular_totais(self):
-        """Calcula subtotal e total da venda"""
-        self.subtotal = sum(item.subtotal for item in self.itens.all())
+        """Calcula subtotal, total e lucro da venda"""
+        totais = self.itens.aggregate(
+            subtotal=Sum(F('quantidade') * F('preco_unitario') - F('desconto_item')),
+            lucro=Sum('lucro_estimado'),
+        )
+        self.subtotal = totais['subtotal'] or 0
         self.total = self.subtotal - self.desconto
+        self.lucro_estimado = (totais['lucro'] or 0) - self.desconto
         self.save()
-    
-    @property
-    def lucro_estimado(self):
-        """Calcula o lucro estimado da venda"""
-        return sum(item.lucro_estimado for item in self.itens.all())
 
-class ItemVenda(models.Model):
-    venda = models.ForeignKey(
-        Venda, 
-        on_delete=models.CASCADE, 
-        related_name='itens',
-        verbose_name=_('Venda')
-    )
+class ItemVendaBase(models.Model):
+    """Campos comuns ao item de venda e ao item arquivado"""
     produto = models.ForeignKey(
         Produto, 
         on_delete=models.CASCADE, 
@@ -148,39 +241,136 @@ class ItemVenda(models.Model):
         default=0,
         verbose_name=_('Desconto do Item')
     )
+    custo_unitario = models.DecimalField(
+        max_digits=10, 
+        decimal_places=2, 
+        blank=True, 
+        null=True,
+        verbose_name=_('Custo Unitário')
+    )
+    lucro_estimado = models.DecimalField(
+        max_digits=10, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Lucro Estimado')
+    )
+    # Categoria e marca do produto no momento da venda (dimensões do cubo)
+    categoria = models.ForeignKey(
+        Categoria, 
+        on_delete=models.CASCADE, 
+        null=True, 
+        blank=True, 
+        editable=False,
+        verbose_name=_('Categoria')
+    )
+    marca = models.ForeignKey(
+        Marca, 
+        on_delete=models.CASCADE, 
+        null=True, 
+        blank=True, 
+        editable=False,
+        verbose_name=_('Marca')
+    )
     
     class Meta:
-        verbose_name = _('Item da Venda')
-        verbose_name_plural = _('Itens da Venda')
+        abstract = True
     
     def __str__(self):
         return f"{self.produto.nome} - {self.quantidade}x"
     
+    def capturar_produto(self):
+        """Guarda categoria e marca do produto no momento da venda"""
+        if self.categoria_id is None:
+            self.categoria_id = self.produto.categoria_id
+        if self.marca_id is None:
+            self.marca_id = self.produto.marca_id
+    
     @property
     def subtotal(self):
         """Calcula o subtotal do item"""
         return self.quantidade * self.preco_unitario - self.desconto_item
+
+class ItemVenda(ItemVendaBase):
+    venda = models.ForeignKey(
+        Venda, 
+        on_delete=models.CASCADE, 
+        related_name='itens',
+        verbose_name=_('Venda')
+    )
     
-    @property
-    def lucro_estimado(self):
-        """Calcula o lucro estimado do item (assumindo margem de 30%)"""
-        custo_estimado = self.preco_unitario * Decimal('0.7')  # Margem de 30%
-        return (self.preco_unitario - custo_estimado) * self.quantidade
+    class Meta:
+        verbose_name = _('Item da Venda')
+        verbose_name_plural = _('Itens da Venda')
+    
+    def calcular_lucro(self):
+        """
+        Captura o custo do produto no momento da venda e calcula o lucro do item.
+        Produtos sem preço de custo usam a margem estimada de 30%.
+        """
+        if self.custo_unitario is None:
+            custo = self.produto.preco_custo
+            if custo is None:
+                custo = self.preco_unitario * (1 - MARGEM_ESTIMADA)
+            self.custo_unitario = Decimal(custo).quantize(Decimal('0.01'))
+        self.lucro_estimado = self.subtotal - self.custo_unitario * self.quantidade
     
     def save(self, *args, **kwargs):
-        """Atualiza o estoque quando o item é salvo"""
-        is_new = self.pk is None
-        
-        # Salvar primeiro o item
-        super().save(*args, **kwargs)
+        """Reserva o estoque do item (ou a diferença, na edição) e grava o item"""
+        from .services import reservar_estoque
         
-        # Depois atualizar estoque se necessário (apenas para novos itens)
-        if is_new and hasattr(self.produto, 'atualizar_estoque'):
-            self.produto.atualizar_estoque(self.quantidade, 'venda')
+        is_new = self.pk is None
+        self.calcular_lucro()
         
-        # Calcular totais da venda
-        if hasattr(self, 'venda') and self.venda:
-            self.venda.calcular_totais()
+        with transaction.atomic():
+            # Baixar o estoque antes de gravar o item; na edição a quantidade
+            # anterior volta ao produto anterior na mesma reserva.
+            # Levanta EstoqueInsuficiente se não houver quantidade disponível.
+            if is_new:
+                reservar_estoque([(self.produto_id, self.quantidade)])
+            else:
+                anterior = ItemVenda.objects.get(pk=self.pk)
+                reservar_estoque([(anterior.produto_id, -anterior.quantidade), (self.produto_id, self.quantidade)])
+                CuboVendas.aplicar_venda(self.venda, -1, [anterior])
+                if anterior.produto_id != self.produto_id:
+                    self.categoria_id = self.marca_id = None
+            self.capturar_produto()
+            
+            super().save(*args, **kwargs)
+            CuboVendas.aplicar_venda(self.venda, 1, [self])
+            
+            # Calcular totais da venda
+            if hasattr(self, 'venda') and self.venda:
+                self.venda.calcular_totais()
+
+# Vendas encerradas e antigas movidas das tabelas de uso diário (ver
+# vendas/arquivo.py). Guardam o mesmo id da venda original e são apenas
+# consulta: o Faturamento e o cubo continuam contando com elas.
+
+class VendaArquivada(VendaBase):
+    id = models.BigIntegerField(primary_key=True, verbose_name=_('ID'))
+    arquivada_em = models.DateTimeField(default=timezone.now, verbose_name=_('Arquivada em'))
+    arquivada = True
+    
+    class Meta:
+        verbose_name = _('Venda Arquivada')
+        verbose_name_plural = _('Vendas Arquivadas')
+        ordering = ['-data_venda']
+        indexes = [
+            models.Index(fields=['data_venda'], name='venda_arquivada_data_idx'),
+        ]
+
+class ItemVendaArquivado(ItemVendaBase):
+    id = models.BigIntegerField(primary_key=True, verbose_name=_('ID'))
+    venda = models.ForeignKey(
+        VendaArquivada, 
+        on_delete=models.CASCADE, 
+        related_name='itens',
+        verbose_name=_('Venda')
+    )
+    
+    class Meta:
+        verbose_name = _('Item de Venda Arquivada')
+        verbose_name_plural = _('Itens de Vendas Arquivadas')
 
 class Faturamento(models.Model):
     """Modelo para controlar o faturamento total da empresa"""
@@ -220,19 +410,614 @@ class Faturamento(models.Model):
         return f"Faturamento {self.data} - R$ {self.faturamento_liquido}"
     
     @classmethod
-    def atualizar_faturamento_dia(cls, data):
-        """Atualiza o faturamento de uma data específica"""
-        vendas = Venda.objects.filter(
-            data_venda__date=data,
-            status__in=['concluida', 'aprovada']
-        )
+    def aplicar_delta(cls, data, vendas=0, bruto=0, desconto=0, liquido=0, lucro=0):
+        """
+        Soma uma variação ao faturamento de uma data e ao da semana, mês e
+        ano que a contêm. A atualização é feita no banco (F expressions),
+        sem ler a linha, para que escritas concorrentes não se sobrescrevam.
+        """
+        if not any([vendas, bruto, desconto, liquido, lucro]):
+            return
         
+        valores = {
+            'vendas_dia': F('vendas_dia') + vendas,
+            'faturamento_bruto': F('faturamento_bruto') + bruto,
+            'desconto_total': F('desconto_total') + desconto,
+            'faturamento_liquido': F('faturamento_liquido') + liquido,
+            'lucro_estimado': F('lucro_estimado') + lucro,
+        }
+        with transaction.atomic():
+            if not cls.objects.filter(data=data).update(**valores):
+                cls.objects.get_or_create(data=data)
+                cls.objects.filter(data=data).update(**valores)
+            FaturamentoPeriodo.aplicar_delta(data, vendas, bruto, desconto, liquido, lucro)
+    
+    @classmethod
+    def atualizar_faturamento_dia(cls, data):
+        """Recalcula do zero o faturamento de uma data específica"""
+        cls.reconstruir_periodo(data, data)
         faturamento, created = cls.objects.get_or_create(data=data)
-        faturamento.vendas_dia = vendas.count()
-        faturamento.faturamento_bruto = sum(v.subtotal for v in vendas)
-        faturamento.desconto_total = sum(v.desconto for v in vendas)
-        faturamento.faturamento_liquido = sum(v.total for v in vendas)
-        faturamento.lucro_estimado = sum(v.lucro_estimado for v in vendas)
-        faturamento.save()
-        
         return faturamento
+    
+    @classmethod
+    def reconstruir_periodo(cls, data_inicio=None, data_fim=None, batch_size=1000):
+        """
+        Recalcula o faturamento de um intervalo de dias (ou de todo o
+        histórico, sem limites) com uma única consulta agrupada por dia
+        local e um upsert em lote.
+        Retorna o número de dias gravados e de vendas processadas.
+        """
+        inicio, fim = intervalo_dias(data_inicio, data_fim)
+        filtro_vendas = Q()
+        if inicio:
+            filtro_vendas &= Q(data_venda__gte=inicio)
+        if fim:
+            filtro_vendas &= Q(data_venda__lt=fim)
+        
+        existentes = cls.objects.all()
+        if data_inicio:
+            existentes = existentes.filter(data__gte=data_inicio)
+        if data_fim:
+            existentes = existentes.filter(data__lte=data_fim)
+        
+        with transaction.atomic():
+            resultado = cls._reconstruir(filtro_vendas, existentes, batch_size)
+            FaturamentoPeriodo.reconstruir(data_inicio, data_fim)
+        return resultado
+    
+    @classmethod
+    def reconstruir_dias(cls, dias, batch_size=1000):
+        """
+        Recalcula apenas os dias informados, em qualquer ordem e com lacunas.
+        Dias vizinhos viram um intervalo e todos os intervalos (em grupos de
+        100) entram na mesma consulta agrupada.
+        """
+        resultado = {'dias': 0, 'vendas': 0}
+        intervalos = intervalos_continuos(dias)
+        with transaction.atomic():
+            for i in range(0, len(intervalos), 100):
+                filtro_vendas = Q()
+                filtro_existentes = Q()
+                for data_inicio, data_fim in intervalos[i:i + 100]:
+                    inicio, fim = intervalo_dias(data_inicio, data_fim)
+                    filtro_vendas |= Q(data_venda__gte=inicio, data_venda__lt=fim)
+                    filtro_existentes |= Q(data__gte=data_inicio, data__lte=data_fim)
+                parcial = cls._reconstruir(
+                    filtro_vendas,
+                    cls.objects.filter(filtro_existentes),
+                    batch_size,
+                )
+                resultado['dias'] += parcial['dias']
+                resultado['vendas'] += parcial['vendas']
+            if intervalos:
+                FaturamentoPeriodo.reconstruir(intervalos[0][0], intervalos[-1][1])
+        return resultado
+    
+    @classmethod
+    def _reconstruir(cls, filtro_vendas, existentes, batch_size):
+        """
+        Agrupa por dia local as vendas faturadas do filtro, das tabelas de
+        uso diário e do arquivo, e regrava as linhas existentes
+        """
+        consultas = [
+            modelo.objects.filter(filtro_vendas, status__in=Venda.STATUS_FATURADOS).annotate(
+                dia=TruncDate('data_venda', tzinfo=fuso_local())
+            ).values('dia').annotate(
+                vendas=Count('id'),
+                bruto=Sum('subtotal'),
+                desconto=Sum('desconto'),
+                liquido=Sum('total'),
+                lucro=Sum('lucro_estimado'),
+            ).order_by()
+            for modelo in (Venda, VendaArquivada)
+        ]
+        
+        with transaction.atomic():
+            # Zerar primeiro também garante o lock de escrita antes da leitura,
+            # assim nenhum delta concorrente se perde entre a consulta e o upsert
+            existentes.update(
+                vendas_dia=0,
+                faturamento_bruto=0,
+                desconto_total=0,
+                faturamento_liquido=0,
+                lucro_estimado=0,
+            )
+            por_dia = {}
+            for consulta in consultas:
+                for linha in consulta:
+                    faturamento = por_dia.setdefault(linha['dia'], cls(data=linha['dia']))
+                    faturamento.vendas_dia += linha['vendas']
+                    faturamento.faturamento_bruto += linha['bruto'] or 0
+                    faturamento.desconto_total += linha['desconto'] or 0
+                    faturamento.faturamento_liquido += linha['liquido'] or 0
+                    faturamento.lucro_estimado += linha['lucro'] or 0
+            faturamentos = list(por_dia.values())
+            cls.objects.bulk_create(
+                faturamentos,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['data'],
+                update_fields=[
+                    'vendas_dia', 'faturamento_bruto', 'desconto_total',
+                    'faturamento_liquido', 'lucro_estimado',
+                ],
+            )
+        
+        return {
+            'dias': len(faturamentos),
+            'vendas': sum(f.vendas_dia for f in faturamentos),
+        }
+    
+    @classmethod
+    def totais(cls, data_inicio, data_fim):
+        """
+        Totais dos dias [data_inicio, data_fim] somando as semanas, meses e
+        anos já acumulados (FaturamentoPeriodo) e só as sobras dia a dia.
+        São no máximo duas consultas, com poucas linhas cada, para qualquer
+        intervalo (ex.: acumulado do ano ou do mês).
+        """
+        filtro_dias = Q()
+        filtro_periodos = Q()
+        for tipo, inicio, fim in decompor_intervalo(data_inicio, data_fim):
+            if tipo == 'dia':
+                filtro_dias |= Q(data__gte=inicio, data__lte=fim)
+            else:
+                filtro_periodos |= Q(tipo=tipo, inicio=inicio)
+        
+        totais = {'vendas': 0, 'bruto': 0, 'desconto': 0, 'liquido': 0, 'lucro': 0}
+        parciais = []
+        if filtro_dias:
+            parciais.append(cls.objects.filter(filtro_dias).aggregate(
+                vendas=Sum('vendas_dia'),
+                bruto=Sum('faturamento_bruto'),
+                desconto=Sum('desconto_total'),
+                liquido=Sum('faturamento_liquido'),
+                lucro=Sum('lucro_estimado'),
+            ))
+        if filtro_periodos:
+            parciais.append(FaturamentoPeriodo.objects.filter(filtro_periodos).aggregate(
+                vendas=Sum('vendas'),
+                bruto=Sum('faturamento_bruto'),
+                desconto=Sum('desconto_total'),
+                liquido=Sum('faturamento_liquido'),
+                lucro=Sum('lucro_estimado'),
+            ))
+        for parcial in parciais:
+            for campo, valor in parcial.items():
+                totais[campo] += valor or 0
+        return totais
+
+class FaturamentoPeriodo(models.Model):
+    """Faturamento acumulado por semana (ISO), mês e ano"""
+    TIPO_CHOICES = [
+        ('semana', 'Semana'),
+        ('mes', 'Mês'),
+        ('ano', 'Ano'),
+    ]
+    
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name=_('Tipo'))
+    inicio = models.DateField(verbose_name=_('Início'))
+    vendas = models.PositiveIntegerField(default=0, verbose_name=_('Vendas'))
+    faturamento_bruto = models.DecimalField(
+        max_digits=14, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Faturamento Bruto')
+    )
+    desconto_total = models.DecimalField(
+        max_digits=14, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Desconto Total')
+    )
+    faturamento_liquido = models.DecimalField(
+        max_digits=14, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Faturamento Líquido')
+    )
+    lucro_estimado = models.DecimalField(
+        max_digits=14, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Lucro Estimado')
+    )
+    
+    class Meta:
+        verbose_name = _('Faturamento do Período')
+        verbose_name_plural = _('Faturamentos dos Períodos')
+        unique_together = ['tipo', 'inicio']
+        ordering = ['tipo', '-inicio']
+    
+    def __str__(self):
+        return f"Faturamento {self.get_tipo_display()} {self.inicio} - R$ {self.faturamento_liquido}"
+    
+    @property
+    def fim(self):
+        return fim_periodo(self.tipo, self.inicio)
+    
+    @classmethod
+    def aplicar_delta(cls, data, vendas=0, bruto=0, desconto=0, liquido=0, lucro=0):
+        """
+        Soma uma variação do dia à semana, ao mês e ao ano da data.
+        As linhas que faltam são criadas antes (INSERT que ignora conflito),
+        então um único UPDATE aplica o delta às três sem corrida.
+        """
+        chaves = [(tipo, inicio_periodo(tipo, data)) for tipo in TIPOS_PERIODO]
+        filtro = Q()
+        for tipo, inicio in chaves:
+            filtro |= Q(tipo=tipo, inicio=inicio)
+        
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [cls(tipo=tipo, inicio=inicio) for tipo, inicio in chaves],
+                ignore_conflicts=True,
+            )
+            cls.objects.filter(filtro).update(
+                vendas=F('vendas') + vendas,
+                faturamento_bruto=F('faturamento_bruto') + bruto,
+                desconto_total=F('desconto_total') + desconto,
+                faturamento_liquido=F('faturamento_liquido') + liquido,
+                lucro_estimado=F('lucro_estimado') + lucro,
+            )
+    
+    @classmethod
+    def reconstruir(cls, data_inicio=None, data_fim=None):
+        """
+        Recalcula, a partir do faturamento diário, as semanas, meses e anos
+        que contêm os dias [data_inicio, data_fim] (sem limites: todos).
+        """
+        truncar = {'semana': TruncWeek, 'mes': TruncMonth, 'ano': TruncYear}
+        with transaction.atomic():
+            for tipo in TIPOS_PERIODO:
+                inicio = inicio_periodo(tipo, data_inicio) if data_inicio else None
+                fim = fim_periodo(tipo, data_fim) if data_fim else None
+                
+                dias = Faturamento.objects.all()
+                existentes = cls.objects.filter(tipo=tipo)
+                if inicio:
+                    dias = dias.filter(data__gte=inicio)
+                    existentes = existentes.filter(inicio__gte=inicio)
+                if fim:
+                    dias = dias.filter(data__lte=fim)
+                    existentes = existentes.filter(inicio__lte=fim)
+                
+                por_periodo = dias.annotate(
+                    periodo=truncar[tipo]('data')
+                ).values('periodo').annotate(
+                    vendas=Sum('vendas_dia'),
+                    bruto=Sum('faturamento_bruto'),
+                    desconto=Sum('desconto_total'),
+                    liquido=Sum('faturamento_liquido'),
+                    lucro=Sum('lucro_estimado'),
+                ).order_by()
+                
+                existentes.update(
+                    vendas=0,
+                    faturamento_bruto=0,
+                    desconto_total=0,
+                    faturamento_liquido=0,
+                    lucro_estimado=0,
+                )
+                cls.objects.bulk_create(
+                    [
+                        cls(
+                            tipo=tipo,
+                            inicio=linha['periodo'],
+                            vendas=linha['vendas'] or 0,
+                            faturamento_bruto=linha['bruto'] or 0,
+                            desconto_total=linha['desconto'] or 0,
+                            faturamento_liquido=linha['liquido'] or 0,
+                            lucro_estimado=linha['lucro'] or 0,
+                        )
+                        for linha in por_periodo
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['tipo', 'inicio'],
+                    update_fields=[
+                        'vendas', 'faturamento_bruto', 'desconto_total',
+                        'faturamento_liquido', 'lucro_estimado',
+                    ],
+                )
+
+class CuboVendas(models.Model):
+    """
+    Vendas faturadas pré-agregadas por dia, vendedor, produto, categoria,
+    marca e forma de pagamento. Categoria e marca são as gravadas no item
+    (as do produto no momento da venda).
+    Medidas no nível do item (o desconto geral da venda fica no Faturamento).
+    """
+    data = models.DateField(verbose_name=_('Data'))
+    vendedor = models.ForeignKey(
+        Usuario, 
+        on_delete=models.CASCADE, 
+        verbose_name=_('Vendedor')
+    )
+    produto = models.ForeignKey(
+        Produto, 
+        on_delete=models.CASCADE, 
+        verbose_name=_('Produto')
+    )
+    categoria = models.ForeignKey(
+        Categoria, 
+        on_delete=models.CASCADE, 
+        verbose_name=_('Categoria')
+    )
+    marca = models.ForeignKey(
+        Marca, 
+        on_delete=models.CASCADE, 
+        verbose_name=_('Marca')
+    )
+    forma_pagamento = models.CharField(
+        max_length=20,
+        choices=Venda.FORMA_PAGAMENTO_CHOICES,
+        verbose_name=_('Forma de Pagamento')
+    )
+    quantidade = models.IntegerField(default=0, verbose_name=_('Quantidade'))
+    faturamento_bruto = models.DecimalField(
+        max_digits=14, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Faturamento Bruto')
+    )
+    lucro_estimado = models.DecimalField(
+        max_digits=14, 
+        decimal_places=2, 
+        default=0,
+        verbose_name=_('Lucro Estimado')
+    )
+    
+    # Dimensões aceitas por consultar(): campo agrupado e rótulo legível
+    DIMENSOES = {
+        'data': ('data', None),
+        'semana': ('semana', None),
+        'mes': ('mes', None),
+        'ano': ('ano', None),
+        'vendedor': ('vendedor_id', 'vendedor__username'),
+        'produto': ('produto_id', 'produto__nome'),
+        'categoria': ('categoria_id', 'categoria__nome'),
+        'marca': ('marca_id', 'marca__nome'),
+        'forma_pagamento': ('forma_pagamento', None),
+    }
+    MEDIDAS = ['faturamento', 'quantidade_total', 'lucro']
+    
+    class Meta:
+        verbose_name = _('Cubo de Vendas')
+        verbose_name_plural = _('Cubo de Vendas')
+        unique_together = ['data', 'vendedor', 'produto', 'categoria', 'marca', 'forma_pagamento']
+        indexes = [
+            models.Index(fields=['vendedor', 'data']),
+            models.Index(fields=['produto', 'data']),
+            models.Index(fields=['categoria', 'data']),
+            models.Index(fields=['marca', 'data']),
+        ]
+    
+    def __str__(self):
+        return f"{self.data} {self.vendedor_id}/{self.produto_id}/{self.forma_pagamento}"
+    
+    @staticmethod
+    def _agrupar_itens(itens):
+        """Soma itens (instâncias ou dicts de values()) por (produto, categoria, marca)"""
+        por_produto = {}
+        for item in itens:
+            if isinstance(item, dict):
+                chave = (item['produto_id'], item['categoria_id'], item['marca_id'])
+                linha = (item['quantidade'], item['subtotal'], item['lucro_estimado'])
+            else:
+                chave = (item.produto_id, item.categoria_id, item.marca_id)
+                linha = (item.quantidade, item.subtotal, item.lucro_estimado)
+            atual = por_produto.get(chave)
+            if atual:
+                linha = tuple(a + b for a, b in zip(atual, linha))
+            por_produto[chave] = linha
+        return por_produto
+    
+    @staticmethod
+    def _itens_salvos(venda_id):
+        return list(ItemVenda.objects.filter(venda_id=venda_id).values(
+            'produto_id', 'categoria_id', 'marca_id',
+            'quantidade', 'lucro_estimado',
+            subtotal=F('quantidade') * F('preco_unitario') - F('desconto_item'),
+        ))
+    
+    @classmethod
+    def mover_venda(cls, anterior, venda):
+        """
+        Move os itens gravados da venda quando muda algo da chave do cubo
+        (faturada ou não, dia, vendedor, forma de pagamento).
+        """
+        def chave(v):
+            return (v.faturada, v.data_local, v.vendedor_id, v.forma_pagamento)
+        
+        if chave(anterior) == chave(venda):
+            return
+        itens = cls._itens_salvos(venda.pk)
+        cls.aplicar_venda(anterior, -1, itens)
+        cls.aplicar_venda(venda, 1, itens)
+    
+    @classmethod
+    def aplicar_venda(cls, venda, sinal=1, itens=None):
+        """
+        Soma (sinal=1) ou retira (sinal=-1) os itens de uma venda faturada
+        do cubo. itens: instâncias já em memória; sem eles, os itens são
+        lidos do banco. A venda pode ser o estado anterior guardado pelos
+        signals (precisa de data_venda, status, vendedor_id e forma_pagamento).
+        """
+        if not venda.faturada:
+            return
+        if itens is None:
+            itens = cls._itens_salvos(venda.pk)
+        por_produto = cls._agrupar_itens(itens)
+        if not por_produto:
+            return
+        
+        chave = {
+            'data': venda.data_local,
+            'vendedor_id': venda.vendedor_id,
+            'forma_pagamento': venda.forma_pagamento,
+        }
+        with transaction.atomic():
+            # Cria as linhas que faltam e depois soma com F(), como no Faturamento
+            cls.objects.bulk_create(
+                [
+                    cls(produto_id=produto_id, categoria_id=categoria_id, marca_id=marca_id, **chave)
+                    for produto_id, categoria_id, marca_id in por_produto
+                ],
+                ignore_conflicts=True,
+            )
+            for (produto_id, categoria_id, marca_id), (quantidade, subtotal, lucro) in por_produto.items():
+                cls.objects.filter(
+                    produto_id=produto_id, categoria_id=categoria_id, marca_id=marca_id, **chave
+                ).update(
+                    quantidade=F('quantidade') + sinal * quantidade,
+                    faturamento_bruto=F('faturamento_bruto') + sinal * subtotal,
+                    lucro_estimado=F('lucro_estimado') + sinal * lucro,
+                )
+    
+    @classmethod
+    def reconstruir_periodo(cls, data_inicio=None, data_fim=None, batch_size=1000):
+        """Recria o cubo dos dias [data_inicio, data_fim] (sem limites: todo o histórico)"""
+        inicio, fim = intervalo_dias(data_inicio, data_fim)
+        filtro_itens = Q()
+        existentes = cls.objects.all()
+        if inicio:
+            filtro_itens &= Q(venda__data_venda__gte=inicio)
+            existentes = existentes.filter(data__gte=data_inicio)
+        if fim:
+            filtro_itens &= Q(venda__data_venda__lt=fim)
+            existentes = existentes.filter(data__lte=data_fim)
+        return cls._reconstruir(filtro_itens, existentes, batch_size)
+    
+    @classmethod
+    def reconstruir_dias(cls, dias, batch_size=1000):
+        """Recria o cubo apenas dos dias informados"""
+        linhas = 0
+        intervalos = intervalos_continuos(dias)
+        with transaction.atomic():
+            for i in range(0, len(intervalos), 100):
+                filtro_itens = Q()
+                filtro_existentes = Q()
+                for data_inicio, data_fim in intervalos[i:i + 100]:
+                    inicio, fim = intervalo_dias(data_inicio, data_fim)
+                    filtro_itens |= Q(venda__data_venda__gte=inicio, venda__data_venda__lt=fim)
+                    filtro_existentes |= Q(data__gte=data_inicio, data__lte=data_fim)
+                linhas += cls._reconstruir(
+                    filtro_itens,
+                    cls.objects.filter(filtro_existentes),
+                    batch_size,
+                )
+        return linhas
+    
+    @classmethod
+    def _reconstruir(cls, filtro_itens, existentes, batch_size):
+        """
+        Apaga as linhas existentes e grava de novo, a partir de uma consulta
+        agrupada dos itens do filtro (das vendas de uso diário e do arquivo)
+        """
+        consultas = [
+            modelo.objects.filter(filtro_itens, venda__status__in=Venda.STATUS_FATURADOS).annotate(
+                dia=TruncDate('venda__data_venda', tzinfo=fuso_local())
+            ).values(
+                'dia', 'venda__vendedor_id', 'produto_id', 'categoria_id', 'marca_id', 'venda__forma_pagamento',
+            ).annotate(
+                soma_quantidade=Sum('quantidade'),
+                bruto=Sum(F('quantidade') * F('preco_unitario') - F('desconto_item')),
+                lucro=Sum('lucro_estimado'),
+            ).order_by()
+            for modelo in (ItemVenda, ItemVendaArquivado)
+        ]
+        
+        with transaction.atomic():
+            existentes.delete()
+            por_chave = {}
+            for consulta in consultas:
+                for linha in consulta.iterator():
+                    chave = (
+                        linha['dia'], linha['venda__vendedor_id'], linha['produto_id'],
+                        linha['categoria_id'], linha['marca_id'], linha['venda__forma_pagamento'],
+                    )
+                    cubo = por_chave.get(chave)
+                    if cubo is None:
+                        por_chave[chave] = cls(
+                            data=linha['dia'],
+                            vendedor_id=linha['venda__vendedor_id'],
+                            produto_id=linha['produto_id'],
+                            categoria_id=linha['categoria_id'],
+                            marca_id=linha['marca_id'],
+                            forma_pagamento=linha['venda__forma_pagamento'],
+                            quantidade=linha['soma_quantidade'],
+                            faturamento_bruto=linha['bruto'] or 0,
+                            lucro_estimado=linha['lucro'] or 0,
+                        )
+                    else:
+                        # Mesma chave com vendas nas duas tabelas
+                        cubo.quantidade += linha['soma_quantidade']
+                        cubo.faturamento_bruto += linha['bruto'] or 0
+                        cubo.lucro_estimado += linha['lucro'] or 0
+            linhas = cls.objects.bulk_create(por_chave.values(), batch_size=batch_size)
+        return len(linhas)
+    
+    @classmethod
+    def consultar(cls, agrupar=(), filtros=None, data_inicio=None, data_fim=None,
+                  ordenar='faturamento', limite=None):
+        """
+        Fatia e agrega o cubo.
+        agrupar: dimensões de DIMENSOES (ex.: ['categoria', 'mes']);
+        filtros: {dimensão: [ids ou valores]}; ordenar: uma de MEDIDAS
+        (decrescente); limite: top-N. Devolve uma lista de dicts.
+        """
+        linhas = cls.objects.all()
+        if data_inicio:
+            linhas = linhas.filter(data__gte=data_inicio)
+        if data_fim:
+            linhas = linhas.filter(data__lte=data_fim)
+        for dimensao, valores in (filtros or {}).items():
+            linhas = linhas.filter(**{f'{cls.DIMENSOES[dimensao][0]}__in': valores})
+        
+        medidas = {
+            'quantidade_total': Sum('quantidade'),
+            'faturamento': Sum('faturamento_bruto'),
+            'lucro': Sum('lucro_estimado'),
+        }
+        if not agrupar:
+            return [linhas.aggregate(**medidas)]
+        
+        truncar = {'semana': TruncWeek, 'mes': TruncMonth, 'ano': TruncYear}
+        linhas = linhas.annotate(**{
+            dimensao: truncar[dimensao]('data') for dimensao in agrupar if dimensao in truncar
+        })
+        campos = []
+        for dimensao in agrupar:
+            campos += [campo for campo in cls.DIMENSOES[dimensao] if campo]
+        
+        linhas = linhas.values(*campos).annotate(**medidas).order_by(f'-{ordenar}', *campos)
+        if limite:
+            linhas = linhas[:limite]
+        return list(linhas)
+
+class SequenciaVenda(models.Model):
+    """Último número de venda reservado para cada prefixo (prefixo + data)"""
+    chave = models.CharField(max_length=20, unique=True, verbose_name=_('Chave'))
+    ultimo = models.PositiveBigIntegerField(default=0, verbose_name=_('Último Número'))
+    
+    class Meta:
+        verbose_name = _('Sequência de Venda')
+        verbose_name_plural = _('Sequências de Venda')
+    
+    def __str__(self):
+        return f"{self.chave}: {self.ultimo}"
+    
+    @classmethod
+    def reservar(cls, chave, quantidade):
+        """
+        Reserva um bloco de números para a chave e devolve o último número
+        do bloco. O incremento é feito no banco (F expression), então
+        processos diferentes nunca recebem o mesmo bloco.
+        """
+        sequencias = cls.objects.filter(chave=chave)
+        with transaction.atomic():
+            if not sequencias.update(ultimo=F('ultimo') + quantidade):
+                cls.objects.get_or_create(chave=chave)
+                sequencias.update(ultimo=F('ultimo') + quantidade)
+            # O UPDATE já segura o lock de escrita até o fim da transação
+            return sequencias.values_list('ultimo', flat=True).get()
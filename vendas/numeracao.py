@@ -0,0 +1,102 @@
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SequenciaVenda, Venda
+
+
+# Numeração das vendas: prefixo + data local + sequência, ex. V20250301000042.
+# Por padrão cada venda reserva o seu número no banco (SequenciaVenda), e os
+# números do dia saem em ordem entre todos os processos. Com BLOCO > 1 cada
+# processo reserva blocos e os distribui em memória, então a maioria das
+# vendas não consulta a sequência: os números continuam únicos, mas só são
+# crescentes dentro de cada processo (dois caixas intercalam blocos) e as
+# sobras de blocos não usados (reinício do processo) viram lacunas.
+# Dentro de uma transação aberta o número é reservado um a um, junto com a
+# transação: se ela for desfeita, a reserva também é, e nenhum bloco em
+# memória fica apontando para números que outro processo pode receber.
+#
+# Configuração opcional em settings.py:
+#
+#     VENDAS_NUMERACAO = {
+#         'PREFIXO': 'V',
+#         'FORMATO_DATA': '%Y%m%d',   # '' para uma sequência única, sem reinício
+#         'DIGITOS': 6,
+#         'BLOCO': 1,                 # > 1 troca a ordem do dia por menos escritas
+#     }
+
+NUMERACAO_PADRAO = {
+    'PREFIXO': 'V',
+    'FORMATO_DATA': '%Y%m%d',
+    'DIGITOS': 6,
+    'BLOCO': 1,
+}
+
+class AlocadorNumeracao:
+    """Distribui números de venda a partir de blocos reservados no banco"""
+
+    def __init__(self, prefixo=None, formato_data=None, digitos=None, bloco=None):
+        config = {**NUMERACAO_PADRAO, **getattr(settings, 'VENDAS_NUMERACAO', {})}
+        self.prefixo = config['PREFIXO'] if prefixo is None else prefixo
+        self.formato_data = config['FORMATO_DATA'] if formato_data is None else formato_data
+        self.digitos = config['DIGITOS'] if digitos is None else digitos
+        self.bloco = config['BLOCO'] if bloco is None else bloco
+
+        if self.bloco < 1:
+            raise ImproperlyConfigured('VENDAS_NUMERACAO: BLOCO deve ser maior que zero.')
+        tamanho = len(self._chave()) + self.digitos
+        maximo = Venda._meta.get_field('numero_venda').max_length
+        if tamanho > maximo:
+            raise ImproperlyConfigured(
+                f'VENDAS_NUMERACAO gera números com {tamanho} caracteres '
+                f'(máximo {maximo}).'
+            )
+
+        self._lock = threading.Lock()
+        self._descartar_bloco()
+
+    def _chave(self):
+        return self.prefixo + timezone.localtime().strftime(self.formato_data)
+
+    def _descartar_bloco(self):
+        self._chave_bloco = None
+        self._pid = None
+        self._proximo = 1
+        self._limite = 0
+
+    def proximo(self):
+        """Próximo número de venda"""
+        chave = self._chave()
+        if transaction.get_connection().in_atomic_block:
+            return self._formatar(chave, SequenciaVenda.reservar(chave, 1))
+
+        with self._lock:
+            # Um bloco herdado de fork ou de outro dia não é reaproveitado
+            if (chave != self._chave_bloco or self._pid != os.getpid()
+                    or self._proximo > self._limite):
+                self._limite = SequenciaVenda.reservar(chave, self.bloco)
+                self._proximo = self._limite - self.bloco + 1
+                self._chave_bloco = chave
+                self._pid = os.getpid()
+            numero = self._proximo
+            self._proximo += 1
+        return self._formatar(chave, numero)
+
+    def _formatar(self, chave, numero):
+        return f'{chave}{numero:0{self.digitos}d}'
+
+_alocador = None
+_alocador_lock = threading.Lock()
+
+def proximo_numero_venda():
+    """Próximo número de venda com a configuração do projeto"""
+    global _alocador
+    if _alocador is None:
+        with _alocador_lock:
+            if _alocador is None:
+                _alocador = AlocadorNumeracao()
+    return _alocador.proximo()
@@ -0,0 +1,163 @@
+import calendar
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import DateTimeField, Q
+from django.db.models.constants import LOOKUP_SEP
+from django.utils import timezone
+
+
+# Utilitários de datas da loja.
+# As vendas são gravadas em UTC; os dias do faturamento seguem o TIME_ZONE
+# do projeto (America/Sao_Paulo).
+
+def fuso_local():
+    return timezone.get_default_timezone()
+
+def inicio_do_dia(data):
+    """Primeiro instante (aware) do dia local informado"""
+    return timezone.make_aware(datetime.combine(data, time.min), fuso_local())
+
+def intervalo_dias(data_inicio, data_fim):
+    """
+    Converte dias locais [data_inicio, data_fim] no intervalo semiaberto
+    [inicio, fim) de datetimes aware, próprio para filtros por índice.
+    """
+    inicio = inicio_do_dia(data_inicio) if data_inicio else None
+    fim = inicio_do_dia(data_fim + timedelta(days=1)) if data_fim else None
+    return inicio, fim
+
+def ler_data(valor):
+    """date a partir de AAAA-MM-DD (ou de um date); None se vazio. ValueError se inválida"""
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor))
+
+def _campo(modelo, caminho):
+    *relacoes, nome = caminho.split(LOOKUP_SEP)
+    for relacao in relacoes:
+        modelo = modelo._meta.get_field(relacao).related_model
+    return modelo._meta.get_field(nome)
+
+@dataclass(frozen=True)
+class IntervaloDatas:
+    """
+    Dias locais [inicio, fim], ambos inclusivos (None: sem limite naquela
+    ponta), usados por todos os filtros de data das telas e das APIs.
+    Campos DateTimeField são filtrados pelo intervalo semiaberto de
+    instantes [inicio, fim) de intervalo_dias, e campos DateField pelos
+    próprios dias: nunca uma função sobre a coluna (__date), então o banco
+    usa o índice com uma busca por faixa.
+    """
+    inicio: date = None
+    fim: date = None
+    
+    def __post_init__(self):
+        if self.inicio and self.fim and self.inicio > self.fim:
+            raise ValueError('A data inicial é posterior à data final.')
+    
+    @classmethod
+    def de_parametros(cls, parametros, padrao=None):
+        """
+        Lê data_inicio e data_fim de request.GET, request.data ou um dict.
+        Sem nenhuma das duas devolve `padrao`, se informado. Levanta
+        ValueError para datas inválidas.
+        """
+        inicio = ler_data(parametros.get('data_inicio'))
+        fim = ler_data(parametros.get('data_fim'))
+        if inicio is None and fim is None and padrao is not None:
+            return padrao
+        return cls(inicio, fim)
+    
+    @classmethod
+    def ultimos_dias(cls, dias, hoje=None):
+        """Os `dias` dias terminados hoje (dia local)"""
+        fim = hoje or timezone.localdate()
+        return cls(fim - timedelta(days=dias - 1), fim)
+    
+    @property
+    def limitado(self):
+        return self.inicio is not None and self.fim is not None
+    
+    def dias(self):
+        """Cada dia do intervalo, em ordem (só para intervalos limitados)"""
+        for i in range((self.fim - self.inicio).days + 1):
+            yield self.inicio + timedelta(days=i)
+    
+    def filtro(self, modelo, campo):
+        """Q do intervalo para o campo (aceita caminhos como venda__data_venda)"""
+        if isinstance(_campo(modelo, campo), DateTimeField):
+            inicio, fim = intervalo_dias(self.inicio, self.fim)
+            limites = {f'{campo}__gte': inicio, f'{campo}__lt': fim}
+        else:
+            limites = {f'{campo}__gte': self.inicio, f'{campo}__lte': self.fim}
+        return Q(**{lookup: valor for lookup, valor in limites.items() if valor is not None})
+    
+    def filtrar(self, queryset, campo):
+        return queryset.filter(self.filtro(queryset.model, campo))
+
+def intervalos_continuos(dias):
+    """Agrupa dias em intervalos contínuos [(inicio, fim), ...]"""
+    intervalos = []
+    for dia in sorted(set(dias)):
+        if intervalos and intervalos[-1][1] + timedelta(days=1) == dia:
+            intervalos[-1][1] = dia
+        else:
+            intervalos.append([dia, dia])
+    return [tuple(intervalo) for intervalo in intervalos]
+
+# Períodos do faturamento acumulado: semana ISO (segunda a domingo), mês e ano.
+TIPOS_PERIODO = ['semana', 'mes', 'ano']
+
+def inicio_periodo(tipo, data):
+    """Primeiro dia da semana/mês/ano que contém a data"""
+    if tipo == 'semana':
+        return data - timedelta(days=data.weekday())
+    if tipo == 'mes':
+        return data.replace(day=1)
+    if tipo == 'ano':
+        return date(data.year, 1, 1)
+    raise ValueError(f'Tipo de período inválido: {tipo}')
+
+def fim_periodo(tipo, data):
+    """Último dia da semana/mês/ano que contém a data"""
+    if tipo == 'semana':
+        return inicio_periodo(tipo, data) + timedelta(days=6)
+    if tipo == 'mes':
+        return data.replace(day=calendar.monthrange(data.year, data.month)[1])
+    if tipo == 'ano':
+        return date(data.year, 12, 31)
+    raise ValueError(f'Tipo de período inválido: {tipo}')
+
+def decompor_intervalo(data_inicio, data_fim, tipos=('ano', 'mes', 'semana')):
+    """
+    Divide os dias [data_inicio, data_fim] em anos, meses e semanas completos
+    e nos dias que sobram nas pontas: [(tipo, inicio, fim), ...], com tipo
+    'dia' para as sobras. Cada ponta só desce para o próximo nível, então o
+    número de partes não cresce com o tamanho do intervalo (além dos anos).
+    """
+    if data_inicio > data_fim:
+        return []
+    if not tipos:
+        return [('dia', data_inicio, data_fim)]
+    
+    tipo, menores = tipos[0], tipos[1:]
+    primeiro = inicio_periodo(tipo, data_inicio)
+    if primeiro < data_inicio:
+        primeiro = fim_periodo(tipo, data_inicio) + timedelta(days=1)
+    
+    completos = []
+    cursor = primeiro
+    while fim_periodo(tipo, cursor) <= data_fim:
+        completos.append((tipo, cursor, fim_periodo(tipo, cursor)))
+        cursor = fim_periodo(tipo, cursor) + timedelta(days=1)
+    
+    if not completos:
+        return decompor_intervalo(data_inicio, data_fim, menores)
+    return (
+        decompor_intervalo(data_inicio, primeiro - timedelta(days=1), menores)
+        + completos
+        + decompor_intervalo(cursor, data_fim, menores)
+    )
@@ -0,0 +1,244 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import connections, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from produtos.models import Produto
+from produtos.signals import produtos_alterados
+from .models import ItemVenda, Venda, Faturamento, CuboVendas
+from .numeracao import proximo_numero_venda
+from .dashboard import invalidar_dashboard
+
+
+@dataclass
+class ResultadoReserva:
+    """Resultado da reserva de estoque de um produto"""
+    produto_id: int
+    quantidade: int
+    reservado: bool
+    disponivel: int = None
+    
+    @property
+    def mensagem(self):
+        if self.reservado:
+            return f'{self.quantidade} unidade(s) reservada(s).'
+        if self.disponivel is None:
+            return 'Produto não encontrado.'
+        return f'Estoque insuficiente: solicitado {self.quantidade}, disponível {self.disponivel}.'
+
+class EstoqueInsuficiente(Exception):
+    """Uma ou mais reservas falharam; nenhuma baixa de estoque foi aplicada"""
+    
+    def __init__(self, resultados):
+        self.resultados = resultados
+        self.falhas = [r for r in resultados if not r.reservado]
+        super().__init__('; '.join(
+            f'Produto {r.produto_id}: {r.mensagem}' for r in self.falhas
+        ))
+
+def reservar_estoque(itens):
+    """
+    Baixa o estoque de todos os itens de uma venda em uma única transação.
+    
+    itens: iterável de (produto_id, quantidade). Quantidades do mesmo produto
+    são somadas e cada produto recebe um único UPDATE condicional
+    (estoque >= quantidade), então duas vendas simultâneas nunca vendem a
+    mesma unidade. Saldos negativos devolvem unidades ao estoque. Se algum
+    produto falhar, tudo é desfeito e EstoqueInsuficiente traz o resultado
+    de cada item.
+    """
+    quantidades = defaultdict(int)
+    for produto_id, quantidade in itens:
+        quantidades[produto_id] += quantidade
+    
+    with transaction.atomic():
+        agora = timezone.now()
+        resultados = []
+        # Ordem fixa de produtos evita deadlock entre vendas concorrentes
+        for produto_id in sorted(quantidades):
+            quantidade = quantidades[produto_id]
+            if quantidade == 0:
+                continue
+            produtos = Produto.objects.filter(pk=produto_id)
+            if quantidade > 0:
+                produtos = produtos.filter(estoque__gte=quantidade)
+            reservado = produtos.update(estoque=F('estoque') - quantidade, data_atualizacao=agora)
+            resultados.append(ResultadoReserva(produto_id, quantidade, bool(reservado)))
+        
+        falhas = [r for r in resultados if not r.reservado]
+        if falhas:
+            disponiveis = dict(Produto.objects.filter(
+                pk__in=[r.produto_id for r in falhas]
+            ).values_list('id', 'estoque'))
+            for resultado in falhas:
+                resultado.disponivel = disponiveis.get(resultado.produto_id)
+            raise EstoqueInsuficiente(resultados)
+        produtos_alterados.send(sender=Produto, ids=[r.produto_id for r in resultados])
+    
+    return resultados
+
+def montar_venda(venda, itens):
+    """
+    Grava uma venda com todos os seus itens de uma vez.
+    
+    itens: instâncias de ItemVenda ainda não salvas, que substituem os
+    itens atuais da venda. O estoque é ajustado pelo saldo de cada produto
+    (um UPDATE por produto), os itens são inseridos com bulk_create e
+    subtotal/total/lucro são calculados uma única vez antes de salvar a venda.
+    Levanta EstoqueInsuficiente sem gravar nada se faltar estoque.
+    """
+    # Carrega em uma consulta os produtos que ainda não estão em memória
+    # (produtos inexistentes são recusados pela reserva de estoque)
+    sem_produto = [item for item in itens if not ItemVenda.produto.is_cached(item)]
+    if sem_produto:
+        produtos = Produto.objects.in_bulk([item.produto_id for item in sem_produto])
+        for item in sem_produto:
+            if item.produto_id in produtos:
+                item.produto = produtos[item.produto_id]
+    
+    # Numera a venda antes de abrir a transação, para a reserva do número
+    # não ficar presa à gravação da venda
+    if not venda.numero_venda:
+        venda.numero_venda = proximo_numero_venda()
+    
+    with transaction.atomic():
+        saldos = [(item.produto_id, item.quantidade) for item in itens]
+        if venda.pk:
+            anteriores = venda.itens.values('produto_id').annotate(quantidade=Sum('quantidade'))
+            saldos += [(item['produto_id'], -item['quantidade']) for item in anteriores]
+        reservar_estoque(saldos)
+        
+        for item in itens:
+            item.pk = None
+            item.capturar_produto()
+            item.calcular_lucro()
+        
+        venda.subtotal = sum(item.subtotal for item in itens)
+        venda.total = venda.subtotal - venda.desconto
+        venda.lucro_estimado = sum(item.lucro_estimado for item in itens) - venda.desconto
+        
+        if venda.pk:
+            # Salvar antes move os itens antigos no cubo se a chave mudou;
+            # em seguida eles saem do cubo e da venda
+            venda.save()
+            CuboVendas.aplicar_venda(venda, -1)
+            venda.itens.all().delete()
+        else:
+            venda.save()
+        
+        for item in itens:
+            item.venda = venda
+        ItemVenda.objects.bulk_create(itens)
+        CuboVendas.aplicar_venda(venda, 1, itens)
+    
+    return venda
+
+@dataclass
+class ResultadoStatus:
+    """Resultado de uma mudança de status em massa"""
+    novo_status: str
+    selecionadas: int = 0
+    atualizadas: int = 0
+    dias: list = field(default_factory=list)
+    
+    @property
+    def ignoradas(self):
+        """Vendas que já estavam no status ou cuja transição não é permitida"""
+        return self.selecionadas - self.atualizadas
+
+def _update_returning(conexao):
+    """Se o banco aceita UPDATE ... RETURNING (PostgreSQL, SQLite 3.35+)"""
+    if conexao.vendor == 'postgresql':
+        return True
+    return conexao.vendor == 'sqlite' and conexao.Database.sqlite_version_info >= (3, 35)
+
+def _atualizar_status(vendas, novo_status):
+    """
+    Altera o status das vendas com um único UPDATE ... RETURNING e devolve
+    a data de cada venda alterada.
+    """
+    conexao = connections[vendas.db]
+    if not _update_returning(conexao):
+        # Bancos sem UPDATE ... RETURNING: lê as datas com lock e depois altera
+        datas = list(vendas.select_for_update().values_list('data_venda', flat=True))
+        vendas.update(status=novo_status)
+        return datas
+    
+    opts = Venda._meta
+    campo_data = opts.get_field('data_venda')
+    qn = conexao.ops.quote_name
+    ids_sql, params = vendas.order_by().values('pk').query.get_compiler(vendas.db).as_sql()
+    sql = (
+        f'UPDATE {qn(opts.db_table)} SET {qn(opts.get_field("status").column)} = %s '
+        f'WHERE {qn(opts.pk.column)} IN ({ids_sql}) '
+        f'RETURNING {qn(campo_data.column)}'
+    )
+    with conexao.cursor() as cursor:
+        cursor.execute(sql, (novo_status, *params))
+        linhas = cursor.fetchall()
+    
+    # Mesma conversão que o ORM aplicaria (ex.: texto -> datetime aware no SQLite)
+    coluna = campo_data.get_col(opts.db_table)
+    conversores = conexao.ops.get_db_converters(coluna) + campo_data.get_db_converters(conexao)
+    datas = []
+    for (valor,) in linhas:
+        for conversor in conversores:
+            valor = conversor(valor, coluna, conexao)
+        datas.append(valor)
+    return datas
+
+def alterar_status(vendas, novo_status, ids=None, batch_size=5000):
+    """
+    Muda o status de várias vendas de uma vez.
+    
+    vendas: queryset já filtrado; ids: lista opcional de ids, aplicada em
+    lotes de batch_size. Só são alteradas as vendas cujo status atual permite
+    ir para novo_status (Venda.TRANSICOES_STATUS), com UPDATEs em conjunto
+    que não disparam os signals. As vendas que entram ou saem do faturamento
+    devolvem suas datas no próprio UPDATE (RETURNING) e só esses dias do
+    faturamento e do cubo de vendas são reconstruídos.
+    """
+    if novo_status not in dict(Venda.STATUS_CHOICES):
+        raise ValueError(f'Status inválido: {novo_status}')
+    
+    faturada = novo_status in Venda.STATUS_FATURADOS
+    origens = [
+        status for status, destinos in Venda.TRANSICOES_STATUS.items()
+        if novo_status in destinos
+    ]
+    # Só mudanças que cruzam o faturamento (ex.: pendente -> concluida)
+    # alteram os valores do dia; aprovada -> concluida não altera
+    mudam_faturamento = [s for s in origens if (s in Venda.STATUS_FATURADOS) != faturada]
+    mantem_faturamento = [s for s in origens if s not in mudam_faturamento]
+    
+    if ids is None:
+        lotes = [vendas]
+    else:
+        ids = list(ids)
+        lotes = [
+            vendas.filter(pk__in=ids[i:i + batch_size])
+            for i in range(0, len(ids), batch_size)
+        ]
+    
+    resultado = ResultadoStatus(novo_status)
+    with transaction.atomic():
+        datas = []
+        for lote in lotes:
+            resultado.selecionadas += lote.count()
+            if mudam_faturamento:
+                alteradas = _atualizar_status(lote.filter(status__in=mudam_faturamento), novo_status)
+                resultado.atualizadas += len(alteradas)
+                datas += alteradas
+            if mantem_faturamento:
+                resultado.atualizadas += lote.filter(status__in=mantem_faturamento).update(status=novo_status)
+        
+        resultado.dias = sorted({timezone.localdate(data) for data in datas})
+        if resultado.dias:
+            Faturamento.reconstruir_dias(resultado.dias)
+            CuboVendas.reconstruir_dias(resultado.dias)
+        if resultado.atualizadas:
+            invalidar_dashboard()
+    
+    return resultado
@@ -0,0 +1,100 @@
+from django.core.management import call_command
+from django.db.models.signals import post_migrate, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Venda, ItemVenda, Faturamento, CuboVendas
+from .dashboard import invalidar_dashboard
+from .services import reservar_estoque
+
+
+# Manutenção incremental do faturamento diário.
+# Cada escrita em Venda aplica apenas a diferença (delta) na linha de
+# Faturamento do dia, em vez de recalcular todas as vendas da data.
+# Alterações nos itens chegam aqui pelo Venda.calcular_totais().
+# O cubo de vendas é por item: aqui só se movem os itens já gravados quando
+# muda a chave da venda; a troca de itens é aplicada por quem os grava
+# (montar_venda, ItemVenda.save) e a exclusão de um item avulso, abaixo.
+
+def _contribuicao(venda, sinal=1):
+    return {
+        'vendas': sinal,
+        'bruto': sinal * venda.subtotal,
+        'desconto': sinal * venda.desconto,
+        'liquido': sinal * venda.total,
+        'lucro': sinal * venda.lucro_estimado,
+    }
+
+@receiver(pre_save, sender=Venda)
+def guardar_venda_anterior(sender, instance, raw=False, **kwargs):
+    instance._estado_anterior = None
+    if instance.pk and not raw:
+        instance._estado_anterior = Venda.objects.filter(pk=instance.pk).only(
+            'data_venda', 'status', 'subtotal', 'desconto', 'total', 'lucro_estimado',
+            'vendedor', 'forma_pagamento',
+        ).first()
+
+@receiver(post_save, sender=Venda)
+def atualizar_faturamento_venda(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = getattr(instance, '_estado_anterior', None)
+    instance._estado_anterior = None
+    
+    if anterior is not None:
+        CuboVendas.mover_venda(anterior, instance)
+    
+    faturada_antes = anterior is not None and anterior.faturada
+    faturada_agora = instance.faturada
+    
+    if faturada_antes and faturada_agora and anterior.data_local == instance.data_local:
+        # Mesma linha de faturamento: só os valores mudaram
+        Faturamento.aplicar_delta(
+            instance.data_local,
+            bruto=instance.subtotal - anterior.subtotal,
+            desconto=instance.desconto - anterior.desconto,
+            liquido=instance.total - anterior.total,
+            lucro=instance.lucro_estimado - anterior.lucro_estimado,
+        )
+        return
+    
+    # A venda entrou ou saiu do faturamento (ou mudou de dia)
+    if faturada_antes:
+        Faturamento.aplicar_delta(anterior.data_local, **_contribuicao(anterior, -1))
+    if faturada_agora:
+        Faturamento.aplicar_delta(instance.data_local, **_contribuicao(instance))
+
+@receiver(pre_delete, sender=Venda)
+def remover_cubo_venda(sender, instance, **kwargs):
+    # Antes do delete, enquanto os itens ainda existem
+    CuboVendas.aplicar_venda(instance, -1)
+
+@receiver(post_delete, sender=Venda)
+def remover_faturamento_venda(sender, instance, **kwargs):
+    if instance.faturada:
+        Faturamento.aplicar_delta(instance.data_local, **_contribuicao(instance, -1))
+
+@receiver(post_delete, sender=ItemVenda)
+def remover_item_venda(sender, instance, origin=None, **kwargs):
+    # Só a exclusão do próprio item: na exclusão da venda o cubo e o
+    # faturamento já saem inteiros, e montar_venda ajusta os itens que troca
+    if not isinstance(origin, ItemVenda):
+        return
+    reservar_estoque([(instance.produto_id, -instance.quantidade)])
+    venda = Venda.objects.get(pk=instance.venda_id)
+    CuboVendas.aplicar_venda(venda, -1, [instance])
+    venda.calcular_totais()
+
+# O snapshot do dashboard é renovado na próxima leitura após o commit
+@receiver(post_save, sender=Venda)
+@receiver(post_delete, sender=Venda)
+def invalidar_dashboard_venda(sender, raw=False, **kwargs):
+    if not raw:
+        invalidar_dashboard()
+
+# A tabela do cache compartilhado (CACHES em settings.py) não é de nenhuma
+# migração; é criada, se faltar, depois de cada migrate.
+
+@receiver(post_migrate)
+def criar_tabela_cache(sender, using='default', **kwargs):
+    if sender.name == 'vendas':
+        call_command('createcachetable', database=using, verbosity=0)
@@ -0,0 +1,78 @@
+from django.utils import timezone
+
+from tarefas.fila import TarefaInvalida, salvar_arquivo, tarefa
+from .api.serializers import ResultadoStatusSerializer
+from .arquivo import arquivar_vendas as arquivar
+from .exportacao import vendas_csv, vendas_ndjson, faturamento_csv, faturamento_ndjson
+from .filtros import filtrar_vendas
+from .models import Venda, Faturamento
+from .periodos import IntervaloDatas, ler_data
+from .services import alterar_status
+
+
+# Operações demoradas de vendas executadas pela fila (tarefas.fila).
+# Os argumentos chegam do JSON da tarefa: datas como texto AAAA-MM-DD.
+
+def _nome_arquivo(nome, formato):
+    return f'{nome}_{timezone.localdate():%Y%m%d}.{formato}'
+
+@tarefa('vendas.reconstruir_faturamento')
+def reconstruir_faturamento(tarefa, data_inicio=None, data_fim=None):
+    """Recalcula o faturamento dos dias informados (sem datas: todo o histórico)"""
+    resultado = Faturamento.reconstruir_periodo(ler_data(data_inicio), ler_data(data_fim))
+    return {
+        **resultado,
+        'mensagem': f'Faturamento atualizado em {resultado["dias"]} dia(s) ({resultado["vendas"]} vendas).',
+    }
+
+@tarefa('vendas.alterar_status')
+def alterar_status_vendas(tarefa, novo_status, filtros=None, ids=None):
+    """Mudança de status em massa; repetir é seguro, as já alteradas são ignoradas"""
+    try:
+        vendas = filtrar_vendas(Venda.objects.all(), filtros or {})
+        resultado = alterar_status(vendas, novo_status, ids=ids)
+    except ValueError as erro:
+        raise TarefaInvalida(str(erro)) from erro
+
+    mensagem = (
+        f'{resultado.atualizadas} vendas alteradas para {dict(Venda.STATUS_CHOICES)[novo_status]}; '
+        f'faturamento recalculado em {len(resultado.dias)} dia(s).'
+    )
+    if resultado.ignoradas:
+        mensagem += (
+            f' {resultado.ignoradas} vendas ignoradas (já estavam nesse status '
+            f'ou a mudança não é permitida).'
+        )
+    return {**ResultadoStatusSerializer(resultado).data, 'mensagem': mensagem}
+
+@tarefa('vendas.exportar_vendas')
+def exportar_vendas(tarefa, formato='csv', filtros=None):
+    """Exportação de vendas gravada no arquivo da tarefa"""
+    try:
+        vendas = filtrar_vendas(Venda.objects.all(), filtros or {})
+    except ValueError as erro:
+        raise TarefaInvalida(str(erro)) from erro
+    linhas = vendas_csv(vendas) if formato == 'csv' else vendas_ndjson(vendas)
+    salvar_arquivo(tarefa, _nome_arquivo('vendas', formato), linhas)
+    return {'formato': formato, 'mensagem': 'Exportação de vendas pronta para download.'}
+
+@tarefa('vendas.exportar_faturamento')
+def exportar_faturamento(tarefa, formato='csv', data_inicio=None, data_fim=None):
+    """Exportação do faturamento diário gravada no arquivo da tarefa"""
+    try:
+        intervalo = IntervaloDatas(ler_data(data_inicio), ler_data(data_fim))
+    except ValueError as erro:
+        raise TarefaInvalida(str(erro)) from erro
+    faturamentos = intervalo.filtrar(Faturamento.objects.all(), 'data')
+    linhas = faturamento_csv(faturamentos) if formato == 'csv' else faturamento_ndjson(faturamentos)
+    salvar_arquivo(tarefa, _nome_arquivo('faturamento', formato), linhas)
+    return {'formato': formato, 'mensagem': 'Exportação do faturamento pronta para download.'}
+
+@tarefa('vendas.arquivar_vendas')
+def arquivar_vendas(tarefa, antes_de=None):
+    """Move as vendas encerradas antigas para o arquivo (ver vendas/arquivo.py)"""
+    resultado = arquivar(ler_data(antes_de))
+    return {
+        **resultado,
+        'mensagem': f'{resultado["vendas"]} vendas ({resultado["itens"]} itens) arquivadas.',
+    }
@@ -1,3 +1,1005 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import threading
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import UTC, date, datetime, time as hora, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache, caches
+from django.db import OperationalError, connection, connections
+from django.db.models import Count, Sum
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+from produtos.models import Produto, Categoria, Marca
+from rpm_motos.assincrono import em_paralelo
+from rpm_motos.consultas import configuracao, orcamento_consultas, orcamento_view
+from tarefas.models import Tarefa
+from usuarios.models import Usuario
+from .management.commands.verificar_consultas import _argumentos, _modelo_da_view, _padroes
+from . import dashboard
+from .arquivo import arquivar_vendas, restaurar_vendas
+from .clientes import buscar_clientes
+from .exportacao import COLUNAS_FATURAMENTO, COLUNAS_VENDAS, vendas_csv
+from .models import Venda, ItemVenda, Cliente, CuboVendas, Faturamento, FaturamentoPeriodo, VendaArquivada
+from .numeracao import AlocadorNumeracao
+from .periodos import IntervaloDatas, TIPOS_PERIODO, decompor_intervalo, fim_periodo, inicio_periodo
+from .services import EstoqueInsuficiente, alterar_status, montar_venda
+
+
+class VendasTestCase(TestCase):
+    def setUp(self):
+        self.vendedor = Usuario.objects.create_user(username='vendedor', password='x', cpf='1')
+        self.cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='123.456.789-00', telefone='(11) 98765-4321',
+            endereco='-', cidade='-', estado='SP', cep='-',
+        )
+        categoria, marca = Categoria.objects.create(nome='C'), Marca.objects.create(nome='M')
+        self.produto, self.outro = [
+            Produto.objects.create(
+                nome=nome, descricao='-', categoria=categoria, marca=marca,
+                preco=preco, preco_custo=preco / 2, estoque=100,
+            )
+            for nome, preco in [('Produto', Decimal('10.00')), ('Outro', Decimal('25.00'))]
+        ]
+
+    def _vender(self, dia, quantidade=1, status='concluida', horario=hora(12)):
+        venda = montar_venda(
+            Venda(cliente=self.cliente, vendedor=self.vendedor, forma_pagamento='dinheiro', status=status),
+            [ItemVenda(produto=self.produto, quantidade=quantidade, preco_unitario=self.produto.preco)],
+        )
+        # O dia da venda muda pelo save, como numa correção de data
+        venda.data_venda = timezone.make_aware(datetime.combine(dia, horario))
+        venda.save()
+        return venda
+
+    def _estado(self):
+        return (
+            list(Faturamento.objects.order_by('data').values_list(
+                'data', 'vendas_dia', 'faturamento_bruto', 'desconto_total', 'faturamento_liquido', 'lucro_estimado',
+            )),
+            list(FaturamentoPeriodo.objects.order_by('tipo', 'inicio').values_list(
+                'tipo', 'inicio', 'vendas', 'faturamento_bruto', 'desconto_total', 'faturamento_liquido', 'lucro_estimado',
+            )),
+            # O incremental deixa zeradas as linhas que esvaziam; a reconstrução as apaga
+            list(CuboVendas.objects.exclude(quantidade=0).order_by('data', 'produto').values_list(
+                'data', 'produto', 'quantidade', 'faturamento_bruto', 'lucro_estimado',
+            )),
+        )
+
+    def _conferir_com_reconstrucao(self, passo):
+        incremental = self._estado()
+        Faturamento.reconstruir_periodo()
+        CuboVendas.reconstruir_periodo()
+        self.assertEqual(self._estado(), incremental, passo)
+
+
+class FaturamentoTests(VendasTestCase):
+    # Vendas espalhadas da virada de 2024 para 2025 até março de 2025
+    DIAS = [
+        date(2024, 12, 2), date(2024, 12, 29), date(2024, 12, 30), date(2024, 12, 31),
+        date(2025, 1, 1), date(2025, 1, 5), date(2025, 1, 20), date(2025, 1, 31),
+        date(2025, 2, 1), date(2025, 2, 14), date(2025, 2, 28), date(2025, 3, 1), date(2025, 3, 20),
+    ]
+
+    def _vendas(self):
+        for i, dia in enumerate(self.DIAS):
+            venda = self._vender(dia, quantidade=i % 3 + 1, status='concluida' if i % 4 else 'aprovada')
+            if i % 2:
+                venda.desconto = Decimal('1.25')
+                venda.calcular_totais()
+        # Fora do faturamento
+        self._vender(self.DIAS[4], status='cancelada')
+
+    def test_deltas_iguais_a_reconstrucao(self):
+        venda = self._vender(date(2025, 3, 14), status='pendente')
+        self._conferir_com_reconstrucao('venda fora do faturamento')
+
+        for passo, alterar in [
+            ('entra no faturamento', lambda: setattr(venda, 'status', 'concluida')),
+            ('troca de status faturado', lambda: setattr(venda, 'status', 'aprovada')),
+            ('desconto', lambda: setattr(venda, 'desconto', Decimal('3.50'))),
+            ('outro dia, outro mês', lambda: setattr(venda, 'data_venda', venda.data_venda + timedelta(days=20))),
+            ('sai do faturamento', lambda: setattr(venda, 'status', 'cancelada')),
+        ]:
+            alterar()
+            venda.calcular_totais()
+            self._conferir_com_reconstrucao(passo)
+
+        venda.status = 'concluida'
+        venda.save()
+        item = ItemVenda(venda=venda, produto=self.outro, quantidade=2, preco_unitario=self.outro.preco)
+        item.save()
+        self._conferir_com_reconstrucao('item incluído')
+        item.quantidade = 3
+        item.desconto_item = Decimal('5.00')
+        item.save()
+        self._conferir_com_reconstrucao('item alterado')
+        item.delete()
+        self._conferir_com_reconstrucao('item excluído')
+
+        venda.refresh_from_db()
+        self.assertEqual(venda.total, Decimal('6.50'))
+        self.assertEqual(
+            Faturamento.objects.get(data=date(2025, 4, 3)).faturamento_liquido, Decimal('6.50'),
+        )
+
+    def test_reconstrucao_so_dos_dias_pedidos(self):
+        dias = [date(2025, 1, 30), date(2025, 1, 31), date(2025, 2, 2), date(2025, 2, 10)]
+        for quantidade, dia in enumerate(dias, 1):
+            self._vender(dia, quantidade)
+        correto = dict(Faturamento.objects.values_list('data', 'faturamento_bruto'))
+
+        def dias_corretos():
+            return {
+                dia for dia, bruto in Faturamento.objects.values_list('data', 'faturamento_bruto')
+                if bruto == correto[dia]
+            }
+
+        Faturamento.objects.update(vendas_dia=99, faturamento_bruto=999)
+        # Fora de ordem e com lacunas
+        resultado = Faturamento.reconstruir_dias([dias[2], dias[0]])
+        self.assertEqual(resultado, {'dias': 2, 'vendas': 2})
+        self.assertEqual(dias_corretos(), {dias[0], dias[2]})
+
+        resultado = Faturamento.reconstruir_periodo(dias[0], dias[2])
+        self.assertEqual(resultado, {'dias': 3, 'vendas': 3})
+        self.assertEqual(dias_corretos(), set(dias[:3]))
+        self.assertEqual(Faturamento.objects.get(data=dias[3]).vendas_dia, 99)
+
+        # Sem limites: todo o histórico, inclusive os dias que ficaram sem vendas
+        Faturamento.reconstruir_periodo()
+        self.assertEqual(dias_corretos(), set(correto))
+        self.assertEqual(
+            Faturamento.objects.exclude(data__in=dias).values_list('vendas_dia', flat=True).distinct().get(), 0,
+        )
+
+    def test_dia_local_da_venda(self):
+        # 23h30 em São Paulo já é o dia seguinte em UTC
+        self._vender(date(2025, 12, 31), horario=hora(23, 30))
+        self.assertEqual(
+            list(Faturamento.objects.exclude(vendas_dia=0).values_list('data', 'vendas_dia')),
+            [(date(2025, 12, 31), 1)],
+        )
+        self._conferir_com_reconstrucao('virada do ano')
+
+    def test_periodos_somam_os_dias(self):
+        self._vendas()
+        esperado = {}
+        for dia, vendas, liquido in Faturamento.objects.values_list('data', 'vendas_dia', 'faturamento_liquido'):
+            for tipo in TIPOS_PERIODO:
+                atual = esperado.get((tipo, inicio_periodo(tipo, dia)), (0, 0))
+                esperado[(tipo, inicio_periodo(tipo, dia))] = (atual[0] + vendas, atual[1] + liquido)
+        esperado = {chave: valores for chave, valores in esperado.items() if valores[0]}
+
+        def periodos():
+            return {
+                (tipo, inicio): (vendas, liquido)
+                for tipo, inicio, vendas, liquido in FaturamentoPeriodo.objects.exclude(vendas=0).values_list(
+                    'tipo', 'inicio', 'vendas', 'faturamento_liquido',
+                )
+            }
+
+        self.assertEqual(periodos(), esperado)
+        # A semana ISO de 30/12/2024 fica inteira em uma linha, com dias dos dois anos
+        self.assertEqual(periodos()[('semana', date(2024, 12, 30))][0], 4)
+
+        FaturamentoPeriodo.objects.update(vendas=99)
+        FaturamentoPeriodo.reconstruir()
+        self.assertEqual(periodos(), esperado)
+
+    def test_decompor_intervalo(self):
+        self.assertEqual(decompor_intervalo(date(2025, 1, 15), date(2025, 3, 20)), [
+            ('dia', date(2025, 1, 15), date(2025, 1, 19)),
+            ('semana', date(2025, 1, 20), date(2025, 1, 26)),
+            ('dia', date(2025, 1, 27), date(2025, 1, 31)),
+            ('mes', date(2025, 2, 1), date(2025, 2, 28)),
+            ('dia', date(2025, 3, 1), date(2025, 3, 2)),
+            ('semana', date(2025, 3, 3), date(2025, 3, 9)),
+            ('semana', date(2025, 3, 10), date(2025, 3, 16)),
+            ('dia', date(2025, 3, 17), date(2025, 3, 20)),
+        ])
+        self.assertEqual(decompor_intervalo(date(2025, 2, 1), date(2025, 1, 31)), [])
+
+        rng = random.Random(9)
+        for _ in range(300):
+            inicio = date(2023, 1, 1) + timedelta(days=rng.randint(0, 1100))
+            fim = inicio + timedelta(days=rng.randint(0, 900))
+            partes = decompor_intervalo(inicio, fim)
+            with self.subTest(inicio=inicio, fim=fim):
+                # Cobre o intervalo em ordem, sem sobreposição nem buraco
+                self.assertEqual(partes[0][1], inicio)
+                self.assertEqual(partes[-1][2], fim)
+                for anterior, seguinte in zip(partes, partes[1:]):
+                    self.assertEqual(anterior[2] + timedelta(days=1), seguinte[1])
+                for tipo, parte_inicio, parte_fim in partes:
+                    if tipo != 'dia':
+                        self.assertEqual(parte_inicio, inicio_periodo(tipo, parte_inicio))
+                        self.assertEqual(parte_fim, fim_periodo(tipo, parte_inicio))
+                # Cada ponta: até 11 meses, 4 semanas e 2 sobras de dias
+                self.assertLessEqual(len(partes), fim.year - inicio.year + 1 + 2 * (11 + 4 + 2))
+
+    def test_totais_iguais_a_soma_das_vendas(self):
+        self._vendas()
+        for inicio, fim in [
+            (date(2024, 12, 1), date(2025, 3, 31)),
+            (date(2024, 12, 29), date(2025, 1, 5)),
+            (date(2024, 12, 31), date(2025, 1, 1)),
+            (date(2025, 1, 6), date(2025, 2, 28)),
+            (date(2024, 1, 1), date(2025, 12, 31)),
+            (date(2025, 1, 2), date(2025, 1, 4)),
+        ]:
+            with self.subTest(inicio=inicio, fim=fim):
+                soma = IntervaloDatas(inicio, fim).filtrar(
+                    Venda.objects.filter(status__in=Venda.STATUS_FATURADOS), 'data_venda',
+                ).aggregate(
+                    vendas=Count('id'), bruto=Sum('subtotal'), desconto=Sum('desconto'),
+                    liquido=Sum('total'), lucro=Sum('lucro_estimado'),
+                )
+                with orcamento_consultas(2):
+                    totais = Faturamento.totais(inicio, fim)
+                self.assertEqual(totais, {campo: valor or 0 for campo, valor in soma.items()})
+
+
+class IntervaloDatasTests(VendasTestCase):
+    # Horário de verão de São Paulo: começou à 0h de 2018-11-04 (0h pulou para
+    # 1h, dia de 23 horas) e terminou à 0h de 2019-02-17 (voltou para 23h do
+    # dia 16, dia de 25 horas)
+
+    def _vender_em(self, instante):
+        venda = self._vender(date(2018, 1, 1))
+        Venda.objects.filter(pk=venda.pk).update(data_venda=instante)
+        return venda
+
+    def _vendas(self, parametros):
+        intervalo = IntervaloDatas.de_parametros(parametros)
+        return set(intervalo.filtrar(Venda.objects.all(), 'data_venda').values_list('pk', flat=True))
+
+    def test_limites_na_virada_do_horario_de_verao(self):
+        antes = self._vender_em(datetime(2018, 11, 4, 2, 59, 59, tzinfo=UTC))  # 23h59 de 03/11
+        inicio = self._vender_em(datetime(2018, 11, 4, 3, 0, tzinfo=UTC))  # 1h de 04/11
+        repetida = self._vender_em(datetime(2019, 2, 17, 2, 30, tzinfo=UTC))  # segunda 23h30 de 16/02
+        depois = self._vender_em(datetime(2019, 2, 17, 3, 0, tzinfo=UTC))  # 0h de 17/02
+
+        self.assertEqual(self._vendas({'data_inicio': '2018-11-03', 'data_fim': '2018-11-03'}), {antes.pk})
+        self.assertEqual(self._vendas({'data_inicio': '2018-11-04', 'data_fim': '2018-11-04'}), {inicio.pk})
+        self.assertEqual(self._vendas({'data_inicio': '2019-02-16', 'data_fim': '2019-02-16'}), {repetida.pk})
+        self.assertEqual(self._vendas({'data_inicio': '2019-02-17'}), {depois.pk})
+        self.assertEqual(self._vendas({'data_fim': '2019-02-16'}), {antes.pk, inicio.pk, repetida.pk})
+
+        for dia, horas in [(date(2018, 11, 4), 23), (date(2019, 2, 16), 25)]:
+            (_, inicio_dia), (_, fim_dia) = IntervaloDatas(dia, dia).filtro(Venda, 'data_venda').children
+            self.assertEqual(fim_dia.astimezone(UTC) - inicio_dia.astimezone(UTC), timedelta(hours=horas), dia)
+
+    def test_data_fim_inclui_o_dia_inteiro(self):
+        ultimo_instante = self._vender(date(2026, 3, 10), horario=hora(23, 59, 59, 999999))
+        meia_noite = self._vender(date(2026, 3, 11), horario=hora(0))
+        self.assertEqual(
+            self._vendas({'data_inicio': '2026-03-10', 'data_fim': '2026-03-10'}), {ultimo_instante.pk},
+        )
+        self.assertEqual(self._vendas({'data_inicio': '2026-03-11'}), {meia_noite.pk})
+
+    def test_parametros(self):
+        padrao = IntervaloDatas.ultimos_dias(7, hoje=date(2026, 3, 10))
+        self.assertIs(IntervaloDatas.de_parametros({}, padrao=padrao), padrao)
+        self.assertEqual(IntervaloDatas.de_parametros({'data_inicio': ''}), IntervaloDatas())
+        self.assertEqual(
+            IntervaloDatas.de_parametros({'data_fim': '2026-03-10'}, padrao=padrao), IntervaloDatas(fim=date(2026, 3, 10)),
+        )
+        for parametros in [{'data_inicio': '2026-02-30'}, {'data_inicio': '2026-03-11', 'data_fim': '2026-03-10'}]:
+            with self.assertRaises(ValueError):
+                IntervaloDatas.de_parametros(parametros)
+
+
+class MontarVendaTests(VendasTestCase):
+    def _itens(self, *quantidades):
+        return [
+            ItemVenda(produto=produto, quantidade=quantidade, preco_unitario=produto.preco, desconto_item=Decimal('1.00'))
+            for produto, quantidade in zip([self.produto, self.outro, self.produto], quantidades)
+        ]
+
+    def _venda(self):
+        return Venda(
+            cliente=self.cliente, vendedor=self.vendedor, forma_pagamento='dinheiro',
+            status='concluida', desconto=Decimal('5.00'),
+        )
+
+    def test_itens_em_um_insert(self):
+        with CaptureQueriesContext(connection) as consultas:
+            venda = montar_venda(self._venda(), self._itens(2, 1, 3))
+        inserts = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "vendas_itemvenda"')]
+        self.assertEqual(len(inserts), 1)
+
+        venda.refresh_from_db()
+        # 2 x 10 + 1 x 25 + 3 x 10, menos 1,00 por item
+        self.assertEqual((venda.subtotal, venda.total), (Decimal('72.00'), Decimal('67.00')))
+        self.assertEqual(venda.lucro_estimado, sum(venda.itens.values_list('lucro_estimado', flat=True)) - venda.desconto)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, 95)
+        self.assertEqual(Faturamento.objects.get().faturamento_liquido, Decimal('67.00'))
+
+        # Trocar os itens devolve o estoque dos anteriores
+        montar_venda(venda, self._itens(1))
+        self.produto.refresh_from_db()
+        self.assertEqual((self.produto.estoque, venda.itens.count()), (99, 1))
+        self._conferir_com_reconstrucao('itens trocados')
+
+    def test_falta_de_estoque_nao_grava_nada(self):
+        with self.assertRaises(EstoqueInsuficiente) as erro:
+            montar_venda(self._venda(), self._itens(2, 101))
+        self.assertEqual([falha.produto_id for falha in erro.exception.falhas], [self.outro.pk])
+        self.assertFalse(Venda.objects.exists())
+        self.assertFalse(ItemVenda.objects.exists())
+        self.assertEqual(
+            list(Produto.objects.order_by('pk').values_list('estoque', flat=True)), [100, 100],
+        )
+        self.assertFalse(Faturamento.objects.exists())
+
+
+class DashboardTests(VendasTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def _vender_hoje(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self._vender(timezone.localdate())
+
+    def test_snapshot_renovado_depois_de_uma_venda(self):
+        self._vender_hoje()
+        self.assertEqual(dashboard.metricas_dashboard()['vendas_hoje'], 1)
+        # Snapshot em dia: uma leitura do cache, nenhuma consulta às vendas
+        with self.assertNumQueries(1):
+            self.assertEqual(dashboard.metricas_dashboard()['vendas_hoje'], 1)
+
+        venda = self._vender_hoje()
+        metricas = dashboard.metricas_dashboard()
+        self.assertEqual((metricas['vendas_hoje'], metricas['total_vendas']), (2, 2))
+        self.assertIn(venda.pk, [ultima.pk for ultima in metricas['ultimas_vendas']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            alterar_status(Venda.objects.filter(pk=venda.pk), 'cancelada')
+        self.assertEqual(dashboard.metricas_dashboard()['vendas_mes'], 1)
+
+    def test_escrita_sem_commit_nao_invalida(self):
+        dashboard.metricas_dashboard()
+        self._vender(timezone.localdate())
+        self.assertEqual(dashboard.metricas_dashboard()['vendas_hoje'], 0)
+
+    def test_snapshot_de_outro_dia_recalculado(self):
+        dashboard.metricas_dashboard()
+        amanha = timezone.localdate() + timedelta(days=1)
+        with mock.patch('vendas.dashboard.timezone.localdate', return_value=amanha), mock.patch(
+            'vendas.dashboard.calcular_metricas', return_value={'vendas_hoje': 0},
+        ) as calcular:
+            dashboard.metricas_dashboard()
+        calcular.assert_called_once()
+
+    def test_recalculo_em_andamento_serve_o_snapshot_anterior(self):
+        self.assertEqual(dashboard.metricas_dashboard()['vendas_hoje'], 0)
+        self._vender_hoje()
+        # Outra requisição segura a trava: esta não espera nem recalcula
+        cache.add(dashboard.CHAVE_TRAVA, True, dashboard.VALIDADE_TRAVA)
+        with mock.patch('vendas.dashboard.calcular_metricas') as calcular:
+            self.assertEqual(dashboard.metricas_dashboard()['vendas_hoje'], 0)
+        calcular.assert_not_called()
+        cache.delete(dashboard.CHAVE_TRAVA)
+        self.assertEqual(dashboard.metricas_dashboard()['vendas_hoje'], 1)
+
+
+class ArquivoVendasTests(VendasTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.vendedor)
+        self.antigas = [self._vender(date(2020, 5, 10), 2), self._vender(date(2020, 5, 31), 1, status='cancelada')]
+        ItemVenda(venda=self.antigas[0], produto=self.outro, quantidade=1, preco_unitario=self.outro.preco).save()
+        self.recente = self._vender(timezone.localdate())
+
+    def _vendas_e_itens(self):
+        return (
+            list(Venda.objects.order_by('pk').values()),
+            list(ItemVenda.objects.order_by('pk').values()),
+        )
+
+    def test_arquivar_e_restaurar(self):
+        antes = self._vendas_e_itens()
+        estado = self._estado()
+
+        self.assertEqual(arquivar_vendas(), {'vendas': 2, 'itens': 3})
+        self.assertEqual(list(Venda.objects.values_list('pk', flat=True)), [self.recente.pk])
+        self.assertEqual(self._estado(), estado)
+
+        venda = self.antigas[0]
+        resposta = self.client.get(reverse('vendas:detalhe', args=[venda.pk]))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, venda.numero_venda)
+        dados = self.client.get(f'/api/vendas/{venda.pk}/').json()
+        self.assertEqual((dados['numero_venda'], dados['arquivada'], len(dados['itens'])), (venda.numero_venda, True, 2))
+        self.assertEqual(dados['cliente']['id'], self.cliente.pk)
+
+        # As reconstruções leem o arquivo
+        self._conferir_com_reconstrucao('vendas arquivadas')
+        self.assertEqual(self._estado(), estado)
+
+        restaurar_vendas([venda.numero_venda for venda in self.antigas])
+        self.assertFalse(VendaArquivada.objects.exists())
+        self.assertEqual(self._vendas_e_itens(), antes)
+        self.assertEqual(self._estado(), estado)
+
+
+class ExportacaoTests(VendasTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendedor.tipo_usuario = 'proprietario'
+        self.vendedor.save()
+        self.client.force_login(self.vendedor)
+        self.outro_cliente = Cliente.objects.create(
+            nome='Maria, "a cliente"', cpf_cnpj='987.654.321-00', telefone='(11) 91234-5678',
+            endereco='-', cidade='-', estado='RJ', cep='-',
+        )
+        self.marco = self._vender(date(2025, 3, 10), 2)
+        ItemVenda(venda=self.marco, produto=self.outro, quantidade=1, preco_unitario=self.outro.preco).save()
+        self.cancelada = self._vender(date(2025, 3, 11), status='cancelada')
+        self.abril = self._vender(date(2025, 4, 1))
+        self.abril.cliente = self.outro_cliente
+        self.abril.save()
+
+    def _baixar(self, url):
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        return b''.join(resposta.streaming_content).decode()
+
+    def test_vendas_csv(self):
+        linhas = list(csv.reader(self._baixar('/api/vendas/exportar/?formato=csv').splitlines()))
+        self.assertEqual(linhas[0], COLUNAS_VENDAS)
+        linhas = [dict(zip(COLUNAS_VENDAS, linha)) for linha in linhas[1:]]
+        # Uma linha por item, em ordem de data
+        self.assertEqual(
+            [(linha['numero_venda'], linha['item_produto'], linha['item_subtotal']) for linha in linhas],
+            [
+                (self.marco.numero_venda, 'Produto', '20.00'),
+                (self.marco.numero_venda, 'Outro', '25.00'),
+                (self.cancelada.numero_venda, 'Produto', '10.00'),
+                (self.abril.numero_venda, 'Produto', '10.00'),
+            ],
+        )
+        self.assertEqual(linhas[0]['total'], '45.00')
+        self.assertEqual(linhas[0]['data_venda'], '2025-03-10T12:00:00-03:00')
+        self.assertEqual(linhas[3]['cliente_nome'], 'Maria, "a cliente"')
+        self.assertEqual(linhas[3]['cliente_id'], str(self.outro_cliente.pk))
+
+        # Blocos pequenos dão o mesmo arquivo
+        self.assertEqual(
+            ''.join(vendas_csv(Venda.objects.all(), tamanho_bloco=1)),
+            ''.join(vendas_csv(Venda.objects.all())),
+        )
+
+    def test_vendas_ndjson_filtradas(self):
+        def exportar(filtros):
+            conteudo = self._baixar(f'/api/vendas/exportar/?formato=ndjson&{filtros}')
+            return [json.loads(linha) for linha in conteudo.splitlines()]
+
+        vendas = exportar('')
+        self.assertEqual([venda['id'] for venda in vendas], [self.marco.pk, self.cancelada.pk, self.abril.pk])
+        self.assertEqual(vendas[0]['cliente']['nome'], 'Cliente')
+        self.assertEqual(
+            [(item['produto'], item['quantidade'], item['subtotal']) for item in vendas[0]['itens']],
+            [('Produto', 2, '20.00'), ('Outro', 1, '25.00')],
+        )
+
+        for filtros, esperadas in [
+            ('status=concluida', [self.marco, self.abril]),
+            (f'cliente={self.outro_cliente.pk}', [self.abril]),
+            ('data_inicio=2025-03-11&data_fim=2025-03-31', [self.cancelada]),
+            (f'status=concluida&cliente={self.cliente.pk}&data_fim=2025-03-10', [self.marco]),
+        ]:
+            with self.subTest(filtros=filtros):
+                self.assertEqual([venda['id'] for venda in exportar(filtros)], [venda.pk for venda in esperadas])
+
+    def test_faturamento(self):
+        dias = self._baixar('/api/faturamento/exportar/?formato=csv&data_inicio=2025-03-01&data_fim=2025-03-31')
+        linhas = list(csv.reader(dias.splitlines()))
+        self.assertEqual(linhas, [
+            COLUNAS_FATURAMENTO,
+            ['2025-03-10', '1', '45.00', '0.00', '45.00', '22.50'],
+        ])
+
+        conteudo = self._baixar('/api/faturamento/exportar/?formato=ndjson&data_inicio=2025-03-11&data_fim=2025-04-30')
+        self.assertEqual(
+            [(linha['data'], linha['faturamento_liquido']) for linha in map(json.loads, conteudo.splitlines())],
+            [('2025-04-01', '10.00')],
+        )
+
+
+class CuboVendasTests(TestCase):
+    def setUp(self):
+        self.vendedor = Usuario.objects.create_user(username='vendedor', password='x', cpf='1')
+        self.cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='123.456.789-00', telefone='(11) 98765-4321',
+            endereco='-', cidade='-', estado='SP', cep='-',
+        )
+        self.c1 = Categoria.objects.create(nome='C1')
+        self.c2 = Categoria.objects.create(nome='C2')
+        self.marca = Marca.objects.create(nome='Marca')
+        self.produto = Produto.objects.create(
+            nome='Produto', descricao='-', categoria=self.c1, marca=self.marca,
+            preco=Decimal('10.00'), estoque=50,
+        )
+
+    def _vender(self, quantidade):
+        venda = Venda(cliente=self.cliente, vendedor=self.vendedor, forma_pagamento='dinheiro', status='concluida')
+        return montar_venda(venda, [
+            ItemVenda(produto=self.produto, quantidade=quantidade, preco_unitario=Decimal('10.00')),
+        ])
+
+    def _linhas(self):
+        return sorted(CuboVendas.objects.values_list('categoria__nome', 'quantidade', 'faturamento_bruto'))
+
+    def test_categoria_do_momento_da_venda(self):
+        self._vender(1)
+        self.produto.categoria = self.c2
+        self.produto.save()
+        self._vender(2)
+
+        self.assertEqual(self._linhas(), [('C1', 1, Decimal('10.00')), ('C2', 2, Decimal('20.00'))])
+        self.assertEqual(
+            sorted(ItemVenda.objects.values_list('categoria__nome', flat=True)), ['C1', 'C2'],
+        )
+
+    def test_reconstrucao_igual_ao_incremental(self):
+        self._vender(1)
+        self.produto.categoria = self.c2
+        self.produto.save()
+        self._vender(2)
+        incremental = self._linhas()
+
+        CuboVendas.reconstruir_periodo()
+        self.assertEqual(self._linhas(), incremental)
+
+    def test_exclusao_de_item_igual_a_reconstrucao(self):
+        outro = Produto.objects.create(
+            nome='Outro', descricao='-', categoria=self.c2, marca=self.marca,
+            preco=Decimal('25.00'), estoque=50,
+        )
+        venda = Venda(cliente=self.cliente, vendedor=self.vendedor, forma_pagamento='dinheiro', status='concluida')
+        montar_venda(venda, [
+            ItemVenda(produto=self.produto, quantidade=2, preco_unitario=Decimal('10.00')),
+            ItemVenda(produto=outro, quantidade=1, preco_unitario=Decimal('25.00')),
+        ])
+        venda.itens.get(produto=outro).delete()
+
+        venda.refresh_from_db()
+        outro.refresh_from_db()
+        self.assertEqual(venda.total, Decimal('20.00'))
+        self.assertEqual(outro.estoque, 50)
+        # O incremental deixa zerada a linha do produto que saiu; a reconstrução não a cria
+        incremental = ([linha for linha in self._linhas() if linha[1]], list(Faturamento.objects.values()))
+        self.assertEqual(incremental[0], [('C1', 2, Decimal('20.00'))])
+        CuboVendas.reconstruir_periodo()
+        Faturamento.reconstruir_periodo()
+        self.assertEqual((self._linhas(), list(Faturamento.objects.values())), incremental)
+
+    def test_cancelamento_em_massa_com_e_sem_returning(self):
+        for returning in (True, False):
+            with self.subTest(returning=returning), mock.patch('vendas.services._update_returning', return_value=returning):
+                venda = self._vender(1)
+                resultado = alterar_status(Venda.objects.filter(pk=venda.pk), 'cancelada')
+                self.assertEqual(resultado.atualizadas, 1)
+                self.assertEqual(resultado.dias, [timezone.localdate(venda.data_venda)])
+                self.assertEqual(self._linhas(), [])
+
+
+class ViewsAssincronasTests(TransactionTestCase):
+    def setUp(self):
+        # Fora de transação: em_paralelo usa uma conexão por consulta
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.usuario = Usuario.objects.create_user(
+            username='dono', password='x', cpf='1', tipo_usuario='proprietario',
+        )
+        self.client.force_login(self.usuario)
+        cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='123.456.789-00', telefone='(11) 98765-4321',
+            endereco='-', cidade='-', estado='SP', cep='-',
+        )
+        produto = Produto.objects.create(
+            nome='Produto', descricao='-', categoria=Categoria.objects.create(nome='C'),
+            marca=Marca.objects.create(nome='M'), preco=Decimal('10.00'), estoque=50,
+        )
+        for quantidade, status in [(1, 'concluida'), (2, 'concluida'), (3, 'pendente'), (4, 'aprovada')]:
+            montar_venda(
+                Venda(cliente=cliente, vendedor=self.usuario, forma_pagamento='dinheiro', status=status),
+                [ItemVenda(produto=produto, quantidade=quantidade, preco_unitario=produto.preco)],
+            )
+
+    def test_em_paralelo_igual_ao_sincrono(self):
+        consultas = [
+            Venda.objects.count,
+            lambda: Venda.objects.filter(status='concluida').aggregate(total=Sum('total'))['total'],
+            lambda: list(Venda.objects.order_by('pk').values_list('pk', flat=True)),
+            Produto.objects.count,
+        ]
+        self.assertFalse(connection.in_atomic_block)
+        self.assertEqual(async_to_sync(em_paralelo)(*consultas), [consulta() for consulta in consultas])
+
+    def test_dashboard_de_vendas(self):
+        contexto = self.client.get(reverse('vendas:dashboard')).context
+        esperado = dashboard.calcular_metricas()
+        for chave in ['total_vendas', 'vendas_hoje', 'vendas_mes', 'faturamento_mes', 'ticket_medio']:
+            self.assertEqual(contexto[chave], esperado[chave], chave)
+        self.assertEqual(
+            [venda.pk for venda in contexto['ultimas_vendas']], [venda.pk for venda in esperado['ultimas_vendas']],
+        )
+
+    def test_faturamento(self):
+        contexto = self.client.get(reverse('vendas:faturamento')).context
+        esperado = IntervaloDatas.ultimos_dias(30).filtrar(
+            Venda.objects.filter(status__in=Venda.STATUS_FATURADOS), 'data_venda',
+        ).aggregate(vendas=Count('id'), total=Sum('total'), lucro=Sum('lucro_estimado'))
+        self.assertEqual(
+            (contexto['total_vendas'], contexto['faturamento_total'], contexto['lucro_total']),
+            (esperado['vendas'], esperado['total'], esperado['lucro']),
+        )
+        self.assertEqual(len(contexto['faturamento_diario']), 30)
+
+    def test_dashboard_do_usuario(self):
+        contexto = self.client.get(reverse('usuarios:dashboard')).context
+        self.assertEqual(
+            (contexto['total_produtos'], contexto['total_vendas'], contexto['faturamento_mes'], contexto['estoque_baixo']),
+            (1, 4, '30.00', 0),
+        )
+        self.assertEqual(
+            [venda.pk for venda in contexto['ultimas_vendas']],
+            list(Venda.objects.order_by('-data_venda').values_list('pk', flat=True)[:5]),
+        )
+
+
+class EstoqueConcorrenteTests(TransactionTestCase):
+    THREADS = 8
+    RESTANTES = 3
+
+    def setUp(self):
+        vendedor = Usuario.objects.create_user(username='vendedor', password='x', cpf='1')
+        cliente = Cliente.objects.create(
+            nome='Cliente', cpf_cnpj='123.456.789-00', telefone='(11) 98765-4321',
+            endereco='-', cidade='-', estado='SP', cep='-',
+        )
+        self.produto = Produto.objects.create(
+            nome='Produto', descricao='-', categoria=Categoria.objects.create(nome='C'),
+            marca=Marca.objects.create(nome='M'), preco=Decimal('10.00'),
+            estoque=self.THREADS + self.RESTANTES,
+        )
+        self.itens = []
+        for _ in range(self.THREADS):
+            venda = montar_venda(
+                Venda(cliente=cliente, vendedor=vendedor, forma_pagamento='dinheiro', status='concluida'),
+                [ItemVenda(produto=self.produto, quantidade=1, preco_unitario=Decimal('10.00'))],
+            )
+            self.itens.append(venda.itens.get().pk)
+
+    def test_edicoes_disputam_as_ultimas_unidades(self):
+        # Cada thread tenta passar o seu item de 1 para 2 unidades
+        largada = threading.Barrier(self.THREADS)
+        resultados = []
+
+        def editar(item_id):
+            try:
+                largada.wait()
+                while True:
+                    try:
+                        item = ItemVenda.objects.get(pk=item_id)
+                        item.quantidade = 2
+                        item.save()
+                        resultados.append(True)
+                    except EstoqueInsuficiente:
+                        resultados.append(False)
+                    except OperationalError:
+                        # Banco ocupado: tenta de novo
+                        time.sleep(0.01)
+                        continue
+                    break
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=editar, args=(item_id,)) for item_id in self.itens]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.produto.refresh_from_db()
+        self.assertEqual(resultados.count(True), self.RESTANTES)
+        self.assertEqual(len(resultados), self.THREADS)
+        self.assertEqual(self.produto.estoque, 0)
+        vendidas = sum(ItemVenda.objects.values_list('quantidade', flat=True))
+        self.assertEqual(vendidas, self.THREADS + self.RESTANTES)
+
+    def test_troca_de_produto_devolve_o_estoque(self):
+        outro = Produto.objects.create(
+            nome='Outro', descricao='-', categoria=self.produto.categoria, marca=self.produto.marca,
+            preco=Decimal('10.00'), estoque=1,
+        )
+        item = ItemVenda.objects.get(pk=self.itens[0])
+        item.produto = outro
+        item.quantidade = 2
+        with self.assertRaises(EstoqueInsuficiente):
+            item.save()
+        item.quantidade = 1
+        item.save()
+
+        self.produto.refresh_from_db()
+        outro.refresh_from_db()
+        self.assertEqual((self.produto.estoque, outro.estoque), (self.RESTANTES + 1, 0))
+
+
+class NumeracaoConcorrenteTests(TransactionTestCase):
+    ALOCADORES = 3
+    THREADS = 2
+    NUMEROS = 20
+
+    def _alocar(self, prefixo, bloco):
+        # Cada alocador faz o papel de um processo, com as suas threads
+        alocadores = [AlocadorNumeracao(prefixo=prefixo, bloco=bloco) for _ in range(self.ALOCADORES)]
+        numeros = []
+
+        def trabalho(alocador):
+            try:
+                for _ in range(self.NUMEROS):
+                    while True:
+                        try:
+                            numero = alocador.proximo()
+                        except OperationalError:
+                            # Banco ocupado: tenta de novo
+                            time.sleep(0.01)
+                            continue
+                        numeros.append(numero)
+                        break
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=trabalho, args=(alocador,))
+            for alocador in alocadores for _ in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return numeros
+
+    def test_sem_repeticao(self):
+        total = self.ALOCADORES * self.THREADS * self.NUMEROS
+        for bloco in (1, 7):
+            with self.subTest(bloco=bloco):
+                numeros = self._alocar(f'T{bloco}', bloco)
+                self.assertEqual(len(numeros), total)
+                self.assertEqual(len(set(numeros)), total)
+
+    def test_bloco_unitario_sem_lacunas(self):
+        numeros = self._alocar('T', 1)
+        chave = AlocadorNumeracao(prefixo='T')._chave()
+        self.assertEqual(
+            sorted(numeros),
+            [f'{chave}{numero:06d}' for numero in range(1, len(numeros) + 1)],
+        )
+
+
+class ListaVendasTests(TestCase):
+    def setUp(self):
+        vendedor = Usuario.objects.create_user(username='vendedor', password='x', cpf='1')
+        self.client.force_login(vendedor)
+        self.joao, self.maria = [
+            Cliente.objects.create(
+                nome=nome, cpf_cnpj=cpf, telefone='(11) 98765-4321', endereco='-', cidade='-', estado='SP', cep='-',
+            )
+            for nome, cpf in [('João da Silva', '111.111.111-11'), ('Maria Souza', '222.222.222-22')]
+        ]
+        for i in range(25):
+            Venda.objects.create(cliente=self.maria if i % 5 == 0 else self.joao, vendedor=vendedor)
+
+    def test_paginas_por_cursor(self):
+        resposta = self.client.get(reverse('vendas:lista'))
+        self.assertEqual(len(resposta.context['vendas']), 20)
+        self.assertIsNone(resposta.context['anterior'])
+
+        resposta = self.client.get(resposta.context['proxima'])
+        self.assertEqual(len(resposta.context['vendas']), 5)
+        self.assertIsNone(resposta.context['proxima'])
+        self.assertIsNotNone(resposta.context['anterior'])
+        self.assertEqual(self.client.get(reverse('vendas:lista'), {'cursor': 'x'}).status_code, 404)
+
+    def test_chaves_de_ordenacao_repetidas(self):
+        # Todas no mesmo instante: só o id desempata, nas duas direções
+        Venda.objects.update(data_venda=timezone.now())
+        esperado = list(Venda.objects.order_by('-data_venda', 'id').values_list('pk', flat=True))
+
+        url, paginas = '/api/vendas/?page_size=4', []
+        while url:
+            dados = self.client.get(url).json()
+            paginas.append(dados)
+            url = dados['next']
+        self.assertEqual([venda['id'] for pagina in paginas for venda in pagina['results']], esperado)
+
+        url, vistos = paginas[-1]['previous'], []
+        while url:
+            dados = self.client.get(url).json()
+            vistos = [venda['id'] for venda in dados['results']] + vistos
+            url = dados['previous']
+        self.assertEqual(vistos, esperado[:len(vistos)])
+        self.assertEqual(len(vistos), 24)
+
+    def test_cursor_adulterado(self):
+        proxima = self.client.get('/api/vendas/?page_size=4').json()['next']
+        cursor = proxima.split('cursor=')[1].split('&')[0]
+        dados = json.loads(urlsafe_b64decode(cursor))
+        for adulterado in [
+            'x',
+            urlsafe_b64encode(b'{"v": [1]}').decode(),
+            urlsafe_b64encode(json.dumps({'v': ['ontem', dados['v'][1]]}).encode()).decode(),
+        ]:
+            with self.subTest(cursor=adulterado):
+                resposta = self.client.get('/api/vendas/', {'cursor': adulterado})
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('error', resposta.json())
+
+    def test_busca_do_cliente(self):
+        for busca in ['maria', '222.222', 'MARIA sou']:
+            resposta = self.client.get(reverse('vendas:lista'), {'busca_cliente': busca})
+            self.assertEqual({venda.cliente_id for venda in resposta.context['vendas']}, {self.maria.pk}, busca)
+            self.assertEqual(len(resposta.context['vendas']), 5)
+
+
+class BuscaClientesTests(TestCase):
+    def setUp(self):
+        self.joao, self.empresa, self.joana = [
+            Cliente.objects.create(
+                nome=nome, cpf_cnpj=cpf_cnpj, telefone=telefone, email=email,
+                endereco='-', cidade='-', estado='SP', cep='-',
+            )
+            for nome, cpf_cnpj, telefone, email in [
+                ('João  da Silva', '123.456.789-00', '(11) 98765-4321', 'joao@exemplo.com'),
+                ('Peças Ltda', '45.678.901/0001-23', '11 3333-4444', ''),
+                ('Joana Souza', '98765432100', '+55 (21) 91234-5678', ''),
+            ]
+        ]
+
+    def _buscar(self, texto):
+        return set(buscar_clientes(Cliente.objects.all(), texto))
+
+    def test_documento_em_qualquer_formato(self):
+        for texto in ['12345678900', '123.456.789-00', '123 456 789', '123.456', ' 123-456 ']:
+            self.assertEqual(self._buscar(texto), {self.joao}, texto)
+        for texto in ['45678901000123', '45.678.901/0001-23', '45678901/0001', '45.678']:
+            self.assertEqual(self._buscar(texto), {self.empresa}, texto)
+        self.assertEqual(self._buscar('987.654.321-00'), {self.joana})
+
+    def test_telefone_em_qualquer_formato(self):
+        for texto in ['11987654321', '(11) 98765-4321', '(11)98765', '11 9876']:
+            self.assertEqual(self._buscar(texto), {self.joao}, texto)
+        self.assertEqual(self._buscar('(11) 3333-4444'), {self.empresa})
+        self.assertEqual(self._buscar('+55 21 9123'), {self.joana})
+        # Dígitos do meio não são início de nada
+        self.assertEqual(self._buscar('3333-4444'), set())
+        # '11' é início dos dois telefones de São Paulo
+        self.assertEqual(self._buscar('11'), {self.joao, self.empresa})
+
+    def test_nome_e_email(self):
+        self.assertEqual(self._buscar('JOÃO DA S'), {self.joao})
+        self.assertEqual(self._buscar('joao   da silva'), {self.joao})
+        self.assertEqual(self._buscar('jo'), {self.joao, self.joana})
+        self.assertEqual(self._buscar('pecas'), {self.empresa})
+        self.assertEqual(self._buscar('@exemplo'), {self.joao})
+        self.assertEqual(self._buscar('  '), {self.joao, self.empresa, self.joana})
+
+    def test_edicao_atualiza_a_busca(self):
+        self.joao.cpf_cnpj = '111.222.333-44'
+        self.joao.save(update_fields=['cpf_cnpj'])
+        self.assertEqual(self._buscar('123.456.789-00'), set())
+        self.assertEqual(self._buscar('111222333'), {self.joao})
+
+    def test_busca_usa_indice(self):
+        for texto, indices in [
+            ('123.456', ['cliente_cpf_cnpj_digitos_idx', 'cliente_telefone_digitos_idx']),
+            ('João', ['cliente_nome_busca_idx']),
+        ]:
+            plano = buscar_clientes(Cliente.objects.all(), texto).explain()
+            for indice in indices:
+                self.assertIn(indice, plano, texto)
+
+    def test_api_e_tela(self):
+        self.client.force_login(Usuario.objects.create_user(username='vendedor', password='x', cpf='1'))
+        resposta = self.client.get('/api/clientes/', {'search': '(11) 98765-4321'})
+        self.assertEqual([cliente['id'] for cliente in resposta.json()['results']], [self.joao.pk])
+        resposta = self.client.get(reverse('vendas:lista_clientes'), {'search': '45.678.901/0001-23'})
+        self.assertEqual(list(resposta.context['clientes']), [self.empresa])
+
+
+class AlterarStatusTests(TestCase):
+    def setUp(self):
+        self.client.force_login(Usuario.objects.create_user(
+            username='dono', password='x', tipo_usuario='proprietario', cpf='1',
+        ))
+
+    def _enviar(self, **dados):
+        return self.client.post(reverse('vendas:atualizar_status'), {'novo_status': 'cancelada', **dados})
+
+    def test_sem_filtro_pede_confirmacao(self):
+        resposta = self._enviar()
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(Tarefa.objects.exists())
+
+        self._enviar(todas='on')
+        self.assertEqual(Tarefa.objects.get().argumentos['filtros']['status'], '')
+
+    def test_filtro_ou_selecao_dispensam_confirmacao(self):
+        self._enviar(status='pendente')
+        self._enviar(selecao='1', ids=['1', '2'])
+        self.assertEqual(
+            [tarefa.argumentos['ids'] for tarefa in Tarefa.objects.order_by('pk')], [None, [1, 2]],
+        )
+
+
+class OrcamentoConsultasTests(TestCase):
+    """Cada URL do projeto (menos o admin) dentro do orçamento de MONITOR_CONSULTAS, sem N+1"""
+
+    def setUp(self):
+        # Sem as respostas do catálogo guardadas por outros testes
+        caches['local'].clear()
+        self.usuario = Usuario.objects.create_user(
+            username='dono', password='x', tipo_usuario='proprietario', cpf='1',
+        )
+        categoria = Categoria.objects.create(nome='Categoria')
+        marca = Marca.objects.create(nome='Marca')
+        # Listas com vários registros, para as consultas repetidas aparecerem
+        produtos = [
+            Produto.objects.create(
+                nome=f'Produto {i}', descricao='-', categoria=categoria, marca=marca,
+                preco=Decimal('10.00'), estoque=100, codigo_barras=f'789{i}',
+            )
+            for i in range(12)
+        ]
+        clientes = [
+            Cliente.objects.create(
+                nome=f'Cliente {i}', cpf_cnpj=f'123.456.789-{i:02d}', telefone='(11) 98765-4321',
+                endereco='-', cidade='-', estado='SP', cep='-',
+            )
+            for i in range(12)
+        ]
+        for i in range(12):
+            self.venda = montar_venda(
+                Venda(cliente=clientes[i], vendedor=self.usuario, forma_pagamento='dinheiro', status='concluida'),
+                [
+                    ItemVenda(produto=produtos[i], quantidade=1, preco_unitario=Decimal('10.00')),
+                    ItemVenda(produto=produtos[-1 - i], quantidade=2, preco_unitario=Decimal('10.00')),
+                ],
+            )
+        Tarefa.objects.create(nome='exportar_vendas', criado_por=self.usuario)
+        self.valores = {'codigo': produtos[0].codigo_barras, 'numero_venda': self.venda.numero_venda}
+
+    def _kwargs(self, padrao):
+        argumentos = _argumentos(padrao)
+        if argumentos == ['pk']:
+            modelo = _modelo_da_view(padrao)
+            return {'pk': modelo._default_manager.order_by('pk').values_list('pk', flat=True).first()}
+        return {argumento: self.valores[argumento] for argumento in argumentos}
+
+    def test_urls_dentro_do_orcamento(self):
+        repeticoes = configuracao()['REPETICOES']
+        vistos = set()
+        for nome, padrao in _padroes(get_resolver()):
+            if nome in vistos or nome.startswith('admin:') or 'format' in _argumentos(padrao):
+                continue
+            vistos.add(nome)
+            url = reverse(nome, kwargs=self._kwargs(padrao))
+            # De novo a cada URL: a de logout encerra a sessão
+            self.client.force_login(self.usuario)
+            with self.subTest(url=url), orcamento_consultas(orcamento_view(nome), repeticoes, nome=nome):
+                self.client.get(url)
+        self.assertIn('vendas:lista', vistos)
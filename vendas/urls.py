@@ -9,6 +9,7 @@ urlpatterns = [
     path('lista/', views.lista_vendas, name='lista'),
     path('nova/', views.criar_venda, name='criar'),
     path('<int:pk>/', views.detalhe_venda, name='detalhe'),
+    path('numero/<str:numero_venda>/', views.venda_por_numero, name='por_numero'),
     path('<int:pk>/editar/', views.editar_venda, name='editar'),
     path('<int:pk>/deletar/', views.deletar_venda, name='deletar'),
     path('faturamento/', views.faturamento_view, name='faturamento'),
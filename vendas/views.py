@@ -1,102 +1,122 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.views import View
+from django.utils import timezone
 from decimal import Decimal
-from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
 import json
 
-from produtos import models
-from .models import Venda, Cliente, ItemVenda, Faturamento
-from .forms import VendaForm, ClienteForm, VendaItemFormSet
+from .models import Venda, Cliente, ItemVenda, Faturamento, VendaArquivada
+from .forms import VendaForm, ClienteForm, VendaItemFormSet, AlterarStatusForm
+from .services import montar_venda, EstoqueInsuficiente
+from .filtros import filtrar_vendas
+from .dashboard import metricas_dashboard
+from .periodos import IntervaloDatas
+from .arquivo import buscar_venda
+from .clientes import buscar_clientes
+from rpm_motos.assincrono import renderizar
+from rpm_motos.paginacao import PaginacaoKeyset
+from tarefas.fila import enfileirar
 from produtos.models import Produto
 
+VENDAS_POR_PAGINA = 20
+FATURAMENTO_DIAS_PADRAO = 30
+FATURAMENTO_MAX_DIAS = 366
+
+def _mensagens_estoque(request, erro, instances):
+    """Uma mensagem de erro por produto sem estoque suficiente"""
+    produtos = {instance.produto_id: instance.produto for instance in instances}
+    for falha in erro.falhas:
+        messages.error(request, f'{produtos[falha.produto_id].nome}: {falha.mensagem}')
+
 # Views para templates (Function Based Views)
 @login_required
 def lista_vendas(request):
-    """Lista de vendas para template"""
-    vendas = Venda.objects.all().order_by('-data_venda')
-    clientes = Cliente.objects.filter(ativo=True)
+    """Lista de vendas para template, paginada por cursor"""
+    vendas = Venda.objects.select_related('cliente', 'vendedor').only(
+        'numero_venda', 'data_venda', 'status', 'total', 'desconto',
+        'cliente__nome', 'cliente__cpf_cnpj',
+        'vendedor__username', 'vendedor__first_name', 'vendedor__last_name',
+    ).order_by('-data_venda', 'id')
     
-    # Filtros
-    status_venda = request.GET.get('status')
-    cliente_id = request.GET.get('cliente')
-    data_inicio = request.GET.get('data_inicio')
-    data_fim = request.GET.get('data_fim')
+    # Filtros; o cliente é buscado pelo nome, CPF/CNPJ ou telefone digitado,
+    # nos índices de Cliente (vendas/clientes.py)
+    try:
+        vendas = filtrar_vendas(vendas, request.GET)
+    except ValueError:
+        messages.error(request, 'Filtros inválidos.')
+    busca_cliente = request.GET.get('busca_cliente', '').strip()
+    if busca_cliente:
+        vendas = vendas.filter(cliente__in=buscar_clientes(Cliente.objects.all(), busca_cliente).values('pk'))
     
-    if status_venda:
-        vendas = vendas.filter(status=status_venda)
-    if cliente_id:
-        vendas = vendas.filter(cliente_id=cliente_id)
-    if data_inicio:
-        vendas = vendas.filter(data_venda__date__gte=data_inicio)
-    if data_fim:
-        vendas = vendas.filter(data_venda__date__lte=data_fim)
+    # Página a partir do cursor, no índice de (data_venda, id), sem COUNT nem
+    # OFFSET; os links de página mantêm os filtros
+    paginacao = PaginacaoKeyset()
+    paginacao.page_size = VENDAS_POR_PAGINA
+    try:
+        pagina = paginacao.paginate_queryset(vendas, Request(request))
+    except ValidationError:
+        raise Http404('Página inválida.')
     
     context = {
-        'vendas': vendas,
-        'clientes': clientes,
+        'vendas': pagina,
+        'anterior': paginacao.get_previous_link(),
+        'proxima': paginacao.get_next_link(),
+        'busca_cliente': busca_cliente,
         'titulo': 'Vendas - RPM Motos'
     }
     return render(request, 'vendas/lista.html', context)
 
 @login_required
 def detalhe_venda(request, pk):
-    """Detalhes da venda para template"""
-    venda = get_object_or_404(Venda, pk=pk)
+    """Detalhes da venda para template (também das vendas arquivadas)"""
+    venda = Venda.objects.filter(pk=pk).first() or get_object_or_404(VendaArquivada, pk=pk)
     context = {
         'venda': venda,
         'titulo': f'Venda {venda.numero_venda} - RPM Motos'
     }
     return render(request, 'vendas/detalhe.html', context)
 
+@login_required
+def venda_por_numero(request, numero_venda):
+    """Redireciona para os detalhes da venda com o número, arquivada ou não"""
+    venda = buscar_venda(numero_venda)
+    if venda is None:
+        raise Http404('Venda não encontrada.')
+    return redirect('vendas:detalhe', pk=venda.pk)
+
 @login_required
 def criar_venda(request):
     if request.method == 'POST':
         form = VendaForm(request.POST)
         formset = VendaItemFormSet(request.POST, prefix='itens')
         
-        print(f"POST data: {request.POST}")
-        print(f"Formset data: {request.POST.getlist('itens-0-produto')}")
-        
         if form.is_valid() and formset.is_valid():
-            venda = form.save(commit=False)
-            venda.vendedor = request.user
-            
-            from datetime import datetime
-            venda.numero_venda = f"V{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            if not venda.status:
-                venda.status = 'aprovada'
-            
-            venda.save()
-            
-            instances = formset.save(commit=False)
-            itens_salvos = 0
+            instances = [
+                instance for instance in formset.save(commit=False)
+                if instance.produto and instance.quantidade and instance.preco_unitario
+            ]
             
-            print(f"Instâncias do formset: {len(instances)}")
-            
-            for i, instance in enumerate(instances):
-                print(f"Item {i}: produto={instance.produto}, quantidade={instance.quantidade}, preco={instance.preco_unitario}")
+            if not instances:
+                messages.error(request, 'Pelo menos um item deve ser adicionado à venda.')
+            else:
+                venda = form.save(commit=False)
+                venda.vendedor = request.user
+                
+                if not venda.status:
+                    venda.status = 'aprovada'
                 
-                if instance.produto and instance.quantidade and instance.preco_unitario:
-                    instance.venda = venda
-                    instance.save()
-                    itens_salvos += 1
-                    print(f"Item {i} salvo com sucesso")
+                try:
+                    montar_venda(venda, instances)
+                except EstoqueInsuficiente as e:
+                    _mensagens_estoque(request, e, instances)
                 else:
-                    print(f"Item {i} não foi salvo - dados incompletos")
-            
-            if itens_salvos == 0:
-                messages.error(request, 'Pelo menos um item deve ser adicionado à venda.')
-                venda.delete()
-                return render(request, 'vendas/form.html', context)
-            
-            venda.calcular_totais()
-            
-            messages.success(request, f'Venda criada com sucesso! {itens_salvos} itens salvos.')
-            return redirect('vendas:detalhe', pk=venda.pk)
+                    messages.success(request, f'Venda criada com sucesso! {len(instances)} itens salvos.')
+                    return redirect('vendas:detalhe', pk=venda.pk)
         else:
             if not form.is_valid():
                 for field, errors in form.errors.items():
@@ -132,23 +152,18 @@ def editar_venda(request, pk):
         formset = VendaItemFormSet(request.POST, prefix='itens')
         
         if form.is_valid() and formset.is_valid():
-            form.save()
-            
-            venda.itens.all().delete()
-            
-            instances = formset.save(commit=False)
-            itens_salvos = 0
+            instances = [
+                instance for instance in formset.save(commit=False)
+                if instance.produto and instance.quantidade and instance.preco_unitario
+            ]
             
-            for instance in instances:
-                if instance.produto and instance.quantidade and instance.preco_unitario:
-                    instance.venda = venda
-                    instance.save()
-                    itens_salvos += 1
-            
-            venda.calcular_totais()
-            
-            messages.success(request, f'Venda atualizada com sucesso! {itens_salvos} itens salvos.')
-            return redirect('vendas:detalhe', pk=venda.pk)
+            try:
+                montar_venda(form.save(commit=False), instances)
+            except EstoqueInsuficiente as e:
+                _mensagens_estoque(request, e, instances)
+            else:
+                messages.success(request, f'Venda atualizada com sucesso! {len(instances)} itens salvos.')
+                return redirect('vendas:detalhe', pk=venda.pk)
         else:
             if not form.is_valid():
                 for field, errors in form.errors.items():
@@ -205,104 +220,116 @@ def deletar_venda(request, pk):
     return render(request, 'vendas/confirmar_exclusao.html', context)
 
 @login_required
-def dashboard_vendas(request):
-    total_vendas = Venda.objects.count()
-    vendas_hoje = Venda.objects.filter(data_venda__date=datetime.now().date()).count()
-    vendas_mes = Venda.objects.filter(
-        data_venda__month=datetime.now().month,
-        status__in=['concluida', 'aprovada']
-    )
-    faturamento_mes = sum(v.total for v in vendas_mes)
-    
-    ticket_medio = faturamento_mes / total_vendas if total_vendas > 0 else 0
-    
-    ultimas_vendas = Venda.objects.all()[:5]
-    
+async def dashboard_vendas(request):
+    # Snapshot em cache, renovado quando as vendas mudam
     context = {
-        'total_vendas': total_vendas,
-        'vendas_hoje': vendas_hoje,
-        'faturamento_mes': faturamento_mes,
-        'ticket_medio': ticket_medio,
-        'ultimas_vendas': ultimas_vendas,
+        **await sync_to_async(metricas_dashboard)(),
         'titulo': 'Dashboard de Vendas - RPM Motos'
     }
-    return render(request, 'vendas/dashboard.html', context)
+    return await renderizar(request, 'vendas/dashboard.html', context)
 
 @login_required
-def faturamento_view(request):
-    if not request.user.is_proprietario:
+async def faturamento_view(request):
+    usuario = await request.auser()
+    if not usuario.is_proprietario:
         messages.error(request, 'Acesso negado. Apenas proprietários podem ver o faturamento.')
-        return redirect('dashboard_vendas')
+        return redirect('vendas:dashboard')
     
-    data_inicio = datetime.now().date() - timedelta(days=30)
-    data_fim = datetime.now().date()
+    # Período de ?data_inicio=&data_fim= (dias locais) ou os últimos 30 dias
+    padrao = IntervaloDatas.ultimos_dias(FATURAMENTO_DIAS_PADRAO)
+    try:
+        intervalo = IntervaloDatas.de_parametros(request.GET, padrao=padrao)
+        intervalo = IntervaloDatas(intervalo.inicio or padrao.inicio, intervalo.fim or padrao.fim)
+        if (intervalo.fim - intervalo.inicio).days >= FATURAMENTO_MAX_DIAS:
+            raise ValueError('Período longo demais.')
+    except ValueError:
+        messages.error(request, f'Período inválido (até {FATURAMENTO_MAX_DIAS} dias); mostrando os últimos {FATURAMENTO_DIAS_PADRAO} dias.')
+        intervalo = padrao
     
-    vendas = Venda.objects.filter(
-        data_venda__date__range=[data_inicio, data_fim],
-        status__in=['concluida', 'aprovada']
-    )
+    # Uma linha de Faturamento por dia, mantida incrementalmente pelas vendas
+    faturamentos = {
+        f.data: f async for f in intervalo.filtrar(Faturamento.objects.all(), 'data')
+    }
     
     faturamento_diario = {}
-    for i in range(30):
-        data = data_fim - timedelta(days=i)
-        vendas_dia = vendas.filter(data_venda__date=data)
-        faturamento_diario[data] = {
-            'vendas': vendas_dia.count(),
-            'total': sum(v.total for v in vendas_dia),
-            'lucro': sum(v.lucro_estimado for v in vendas_dia)
+    faturamento_diario_json = {}
+    total_vendas = 0
+    faturamento_total = Decimal('0')
+    lucro_total = Decimal('0')
+    for data in reversed(list(intervalo.dias())):
+        faturamento = faturamentos.get(data)
+        dados = {
+            'vendas': faturamento.vendas_dia if faturamento else 0,
+            'total': faturamento.faturamento_liquido if faturamento else Decimal('0'),
+            'lucro': faturamento.lucro_estimado if faturamento else Decimal('0'),
         }
+        faturamento_diario[data] = dados
+        faturamento_diario_json[str(data)] = dados
+        total_vendas += dados['vendas']
+        faturamento_total += dados['total']
+        lucro_total += dados['lucro']
     
-    faturamento_total = sum(dados['total'] for dados in faturamento_diario.values())
-    lucro_total = sum(dados['lucro'] for dados in faturamento_diario.values())
-    faturamento_diario_json = json.dumps({str(data): dados for data, dados in faturamento_diario.items()}, default=str)
+    faturamento_diario_json = json.dumps(faturamento_diario_json, default=str)
     context = {
         'faturamento_diario': faturamento_diario,
         'faturamento_diario_json': faturamento_diario_json,
+        'total_vendas': total_vendas,
         'faturamento_total': faturamento_total,
         'lucro_total': lucro_total,
-        'data_inicio': data_inicio,
-        'data_fim': data_fim,
+        'data_inicio': intervalo.inicio,
+        'data_fim': intervalo.fim,
         'titulo': 'Faturamento - RPM Motos'
     }
-    return render(request, 'vendas/faturamento.html', context)
+    return await renderizar(request, 'vendas/faturamento.html', context)
 
 @login_required
 def atualizar_status_vendas(request):
-    if request.method == 'POST':
-        vendas_para_atualizar = Venda.objects.filter(status__in=['cancelada', 'pendente', 'aprovada'])
-        count = vendas_para_atualizar.update(status='concluida')
+    """Muda o status das vendas filtradas ou marcadas na lista"""
+    form = AlterarStatusForm(request.POST or None, selecao='selecao' in request.POST)
+    if request.method == 'POST' and form.is_valid():
+        try:
+            ids = [int(pk) for pk in request.POST.getlist('ids')] or None
+        except ValueError:
+            messages.error(request, 'Seleção de vendas inválida.')
+            return redirect('vendas:lista')
+        if 'selecao' in request.POST and not ids:
+            messages.error(request, 'Marque ao menos uma venda na lista.')
+            return redirect('vendas:lista')
         
-        datas_para_atualizar = set()
-        for venda in vendas_para_atualizar:
-            datas_para_atualizar.add(venda.data_venda.date())
-        
-        for data in datas_para_atualizar:
-            Faturamento.atualizar_faturamento_dia(data)
-        
-        messages.success(request, f'{count} vendas foram atualizadas para concluída (canceladas, pendentes e aprovadas).')
-        return redirect('vendas:lista')
+        # Roda em segundo plano; a página da tarefa mostra o resultado
+        tarefa = enfileirar(
+            'vendas.alterar_status',
+            usuario=request.user,
+            novo_status=form.cleaned_data['novo_status'],
+            filtros=form.filtro(),
+            ids=ids,
+        )
+        messages.info(request, f'Mudança de status enviada (tarefa #{tarefa.pk}).')
+        return redirect('tarefas:detalhe', pk=tarefa.pk)
     
+    rotulos = dict(Venda.STATUS_CHOICES)
+    transicoes = [
+        (rotulos[origem], ', '.join(rotulos[destino] for destino in destinos))
+        for origem, destinos in Venda.TRANSICOES_STATUS.items()
+    ]
     return render(request, 'vendas/atualizar_status.html', {
+        'form': form,
+        'transicoes': transicoes,
         'titulo': 'Atualizar Status das Vendas - RPM Motos'
     })
 
 @login_required
 def atualizar_faturamento(request):
     if request.method == 'POST':
-        data_inicio = datetime.now().date() - timedelta(days=30)
-        data_fim = datetime.now().date()
-        
-        count = 0
-        for i in range(30):
-            data = data_fim - timedelta(days=i)
-            try:
-                Faturamento.atualizar_faturamento_dia(data)
-                count += 1
-            except Exception as e:
-                print(f"Erro ao atualizar faturamento para {data}: {e}")
-        
-        messages.success(request, f'Faturamento atualizado para {count} dias.')
-        return redirect('vendas:faturamento')
+        intervalo = IntervaloDatas.ultimos_dias(FATURAMENTO_DIAS_PADRAO)
+        tarefa = enfileirar(
+            'vendas.reconstruir_faturamento',
+            usuario=request.user,
+            data_inicio=intervalo.inicio,
+            data_fim=intervalo.fim,
+        )
+        messages.info(request, f'Atualização do faturamento enviada (tarefa #{tarefa.pk}).')
+        return redirect('tarefas:detalhe', pk=tarefa.pk)
     
     return render(request, 'vendas/atualizar_faturamento.html', {
         'titulo': 'Atualizar Faturamento - RPM Motos'
@@ -322,11 +349,7 @@ def lista_clientes(request):
     if ativo:
         clientes = clientes.filter(ativo=ativo == 'true')
     if search:
-        clientes = clientes.filter(
-            models.Q(nome__icontains=search) |
-            models.Q(cpf_cnpj__icontains=search) |
-            models.Q(email__icontains=search)
-        )
+        clientes = buscar_clientes(clientes, search)
     
     context = {
         'clientes': clientes,
@@ -373,7 +396,7 @@ def editar_cliente(request, pk):
 @login_required
 def detalhe_cliente(request, pk):
     cliente = get_object_or_404(Cliente, pk=pk)
-    vendas_cliente = Venda.objects.filter(cliente=cliente).order_by('-data_venda')[:10]
+    vendas_cliente = Venda.objects.filter(cliente=cliente).select_related('vendedor').order_by('-data_venda')[:10]
     
     context = {
         'cliente': cliente,